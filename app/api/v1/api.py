@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from api.v1.endpoints import health, crypto, power
+from api.v1.endpoints import health, crypto, power, scheduler, alert, history, admin, telegram, replication
 
 api_router = APIRouter()
 
@@ -18,4 +18,40 @@ api_router.include_router(
     power.router,
     prefix="/power",
     tags=["power"]
-) 
\ No newline at end of file
+)
+
+api_router.include_router(
+    scheduler.router,
+    prefix="/scheduler",
+    tags=["scheduler"]
+)
+
+api_router.include_router(
+    alert.router,
+    prefix="/alerts",
+    tags=["alerts"]
+)
+
+api_router.include_router(
+    history.router,
+    prefix="/history",
+    tags=["history"]
+)
+
+api_router.include_router(
+    admin.router,
+    prefix="/admin",
+    tags=["admin"]
+)
+
+api_router.include_router(
+    telegram.router,
+    prefix="/telegram",
+    tags=["telegram"]
+)
+
+api_router.include_router(
+    replication.router,
+    prefix="/replication",
+    tags=["replication"]
+)
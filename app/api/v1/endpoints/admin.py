@@ -0,0 +1,100 @@
+import asyncio
+import hmac
+import threading
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from core.config import settings
+from core.admission import AdmissionMiddleware
+from core.diagnostics import RouteTimingMiddleware, loop_watchdog, profiler
+from services.snapshot_service import SnapshotService
+from services.quote_table_service import QuoteTableService
+from typing import Optional
+
+
+async def verify_admin_token(x_admin_token: str = Header("", description="ADMIN_TOKEN")):
+    """诊断接口需要 X-Admin-Token 请求头，未配置 ADMIN_TOKEN 时禁用"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=403,
+            detail="Admin endpoints are disabled, set ADMIN_TOKEN to enable them"
+        )
+    if not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=403,
+            detail="Invalid admin token"
+        )
+
+router = APIRouter(dependencies=[Depends(verify_admin_token)])
+
+@router.get("/profile", response_class=PlainTextResponse, summary="采样分析运行中的进程")
+async def get_profile(
+    seconds: float = Query(10, gt=0, le=settings.DIAG_PROFILE_MAX_SECONDS, description="采样时长（秒）"),
+    interval_ms: float = Query(settings.DIAG_PROFILE_INTERVAL_MS, ge=1, le=1000, description="采样间隔（毫秒）"),
+    all_threads: bool = Query(False, description="采样所有线程，默认只采样事件循环线程")
+):
+    """
+    在后台线程中采样调用栈 seconds 秒，返回折叠栈文本（每行 "根;...;叶 次数"）
+    
+    可直接用 flamegraph.pl 或 https://www.speedscope.app 打开；同时只允许一个分析在运行
+    """
+    thread_id = None if all_threads else threading.get_ident()
+    stacks = await asyncio.to_thread(profiler.run, seconds, interval_ms / 1000, thread_id)
+    if stacks is None:
+        raise HTTPException(
+            status_code=409,
+            detail="Another profile is already running"
+        )
+    return PlainTextResponse(
+        profiler.render(stacks),
+        headers={"X-Profile-Samples": str(sum(stacks.values()))}
+    )
+
+@router.get("/loop", summary="获取事件循环阻塞记录")
+async def get_loop_blocks():
+    """获取事件循环阻塞检测状态和最近的阻塞记录（含阻塞时事件循环线程的调用栈）"""
+    return loop_watchdog.summary()
+
+@router.put("/loop", summary="启用或停用事件循环阻塞检测")
+async def update_loop_watchdog(
+    enabled: bool = Query(..., description="是否启用"),
+    threshold_ms: Optional[float] = Query(None, ge=10, description="阻塞阈值（毫秒）")
+):
+    """启用或停用事件循环阻塞检测，启用时可调整阈值"""
+    if enabled:
+        loop_watchdog.start(threshold_ms)
+    else:
+        loop_watchdog.stop()
+    return loop_watchdog.summary()
+
+@router.get("/routes", summary="获取各接口耗时")
+async def get_route_timings():
+    """按路由统计的请求数、状态码、总耗时、首字节耗时和上游请求耗时分位数（按累计耗时排序）"""
+    return RouteTimingMiddleware.summary()
+
+@router.delete("/routes", summary="清空接口耗时统计")
+async def reset_route_timings():
+    """清空接口耗时统计"""
+    RouteTimingMiddleware.reset()
+    return {"message": "Route timings reset"}
+
+@router.get("/admission", summary="获取准入控制状态")
+async def get_admission():
+    """各名额池（* 为全局）的并发上限、当前处理数、按优先级的排队数、拒绝次数（按原因）和排队时间分位数"""
+    return AdmissionMiddleware.summary()
+
+@router.get("/snapshot", summary="获取运行状态快照信息")
+async def get_snapshot():
+    """最近一次保存的时间、大小和耗时，以及启动时恢复的内容"""
+    return SnapshotService().summary()
+
+@router.post("/snapshot", summary="立即保存运行状态快照")
+async def save_snapshot():
+    """立即保存运行状态快照（例如部署前）"""
+    snapshot_service = SnapshotService()
+    await snapshot_service.save()
+    return snapshot_service.summary()
+
+@router.get("/quote-table", summary="获取共享内存行情表状态")
+async def get_quote_table():
+    """行情表文件、已用槽位数、写入次数和写入耗时"""
+    return QuoteTableService().summary()
@@ -0,0 +1,50 @@
+from fastapi import APIRouter
+from models.alert import AlertRule
+from services.alert_service import AlertService
+from typing import List
+
+router = APIRouter()
+
+@router.get("/rules", response_model=List[AlertRule], summary="获取所有价格提醒规则")
+async def get_rules():
+    """获取所有价格提醒规则"""
+    return AlertService().list_rules()
+
+@router.get("/rules/{rule_id}", response_model=AlertRule, summary="获取价格提醒规则")
+async def get_rule(rule_id: str):
+    """获取指定ID的价格提醒规则"""
+    return AlertService().get_rule(rule_id)
+
+@router.post("/rules", response_model=AlertRule, summary="创建价格提醒规则")
+async def create_rule(rule: AlertRule):
+    """创建价格提醒规则
+    
+    参数:
+        - kind: above（上穿）, below（下穿）, move（window_seconds内波动超过threshold%）,
+          divergence（OKJ与Google的BTC/JPY价差超过threshold%）
+        - exchange/symbol: 监控的行情，默认为组合计算的USDT/JPY（compose）
+        - hysteresis: 回差，触发后需回到阈值另一侧超过该幅度才会再次触发
+        - cooldown_seconds: 两次通知的最小间隔
+    """
+    return await AlertService().create_rule(rule)
+
+@router.put("/rules/{rule_id}", response_model=AlertRule, summary="更新价格提醒规则")
+async def update_rule(rule_id: str, rule: AlertRule):
+    """更新指定ID的价格提醒规则"""
+    return await AlertService().update_rule(rule_id, rule)
+
+@router.delete("/rules/{rule_id}", summary="删除价格提醒规则")
+async def delete_rule(rule_id: str):
+    """删除指定ID的价格提醒规则"""
+    await AlertService().delete_rule(rule_id)
+    return {"message": f"Alert rule {rule_id} deleted successfully"}
+
+@router.get("/history", summary="获取最近触发的提醒")
+async def get_history():
+    """获取最近触发的提醒（最新的在前）"""
+    return list(reversed(AlertService().history))
+
+@router.get("/stats", summary="获取价格提醒运行状态")
+async def get_stats():
+    """获取规则数量、触发/发送计数和每次行情判断耗时分位数"""
+    return AlertService().summary()
@@ -1,39 +1,40 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, WebSocket, WebSocketDisconnect
 from services.binance_service import BinanceService
-from services.okx_service import OKXService
 from services.okj_service import OKJService
 from services.power_service import PowerService
 from typing import Optional
-from enum import Enum
-from decimal import Decimal, ROUND_HALF_UP
 from core.logging import logger
 from services.google_service import GoogleService
 from core.config import settings
-import telegram
 import asyncio
-from telegram.constants import ParseMode
-from telegram.helpers import escape_markdown
-from datetime import datetime
 import textwrap
-import telegramify_markdown
 from services.template_service import TemplateService
 from services.scheduler_service import SchedulerService
-
-
-class Exchange(str, Enum):
-    BINANCE = "binance"
-    OKX = "okx"
-    OKJ = "okj"
-    GOOGLE = "google"
+from models.schedule import ScheduleConfig
+from services.quote_cache_service import QuoteCacheService
+from services.instrument_service import InstrumentService
+from services.response_cache_service import ResponseCacheService, CachedResponse
+from services.compose_service import ComposeService
+from services.compose_graph_service import ComposeGraphService
+from services.telegram_service import TelegramService
+from services.live_board_service import LiveBoardService
+from services.spread_service import SpreadService
+from services.leg_refresh_service import LegRefreshService
+from services.consensus_service import ConsensusService
+from services.dashboard_service import DashboardService
+from services.stats_service import StatsService
+from services.exchanges import get_adapter, list_adapters
+from models.exchange import Exchange
+from models.quote import Quote
+from models.compose import ComposeResult
+from core.binary import MSGPACK_MEDIA_TYPE, msgpack_response, wants_msgpack
+from services.quote_stream_service import QuoteStreamService
 
 router = APIRouter()
 
-tg_token = settings.TG_BOT_TOKEN
-gid = settings.TG_GID
-tg_bot = telegram.Bot(token=tg_token)
-
 @router.get("/price", summary="获取加密货币实时买卖价格")
 async def get_crypto_price(
+    request: Request,
     symbol: str = Query(
         default="BTCUSDT",
         description="交易对名称",
@@ -44,30 +45,240 @@ async def get_crypto_price(
     exchange: Exchange = Query(
         default=Exchange.BINANCE,
         description="交易所或数据源"
-    ),
-    binance_service: BinanceService = Depends(BinanceService),
-    okx_service: OKXService = Depends(OKXService),
-    okj_service: OKJService = Depends(OKJService),
-    google_service: GoogleService = Depends(GoogleService)
+    )
 ):
     """
     获取指定交易对的实时价格
     
     参数:
         - symbol: 交易对名称，例如 BTC/JPY, ETH/USDT
-        - exchange: 数据源选择 (binance, okx, okj, google)
+        - exchange: 数据源选择 (binance, okx, okj, google, bitflyer, coincheck)
+    
+    Accept: application/x-msgpack 时返回 MessagePack 数组（字段顺序见 /crypto/binary/schema）
     """
-    if exchange == Exchange.BINANCE:
-        return await binance_service.get_price(symbol)
-    elif exchange == Exchange.OKX:
-        return await okx_service.get_price(symbol)
-    elif exchange == Exchange.OKJ:
-        return await okj_service.get_price(symbol)
-    else:
-        return await google_service.get_price(symbol)
+    quote = await get_adapter(exchange).get_price(symbol)
+    if wants_msgpack(request):
+        return msgpack_response(quote.to_row())
+    data = quote.to_legacy_dict(symbol)
+    # 重启后直接返回的快照行情（见 SNAPSHOT_SERVE_SECONDS），收到新行情前为真
+    data["restored"] = QuoteCacheService().is_restored(quote.exchange, quote.symbol)
+    return data
+
+@router.get("/prices", summary="批量获取加密货币实时价格")
+async def get_crypto_prices(
+    request: Request,
+    symbols: str = Query(..., description="逗号分隔的交易对，例如 BTC/JPY,ETH/JPY"),
+    exchange: Exchange = Query(
+        default=Exchange.BINANCE,
+        description="交易所或数据源"
+    )
+):
+    """
+    获取同一交易所多个交易对的实时价格（支持批量接口的交易所只请求一次）
+    
+    Accept: application/x-msgpack 时返回 MessagePack 数组
+    """
+    quotes = await get_adapter(exchange).get_prices([s.strip() for s in symbols.split(",") if s.strip()])
+    if wants_msgpack(request):
+        return msgpack_response([quote.to_row() for quote in quotes])
+    return [quote.to_dict() for quote in quotes]
+
+@router.get("/orderbook", summary="获取盘口深度")
+async def get_order_book(
+    symbol: str = Query(..., description="交易对，例如 BTC/JPY"),
+    exchange: Exchange = Query(
+        default=Exchange.BINANCE,
+        description="交易所"
+    ),
+    depth: int = Query(20, description="档位数", gt=0, le=200)
+):
+    """获取指定交易所交易对的买卖盘（Google不支持）"""
+    book = await get_adapter(exchange).get_book(symbol, depth)
+    return book.to_dict()
+
+@router.websocket("/price/stream")
+async def stream_prices(websocket: WebSocket, symbols: str, exchange: Exchange = Exchange.BINANCE):
+    """订阅同一交易所多个交易对的行情，价格变化时推送"""
+    await websocket.accept()
+    try:
+        async for quote in get_adapter(exchange).subscribe([s.strip() for s in symbols.split(",") if s.strip()]):
+            await websocket.send_json(quote.to_dict())
+    except WebSocketDisconnect:
+        pass
+    except HTTPException as e:
+        await websocket.close(code=1011, reason=str(e.detail)[:120])
+
+@router.get("/binary/schema", summary="获取二进制接口的字段顺序")
+async def get_binary_schema():
+    """
+    MessagePack 响应中数组的字段顺序，时间均为毫秒整数
+    
+    - /crypto/price、/crypto/prices: quote 数组
+    - /crypto/compose: compose 数组，其中三条行情为 quote 数组
+    - /crypto/stream/binary: 每帧为 [quote 数组列表, [分组, compose 数组] 列表]
+    """
+    return {
+        "media_type": MSGPACK_MEDIA_TYPE,
+        "quote": Quote.ROW_FIELDS,
+        "compose": ComposeResult.ROW_FIELDS,
+        "stream_frame": ["quotes", "compose"]
+    }
+
+@router.get("/binary/stats", summary="获取二进制推送统计")
+async def get_binary_stats():
+    """当前二进制推送的订阅数和合并的更新数"""
+    return QuoteStreamService().summary()
+
+@router.websocket("/stream/binary")
+async def stream_binary(
+    websocket: WebSocket,
+    symbols: Optional[str] = None,
+    exchanges: Optional[str] = None,
+    compose: bool = True
+):
+    """
+    二进制行情推送（内部程序使用）
+    
+    第一帧为当前缓存中的全部行情和各分组compose结果，之后推送变化的行情和compose结果；
+    每帧为一个 MessagePack 数组，同一序列在一帧内只保留最新值，消费者慢时自动合并
+    """
+    await websocket.accept()
+    instrument_service = InstrumentService()
+    try:
+        symbol_filter = {instrument_service.canonical(s.strip()) for s in symbols.split(",") if s.strip()} if symbols else None
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=str(e.detail)[:120])
+        return
+    exchange_filter = {e.strip().lower() for e in exchanges.split(",") if e.strip()} if exchanges else None
+    stream_service = QuoteStreamService()
+    subscription = stream_service.subscribe(symbol_filter, exchange_filter, compose)
+    try:
+        while True:
+            await websocket.send_bytes(await subscription.next_frame())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stream_service.unsubscribe(subscription)
+
+@router.get("/exchanges", summary="获取交易所适配器状态")
+async def get_exchanges():
+    """列出所有交易所适配器的能力（盘口、批量行情、交易对列表）、限流配置和请求统计"""
+    return [adapter.info() for adapter in list_adapters()]
+
+@router.get("/instruments", summary="获取交易对注册表信息")
+async def get_instruments(
+    symbol: Optional[str] = Query(None, description="交易对，例如 BTC/JPY, BTCJPY, BTC-JPY")
+):
+    """
+    获取交易对在各交易所上的原生ID、最小价格单位和状态
+    
+    参数:
+        - symbol: 可选，不传时返回各交易所已加载的交易对数量
+    """
+    instrument_service = InstrumentService()
+    if symbol:
+        return instrument_service.lookup(symbol)
+    return instrument_service.summary()
+
+@router.get("/spreads", summary="获取跨交易所价差和三角套利")
+async def get_spreads(
+    symbol: Optional[str] = Query(None, description="交易对，例如 BTC/JPY")
+):
+    """
+    获取各交易所之间的价差和三角组合（如 OKJ BTC/JPY 对比 OKX BTC/USDT × USDT/JPY）
+    
+    参数:
+        - symbol: 可选，只返回该交易对（三角组合按直接报价的交易对筛选）
+    """
+    if symbol:
+        symbol = InstrumentService().canonical(symbol)
+    return SpreadService().snapshot(symbol)
+
+@router.websocket("/spreads/stream")
+async def stream_spreads(websocket: WebSocket):
+    """连接后先推送全部价差，之后每次行情变化推送受影响的价差和三角组合"""
+    await websocket.accept()
+    spread_service = SpreadService()
+    queue = spread_service.subscribe()
+    try:
+        await websocket.send_json({"type": "snapshot", **spread_service.snapshot()})
+        while True:
+            updates = await queue.get()
+            await websocket.send_json({"type": "update", "items": updates})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        spread_service.unsubscribe(queue)
+
+@router.get("/refresh", summary="获取行情后台刷新状态")
+async def get_leg_refresh():
+    """
+    后台保持新鲜的行情、各自要求的最长缓存时长和当前缓存时长，以及请求、失败和推迟到下一轮的次数
+    """
+    return LegRefreshService().summary()
+
+@router.get("/compose/graph", summary="获取compose增量计算状态")
+async def get_compose_graph():
+    """
+    各分组的倍率和输出版本号，以及输入变化、跳过、重算和推送次数
+
+    compose结果随依赖行情、共识价格和倍率变化增量计算，不随请求数增加
+    """
+    return ComposeGraphService().summary()
+
+@router.websocket("/compose/stream")
+async def stream_compose(websocket: WebSocket):
+    """连接后先推送所有分组的compose结果，之后只在某个分组的价格真正变化时推送该分组"""
+    await websocket.accept()
+    compose_graph = ComposeGraphService()
+    queue = compose_graph.subscribe()
+    try:
+        await websocket.send_json({"type": "snapshot", "items": compose_graph.snapshot()})
+        while True:
+            item = await queue.get()
+            await websocket.send_json({"type": "update", **item})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        compose_graph.unsubscribe(queue)
+
+@router.get("/consensus", summary="获取多交易所共识价格")
+async def get_consensus():
+    """
+    获取各交易对的共识价格
+    
+    返回每条行情的价格、数据时长、权重、是否被作为离群值剔除，以及单次计算耗时分位数
+    """
+    return ConsensusService().summary()
+
+@router.get("/stats", summary="获取行情滚动统计")
+async def get_stats(
+    symbol: Optional[str] = Query(None, description="交易对，例如 BTC/JPY、USDTJPY（含组合计算价格）"),
+    exchange: Optional[str] = Query(None, description="只返回该交易所")
+):
+    """
+    获取交易对在各交易所上各窗口（默认1m/15m/1h/24h）的均值、标准差、最小/最大值、EWMA、z-score 和已实现波动率
+    
+    统计随行情变化增量更新，查询只读取当前值；不传 symbol 时返回正在统计的序列列表
+    """
+    stats_service = StatsService()
+    if not symbol:
+        return stats_service.summary()
+    return stats_service.get(InstrumentService().canonical(symbol), exchange.lower() if exchange else None)
+
+@router.get("/dashboard", summary="获取看板快照")
+async def get_dashboard(request: Request):
+    """
+    一次返回看板所需的全部数据
+    
+    包含所有监控行情（带数据时长和是否过期）、默认倍率及每个分组的compose结果、共识价格。
+    快照由后台周期任务重建并预先压缩，请求不触发上游请求；支持 ETag / If-None-Match 和 gzip
+    """
+    return await DashboardService().respond(request)
 
 @router.get("/compose", summary="获取USDT/JPY组合计算价格")
 async def get_compose_price(
+    request: Request,
     group: Optional[str] = Query(None, description="价格倍率分组"),
     id: Optional[str] = Query(None,description="价格倍率分组Id" ),
     binance_service: BinanceService = Depends(BinanceService),
@@ -80,116 +291,37 @@ async def get_compose_price(
     
     参数:
     - group: 可选，价格倍率分组名称
+    
+    响应按分组缓存，依赖的行情或倍率配置变化后重新计算；支持 ETag / If-None-Match
     """
-    try:
-        # 获取power倍率
-        power = Decimal('1.0')
-        if group:
-            try:
-                power_config = await power_service.get_config_by_group(group)
-                power = Decimal(str(power_config.power))
-                logger.info(f"Using power multiplier {power} for group {group}")
-            except HTTPException as e:
-                if e.status_code == 404:
-                    logger.warning(f"Power config not found for group {group}, using default power 1.0")
-                else:
-                    raise
-        elif id:
-            try:
-                power_config = await power_service.get_config_by_id(id)
-                power = Decimal(str(power_config.power))
-                logger.info(f"Using power multiplier {power} for id {id}")
-            except HTTPException as e:
-                if e.status_code == 404:
-                    logger.warning(f"Power config not found for group id {id}, using default power 1.0")
-                else:
-                    raise        
-        
-        # 并行获取所有价格数据
-        btc_usdt_data = await binance_service.get_price("BTCUSDT")
-        btc_jpy_data = await okj_service.get_price("BTCJPY")
-        btc_jpy_google_data = await google_service.get_price("BTC/JPY")
-        
-        # 转换为Decimal并应用倍率
-        btc_usdt = {
-            'bid': Decimal(str(btc_usdt_data['bid_price'])) * power,
-            'ask': Decimal(str(btc_usdt_data['ask_price'])) * power,
-            'last': Decimal(str(btc_usdt_data['last_price'])) * power,
-            'change_percent': Decimal(str(btc_usdt_data['price_change_percent']))
-        }
-        
-        btc_jpy = {
-            'bid': Decimal(str(btc_jpy_data['bid_price'])) * power,
-            'ask': Decimal(str(btc_jpy_data['ask_price'])) * power,
-            'last': Decimal(str(btc_jpy_data['last_price'])) * power,
-            'change_percent': Decimal(str(btc_jpy_data['price_change_percent']))
-        }
-        
-        btc_jpy_google = {
-            'last': Decimal(str(btc_jpy_google_data['last_price'])) * power
-        }
-        
-        # 计算USDT/JPY的买卖价格（使用OKJ数据）
-        usdt_jpy = {
-            'bid': (btc_jpy['bid'] / btc_usdt['ask']).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
-            'ask': (btc_jpy['ask'] / btc_usdt['bid']).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
-            'last': (btc_jpy['last'] / btc_usdt['last']).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        }
-        
-        # 计算使用Google数据的USDT/JPY价格
-        usdt_jpy_google = {
-            'last': (btc_jpy_google['last'] / btc_usdt['last']).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        }
-        
-        # 计算买卖价差
-        spread = ((usdt_jpy['ask'] - usdt_jpy['bid']) / usdt_jpy['bid'] * Decimal('100')).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        
-        return {
-            "usdt_jpy": {
-                "bid_price": float(usdt_jpy['bid']),
-                "ask_price": float(usdt_jpy['ask']),
-                "last_price": float(usdt_jpy['last']),
-                "spread_percent": float(spread)
-            },
-            "usdt_jpy_google": {
-                "last_price": float(usdt_jpy_google['last'])
-            },
-            "source_data": {
-                "btc_usdt": {
-                    "bid_price": float(btc_usdt['bid']),
-                    "ask_price": float(btc_usdt['ask']),
-                    "last_price": float(btc_usdt['last']),
-                    "change_percent_24h": float(btc_usdt['change_percent']),
-                    "exchange": "Binance",
-                    "timestamp": btc_usdt_data['timestamp']
-                },
-                "btc_jpy": {
-                    "bid_price": float(btc_jpy['bid']),
-                    "ask_price": float(btc_jpy['ask']),
-                    "last_price": float(btc_jpy['last']),
-                    "change_percent_24h": float(btc_jpy['change_percent']),
-                    "exchange": "OKJ",
-                    "timestamp": btc_jpy_data['timestamp']
-                },
-                "btc_jpy_google": {
-                    "last_price": float(btc_jpy_google['last']),
-                    "exchange": "Google",
-                    "timestamp": btc_jpy_google_data['timestamp']
-                }
-            },
-            "calculation_time": btc_usdt_data['timestamp'],
-            "power_multiplier": float(power)
-        }
-        
-    except Exception as e:
-        logger.error(f"Failed to calculate USDT/JPY rate: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to calculate USDT/JPY rate: {str(e)}"
-        ) 
+    entry = await get_cached_compose_price(
+        group, id, binance_service, okj_service, google_service, power_service
+    )
+    return ResponseCacheService.respond(request, entry)
+
+async def get_cached_compose_price(
+    group: Optional[str],
+    id: Optional[str],
+    binance_service: BinanceService,
+    okj_service: OKJService,
+    google_service: GoogleService,
+    power_service: PowerService
+) -> CachedResponse:
+    """读取compose缓存，未命中或依赖版本变化时重新计算"""
+    quote_cache = QuoteCacheService()
+    compose_service = ComposeService(binance_service, okj_service, google_service, power_service)
+    return await ResponseCacheService().get_or_compute(
+        ("compose", group, id),
+        lambda: (
+            quote_cache.version(*ComposeService.LEGS),
+            ConsensusService().version(*ComposeService.CONSENSUS_LEGS),
+            power_service.version
+        ),
+        lambda: compose_service.calculate(group, id)
+    )
 
 @router.get("/boardcast", summary="发送USDT/JPY组合计算价格")
-async def get_compose_price_by_period():
+async def get_compose_price_by_period(group: Optional[str] = None):
     # 创建服务实例
     binance_service = BinanceService()
     okj_service = OKJService()
@@ -197,21 +329,19 @@ async def get_compose_price_by_period():
     power_service = PowerService()
     template_service = TemplateService()
     
-    # 调用get_compose_price函数并打印结果
-    res = await get_compose_price(
-        group=None,
-        binance_service=binance_service,
-        okj_service=okj_service,
-        google_service=google_service,
-        power_service=power_service
+    # 获取compose计算结果（优先使用缓存）
+    entry = await get_cached_compose_price(
+        group, None, binance_service, okj_service, google_service, power_service
     )
+    res = entry.payload
     
-    bid_price = res['usdt_jpy']['bid_price']
-    ask_price = res['usdt_jpy']['ask_price']
-    last_price = res['usdt_jpy']['last_price']
-    google_last_price = res['usdt_jpy_google']['last_price']
-    time_raw = res['calculation_time']
-    formatted_time = datetime.fromisoformat(time_raw.replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
+    bid_price = res.bid
+    ask_price = res.ask
+    last_price = res.last
+    google_last_price = res.google_last
+    # 共识价格不可用时使用OKJ计算的最新价
+    consensus_last_price = res.consensus_last if res.consensus_last is not None else last_price
+    formatted_time = res.calculated_at.strftime('%Y-%m-%d %H:%M:%S')
     
     # 获取消息模板
     template_data = await template_service.get_template('price_broadcast')
@@ -223,17 +353,19 @@ async def get_compose_price_by_period():
         ask_price=ask_price,
         last_price=last_price,
         google_last_price=google_last_price,
+        consensus_last_price=consensus_last_price,
         formatted_time=formatted_time
     )
-    formatted_content = telegramify_markdown.markdownify(markdown_text)
-    
-    await tg_bot.send_message(
-        chat_id=gid,
-        text=formatted_content,
-        parse_mode=ParseMode.MARKDOWN_V2
-    )
+    if settings.BROADCAST_MODE == "board":
+        # 原地更新置顶消息；消息中的计算时间每次都不同，按价格判断是否变化，价格未变化时不发送
+        LiveBoardService().update(
+            markdown_text, group,
+            fingerprint=(bid_price, ask_price, last_price, google_last_price, consensus_last_price)
+        )
+    else:
+        await TelegramService().send_markdown(markdown_text)
     
-    return res
+    return res.to_dict()
 
 @router.put("/template/{template_id}", summary="更新消息模板")
 async def update_message_template(
@@ -287,14 +419,46 @@ async def update_broadcast_interval(
     
     # 重新调度定时任务
     scheduler_service = SchedulerService()
-    job = scheduler_service.get_job('price_broadcast')
-    logger.info(f"jobjob: {job}")
+    job = scheduler_service.get_schedule('price_broadcast')
     if job:
-        scheduler_service.reschedule_job('price_broadcast','interval', minutes=minutes)
+        job.pop("cron", None)
+        job["interval_seconds"] = minutes * 60
+        scheduler_service.register_schedule('price_broadcast', job)
         logger.info(f"Rescheduled price broadcast job with new interval: {minutes} min(s)")
     
     return {"message": f"Successfully updated broadcast interval to {minutes} min(s)"}
 
+async def warm_compose_price(group: Optional[str] = None):
+    """预热compose响应缓存"""
+    await get_cached_compose_price(
+        group, None, BinanceService(), OKJService(), GoogleService(), PowerService()
+    )
+
+# 注册周期任务类型
+SchedulerService().register_kind("broadcast", get_compose_price_by_period)
+SchedulerService().register_kind("warm", warm_compose_price)
+
+@router.get("/schedules", summary="获取所有周期任务")
+async def get_schedules():
+    """获取周期任务注册表
+    
+    返回:
+        - 任务名到任务配置的映射
+    """
+    return SchedulerService().list_schedules()
 
+@router.put("/schedules/{name}", summary="创建或更新周期任务")
+async def update_schedule(name: str, config: ScheduleConfig):
+    """创建或更新指定名称的周期任务
     
-    
\ No newline at end of file
+    参数:
+        - name: 任务名，例如 broadcast_premium
+        - config: 任务配置，interval_seconds（支持亚秒级）与cron二选一
+    """
+    return SchedulerService().register_schedule(name, config.dict())
+
+@router.delete("/schedules/{name}", summary="删除周期任务")
+async def delete_schedule(name: str):
+    """删除指定名称的周期任务"""
+    SchedulerService().unregister_schedule(name)
+    return {"message": f"Schedule {name} deleted successfully"}
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Query
+from models.history import BackfillRequest
+from services.backfill_service import BackfillService
+from typing import Optional
+
+router = APIRouter()
+
+@router.post("/backfill", summary="启动K线历史回补")
+async def start_backfill(request: BackfillRequest):
+    """启动K线历史回补任务（后台执行）
+
+    参数:
+        - venue: 交易所（binance, okx, okj）
+        - symbols: 交易对列表，任意写法
+        - interval_seconds: K线周期（秒），支持 60, 300, 900, 3600, 14400, 86400
+        - start/end: 毫秒时间戳，end 默认为当前时间
+
+    已完成的分段会被跳过，中断后用相同参数重新提交即可续传。
+    """
+    return BackfillService().submit(request).to_dict()
+
+@router.get("/backfill", summary="获取所有回补任务")
+async def list_backfills():
+    """获取所有回补任务的进度（最新的在前）"""
+    return [job.to_dict() for job in BackfillService().list_jobs()]
+
+@router.get("/backfill/{job_id}", summary="获取回补任务进度")
+async def get_backfill(job_id: str):
+    """获取指定回补任务的进度"""
+    return BackfillService().get(job_id).to_dict()
+
+@router.delete("/backfill/{job_id}", summary="取消回补任务")
+async def cancel_backfill(job_id: str):
+    """取消回补任务，已写入的分段保留，重新提交时跳过"""
+    return BackfillService().cancel(job_id).to_dict()
+
+@router.get("/candles", summary="查询本地K线")
+async def get_candles(
+    venue: str = Query(..., description="交易所"),
+    symbol: str = Query(..., description="交易对，任意写法"),
+    interval_seconds: int = Query(60, description="K线周期（秒）"),
+    start: int = Query(0, description="开始时间（毫秒时间戳）"),
+    end: Optional[int] = Query(None, description="结束时间（毫秒时间戳），默认为当前时间"),
+    limit: int = Query(1000, ge=1, le=10000, description="最多返回的K线数")
+):
+    """查询本地保存的K线，每根为 [开盘时间, 开, 高, 低, 收, 成交量]"""
+    return await BackfillService().candles(venue, symbol, interval_seconds, start, end, limit)
+
+@router.get("/coverage", summary="本地K线覆盖范围")
+async def get_coverage():
+    """每个交易所、交易对和周期已保存的K线数量和时间范围"""
+    return await BackfillService().store.coverage()
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Request
 from models.power import PowerConfig
 from services.power_service import PowerService
+from services.response_cache_service import ResponseCacheService
 from typing import List
 from core.logging import logger
 from pydantic import BaseModel
@@ -13,10 +14,17 @@ class PowerUpdate(BaseModel):
 
 @router.get("/configs", response_model=List[PowerConfig])
 async def get_all_configs(
+    request: Request,
     power_service: PowerService = Depends(PowerService)
 ):
-    """获取所有价格计算倍数配置"""
-    return await power_service.get_all_configs()
+    """获取所有价格计算倍数配置（缓存至配置变化，支持 ETag / If-None-Match）"""
+    async def _compute():
+        return [config.dict() for config in await power_service.get_all_configs()]
+
+    entry = await ResponseCacheService().get_or_compute(
+        ("power_configs",), lambda: power_service.version, _compute
+    )
+    return ResponseCacheService.respond(request, entry)
 
 @router.get("/configs/{group}", response_model=PowerConfig)
 async def get_config(
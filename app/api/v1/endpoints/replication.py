@@ -0,0 +1,40 @@
+import hmac
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from core.config import settings
+from services.replication_service import ReplicationService
+
+router = APIRouter()
+
+@router.websocket("/stream")
+async def replication_stream(websocket: WebSocket, token: str = ""):
+    """
+    只读节点订阅主节点的数据（仅 NODE_ROLE=leader 时可用）
+
+    先发送一份完整快照，之后按序号发送行情变化、倍率配置、交易对列表和心跳（MessagePack）；
+    配置了 REPLICATION_TOKEN 时校验查询参数 token
+    """
+    await websocket.accept()
+    if settings.NODE_ROLE != "leader":
+        await websocket.close(code=1008, reason="This node is not a replication leader")
+        return
+    if settings.REPLICATION_TOKEN and not hmac.compare_digest(token, settings.REPLICATION_TOKEN):
+        await websocket.close(code=1008, reason="Invalid replication token")
+        return
+    replication_service = ReplicationService()
+    queue, snapshot = replication_service.subscribe()
+    try:
+        await websocket.send_bytes(snapshot)
+        while True:
+            await websocket.send_bytes(await queue.get())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        replication_service.unsubscribe(queue)
+
+@router.get("/status", summary="获取主从复制状态")
+async def get_replication_status():
+    """
+    主节点：当前序号、连接的只读节点数及其积压消息数；
+    只读节点：连接状态、已应用的序号、距上一条消息的时长、复制延迟、缺口和重连次数
+    """
+    return ReplicationService().summary()
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from services.scheduler_service import SchedulerService
+
+router = APIRouter()
+
+@router.get("/jobs", summary="获取定时任务运行状态")
+async def get_jobs():
+    """列出所有定时任务
+    
+    返回:
+        - 每个任务的触发器、上次/下次运行时间、耗时分位数(p50/p90/p99)和执行结果计数
+    """
+    return SchedulerService().get_job_stats()
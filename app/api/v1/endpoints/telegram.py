@@ -0,0 +1,51 @@
+import hmac
+from fastapi import APIRouter, HTTPException, Request
+from core.config import settings
+from services.bot_command_service import BotCommandService
+from services.live_board_service import LiveBoardService
+
+router = APIRouter()
+
+@router.post("/webhook", summary="Telegram Webhook")
+async def telegram_webhook(request: Request):
+    """
+    接收Telegram推送的更新（需配置 TG_WEBHOOK_URL 指向此地址）
+
+    校验 X-Telegram-Bot-Api-Secret-Token 请求头（TG_WEBHOOK_SECRET），未配置密钥时拒绝所有请求；
+    命令在内存中处理完即返回，回复由后台协程发送
+    """
+    if not settings.TG_COMMANDS_ENABLED:
+        raise HTTPException(
+            status_code=404,
+            detail="Telegram commands are disabled"
+        )
+    if not settings.TG_WEBHOOK_SECRET:
+        raise HTTPException(
+            status_code=403,
+            detail="TG_WEBHOOK_SECRET is not configured"
+        )
+    token = request.headers.get("x-telegram-bot-api-secret-token", "")
+    if not hmac.compare_digest(token, settings.TG_WEBHOOK_SECRET):
+        raise HTTPException(
+            status_code=403,
+            detail="Invalid secret token"
+        )
+    try:
+        data = await request.json()
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid update"
+        )
+    BotCommandService().handle_json(data)
+    return {"ok": True}
+
+@router.get("/stats", summary="获取Telegram命令统计")
+async def get_telegram_stats():
+    """接收模式、已处理的更新和命令数、被限流和丢弃的命令数、回复发送情况"""
+    return BotCommandService().summary()
+
+@router.get("/boards", summary="获取价格看板消息")
+async def get_live_boards():
+    """BROADCAST_MODE=board 时各会话、分组的置顶消息，以及编辑、跳过和合并次数"""
+    return LiveBoardService().summary()
@@ -0,0 +1,215 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+import orjson
+from core.config import settings
+from core.logging import logger
+from core.metrics import LatencyHistogram
+
+# 优先级：数值越小越先放行
+PRIORITY_HIGH = 0
+PRIORITY_LOW = 1
+
+
+class Overloaded(Exception):
+    """请求被拒绝（排队已满或预计等待超过目标）"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """
+    并发限制 + 有界优先级等待队列
+
+    并发数未满且没有人排队时直接放行；否则按 (优先级, 到达顺序) 排队，
+    排队数超过上限、预计等待时间超过目标或实际等待超时都会被拒绝。
+    释放时直接把名额交给队首等待者，不会被新到达的请求插队。
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        # 各优先级的排队数
+        self.waiting = [0, 0]
+        self._heap: List[list] = []
+        self._seq = itertools.count()
+        # 平均占用时长（秒，指数移动平均），用于估算排队时间
+        self.service_time = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.shed: Dict[str, int] = {"queue_full": 0, "latency": 0, "timeout": 0}
+        self.wait = LatencyHistogram()
+
+    def estimate_wait(self, priority: int) -> float:
+        """新到达请求的预计排队时间（秒）：前面的等待者数 × 平均占用时长 / 并发数"""
+        ahead = sum(self.waiting[:priority + 1])
+        return (ahead + 1) * self.service_time / self.limit
+
+    async def acquire(self, priority: int, timeout: float) -> float:
+        """
+        取得一个并发名额
+
+        Returns:
+            排队等待的秒数
+        Raises:
+            Overloaded: 被拒绝时
+        """
+        if self.active < self.limit and not sum(self.waiting):
+            self.active += 1
+            self.admitted += 1
+            return 0.0
+        if sum(self.waiting) >= self.queue_size:
+            self.shed["queue_full"] += 1
+            raise Overloaded("queue_full", self.estimate_wait(priority))
+        estimate = self.estimate_wait(priority)
+        if estimate > timeout:
+            self.shed["latency"] += 1
+            raise Overloaded("latency", estimate)
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), future]
+        heapq.heappush(self._heap, entry)
+        self.waiting[priority] += 1
+        self.queued += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            # 超时的条目留在堆中，出队时跳过
+            self.waiting[priority] -= 1
+            self.shed["timeout"] += 1
+            raise Overloaded("timeout", self.estimate_wait(priority))
+        except BaseException:
+            if future.done() and not future.cancelled():
+                # 名额已经转交，但请求在恢复执行前被取消，交给下一个等待者
+                self._hand_over()
+            else:
+                self.waiting[priority] -= 1
+            raise
+        waited = time.monotonic() - started
+        self.wait.observe(waited)
+        self.admitted += 1
+        return waited
+
+    def release(self, held: Optional[float] = None):
+        """释放名额，held 为本次占用时长（秒），请求未被处理时为空"""
+        if held is not None:
+            self.service_time += (held - self.service_time) * 0.1
+        self._hand_over()
+
+    def _hand_over(self):
+        while self._heap:
+            priority, _, future = heapq.heappop(self._heap)
+            if future.done():
+                continue
+            # 名额直接转交，active 不变
+            self.waiting[priority] -= 1
+            future.set_result(None)
+            return
+        self.active -= 1
+
+    def to_dict(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": {"high": self.waiting[PRIORITY_HIGH], "low": self.waiting[PRIORITY_LOW]},
+            "queue_size": self.queue_size,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": dict(self.shed),
+            "service_time_ms": round(self.service_time * 1000, 3),
+            "wait": self.wait.snapshot()
+        }
+
+
+class AdmissionMiddleware:
+    """
+    准入控制
+
+    每个请求先经过按路径配置的路由名额（ADMISSION_ROUTE_LIMITS），再经过全局名额
+    （ADMISSION_MAX_CONCURRENCY）。全局排队时只读缓存的接口（ADMISSION_PRIORITY_ROUTES）
+    优先于需要请求上游的接口。总排队时间以 ADMISSION_TARGET_WAIT_MS 为上限，
+    预计或实际超过时直接返回 503 和 Retry-After，过载时延迟保持在目标附近而不是无限增长。
+    诊断和健康检查接口（ADMISSION_EXEMPT_ROUTES）不受限制。
+    """
+    gates: Dict[str, AdmissionGate] = {}
+
+    def __init__(self, app):
+        self.app = app
+        self.target = settings.ADMISSION_TARGET_WAIT_MS / 1000
+        self.global_gate = self._gate("*", settings.ADMISSION_MAX_CONCURRENCY)
+        for path, limit in settings.ADMISSION_ROUTE_LIMITS.items():
+            self._gate(path, limit)
+
+    @classmethod
+    def _gate(cls, name: str, limit: int) -> AdmissionGate:
+        gate = cls.gates.get(name)
+        if gate is None:
+            gate = cls.gates[name] = AdmissionGate(name, limit, settings.ADMISSION_QUEUE_SIZE)
+        return gate
+
+    @staticmethod
+    def _priority(path: str) -> int:
+        for prefix in settings.ADMISSION_PRIORITY_ROUTES:
+            if path.startswith(prefix):
+                return PRIORITY_HIGH
+        return PRIORITY_LOW
+
+    async def _reject(self, send, error: Overloaded):
+        retry_after = max(1, math.ceil(error.retry_after))
+        body = orjson.dumps({"detail": f"Server is overloaded ({error.reason}), retry later"})
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        path = scope["path"]
+        if any(path.startswith(prefix) for prefix in settings.ADMISSION_EXEMPT_ROUTES):
+            return await self.app(scope, receive, send)
+
+        priority = self._priority(path)
+        deadline = time.monotonic() + self.target
+        held: List[Tuple[AdmissionGate, float]] = []
+        route_gate: Optional[AdmissionGate] = self.gates.get(path)
+        try:
+            for gate in (route_gate, self.global_gate):
+                if gate is None:
+                    continue
+                await gate.acquire(priority, max(0.0, deadline - time.monotonic()))
+                held.append((gate, time.monotonic()))
+        except Overloaded as e:
+            for gate, _ in held:
+                gate.release()
+            logger.debug("Shed request %s: %s", path, e.reason)
+            return await self._reject(send, e)
+        except BaseException:
+            for gate, _ in held:
+                gate.release()
+            raise
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            for gate, acquired in reversed(held):
+                gate.release(time.monotonic() - acquired)
+
+    @classmethod
+    def summary(cls) -> dict:
+        return {name: gate.to_dict() for name, gate in cls.gates.items()}
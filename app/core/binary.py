@@ -0,0 +1,34 @@
+from typing import Optional
+import msgpack
+from fastapi import Request, Response
+
+# MessagePack 的媒体类型（两种写法都接受）
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/msgpack", "application/vnd.msgpack")
+
+
+def wants_msgpack(request: Request) -> bool:
+    """Accept 中包含 MessagePack 或查询参数 format=msgpack 时返回二进制响应"""
+    if request.query_params.get("format") == "msgpack":
+        return True
+    accept = request.headers.get("accept", "")
+    return any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+
+def packb(data) -> bytes:
+    return msgpack.packb(data, use_bin_type=True)
+
+
+def unpackb(data: bytes):
+    return msgpack.unpackb(data, raw=False)
+
+
+def msgpack_response(data, headers: Optional[dict] = None) -> Response:
+    """
+    MessagePack 响应
+
+    行情和compose结果以固定字段顺序的数组表示（见 Quote.ROW_FIELDS、ComposeResult.ROW_FIELDS），
+    时间为毫秒整数；字段顺序由 GET /crypto/binary/schema 给出。
+    """
+    headers = {**(headers or {}), "Vary": "Accept"}
+    return Response(content=packb(data), media_type=MSGPACK_MEDIA_TYPE, headers=headers)
@@ -1,10 +1,13 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 import secrets
 import json
 import os
 from pathlib import Path
 
+# 定时任务配置文件（广播间隔、周期任务注册表）
+SCHEDULER_CONFIG_FILE = Path(__file__).parent / "scheduler_config.json"
+
 class Settings(BaseSettings):
     PROJECT_NAME: str = "FastAPI Project"
     VERSION: str = "1.0.0"
@@ -28,18 +31,175 @@ class Settings(BaseSettings):
     # Google服务配置
     GOOGLE_CACHE_EXPIRE_MINUTES: int = 30  # Google价格缓存过期时间（分钟）
     
+    # 日志配置
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # json / console
+    LOG_DEBUG_SAMPLE_RATE: int = 10  # DEBUG日志每个调用位置每N条保留1条，1表示不采样
+    
+    # 行情录制/回放配置
+    MARKET_DATA_MODE: str = "live"  # live / record / replay
+    MARKET_DATA_FILE: str = "data/market_data.jsonl"  # 录制文件路径（追加写入）
+    MARKET_REPLAY_SPEED: float = 1.0  # 回放倍速，<=0 表示每次请求顺序取下一条
+    MARKET_REPLAY_LOOP: bool = True  # 回放到末尾后是否从头循环
+    
+    # 交易对注册表
+    INSTRUMENT_REFRESH_MINUTES: int = 60  # 交易对列表刷新间隔（分钟）
+    
+    # 接口响应缓存
+    RESPONSE_CACHE_TTL_MS: int = 500  # 响应缓存最长有效期（毫秒）
+    BINARY_STREAM_BATCH_MS: float = 20  # 二进制推送合并更新的等待时间（毫秒）
+    
+    # 交易所适配器
+    ADAPTER_POOL_SIZE: int = 20  # 每个交易所的最大连接数
+    ADAPTER_TIMEOUT_SECONDS: float = 10  # 单次请求超时（秒）
+    ADAPTER_RETRY_ATTEMPTS: int = 3  # 网络错误和429/5xx的最多尝试次数
+    ADAPTER_STREAM_INTERVAL_SECONDS: float = 1.0  # 行情订阅的轮询间隔（秒）
+    
+    # Google抓取代理池
+    GOOGLE_PROXIES: List[str] = []  # 代理地址列表（"direct" 表示直连），为空时使用 HTTPS_PROXY
+    PROXY_TIMEOUT_SECONDS: float = 4  # 通过代理池的单次请求超时（秒），超时后换代理重试
+    PROXY_COOLDOWN_SECONDS: float = 30  # 被封锁（429/验证码）后的冷却时间（秒），连续失败时加倍
+    PROXY_MAX_COOLDOWN_SECONDS: float = 600  # 冷却时间上限（秒）
+    PROXY_FAILURES_BEFORE_COOLDOWN: int = 3  # 连续网络错误达到该次数时冷却
+    
+    # 对冲请求与时限
+    COMPOSE_DEADLINE_SECONDS: float = 5  # compose计算中所有上游请求（含重试）的总时限（秒）
+    COMPOSE_POWER_SYNC_SECONDS: float = 1  # 检查倍率配置变化的间隔（秒），变化后增量重算受影响的分组
+    COMPOSE_STREAM_QUEUE_SIZE: int = 64  # 每个compose推送订阅者最多积压的更新数
+    HEDGE_ENABLED: bool = True
+    HEDGE_MIN_SAMPLES: int = 20  # 请求耗时样本少于该数量时不对冲
+    HEDGE_MIN_DELAY_MS: float = 50  # 对冲等待时间下限（毫秒），实际为 max(p90, 下限)
+    HEDGE_BUDGET_PERCENT: float = 10  # 对冲请求数上限（正常请求数的百分比）
+    HEDGE_BUDGET_BURST: int = 5  # 可积累的对冲请求数
+    HEDGE_ALTERNATES: Dict[str, List[str]] = {
+        "binance:BTC/USDT": ["okx:BTC/USDT"]
+    }  # 同一交易所对冲后仍未返回时使用的等价行情
+    
+    # 跨交易所价差监控
+    SPREAD_WATCHLIST: List[str] = [
+        "binance:BTC/USDT", "okx:BTC/USDT", "okx:BTC/JPY",
+        "okj:BTC/JPY", "google:BTC/JPY", "google:USDT/JPY",
+        "bitflyer:BTC/JPY", "coincheck:BTC/JPY"
+    ]  # 后台保持新鲜的行情（交易所:交易对）
+    SPREAD_POLL_SECONDS: float = 30  # 监控列表行情超过该时长（秒）时由后台刷新重新拉取，0表示只使用其他请求带来的行情
+    SPREAD_STREAM_QUEUE_SIZE: int = 256  # 每个推送订阅者最多积压的更新批数
+    
+    # 行情后台刷新（价差监控、共识价格、看板、主节点共用）
+    LEG_REFRESH_TICK_SECONDS: float = 1.0  # 检查间隔（秒）
+    LEG_REFRESH_MAX_PER_TICK: int = 2  # 每次检查最多请求的行情数，上游请求速率不超过 MAX_PER_TICK / TICK_SECONDS
+    
+    # 滚动统计
+    STATS_WINDOWS: List[int] = [60, 900, 3600, 86400]  # 统计窗口（秒）
+    STATS_BUCKETS: int = 60  # 每个窗口的时间分桶数，决定窗口滑动的粒度和每条序列的内存上限
+    STATS_MAX_SERIES: int = 500  # 最多统计的行情序列数
+    
+    # 多交易所共识价格
+    CONSENSUS_SYMBOLS: List[str] = ["BTC/USDT", "BTC/JPY"]  # 计算共识价格的交易对
+    CONSENSUS_HALF_LIFE_SECONDS: float = 60  # 行情权重半衰期（秒）
+    CONSENSUS_MAX_AGE_SECONDS: float = 1800  # 超过该时长的行情不参与计算（秒）
+    CONSENSUS_MAD_THRESHOLD: float = 3.0  # 偏离中位数超过N倍标准差（MAD估计）视为离群值
+    CONSENSUS_MIN_DEVIATION_PERCENT: float = 0.2  # 标准差下限（中位数的百分比）
+    CONSENSUS_MIN_MAD_SOURCES: int = 3  # 可用行情少于该数量时不用MAD，改为与参考价格比较
+    CONSENSUS_REFERENCE_DEVIATION_PERCENT: float = 5.0  # 偏离参考价格超过该百分比的行情剔除
+    CONSENSUS_REFERENCE_MAX_AGE_SECONDS: float = 300  # 上一次共识价格作为参考价格的最长时间（秒），超过后以权重最高的行情为参考
+    CONSENSUS_MAX_SOURCES: int = 8  # 每个交易对最多使用的行情数
+    CONSENSUS_VENUE_WEIGHTS: Dict[str, float] = {"google": 0.5}  # 交易所权重，未配置为1.0
+    CONSENSUS_BUDGET_US: int = 200  # 单次计算耗时预算（微秒），超出时计数
+    CONSENSUS_SOURCES: List[str] = [
+        "binance:BTC/USDT", "okx:BTC/USDT",
+        "okj:BTC/JPY", "okx:BTC/JPY", "google:BTC/JPY",
+        "bitflyer:BTC/JPY", "coincheck:BTC/JPY"
+    ]  # 后台保持新鲜的共识价格行情（交易所:交易对）
+    CONSENSUS_REFRESH_SECONDS: float = 15  # 上述行情超过该时长（秒）时由后台刷新重新拉取，0表示不刷新
+    
+    # 看板快照
+    DASHBOARD_REFRESH_SECONDS: float = 1.0  # 检查并重建快照的间隔（秒）
+    DASHBOARD_MAX_AGE_SECONDS: float = 30  # 依赖数据未变化时快照的最长保留时间（秒）
+    DASHBOARD_STALE_SECONDS: float = 60  # 行情超过该时长标记为过期（秒），后台刷新在一半时长时重新拉取
+    
+    # 价格提醒
+    ALERT_RULES_FILE: str = "alert_rules.json"  # 提醒规则文件（位于 DATA_DIR 下）
+    ALERT_QUEUE_SIZE: int = 1000  # 待发送通知队列长度，满时丢弃新通知
+    ALERT_HISTORY_SIZE: int = 200  # 保留的最近触发记录条数
+    
+    # K线历史回补
+    HISTORY_DB_FILE: str = "history.db"  # 本地K线库（位于 DATA_DIR 下）
+    BACKFILL_CONCURRENCY: int = 4  # 每个回补任务同时拉取的分段数
+    BACKFILL_QUEUE_SIZE: int = 8  # 等待写入的分段数上限，限制内存占用
+    
+    # 准入控制
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_CONCURRENCY: int = 64  # 全局同时处理的请求数
+    ADMISSION_QUEUE_SIZE: int = 256  # 每个名额池最多排队的请求数
+    ADMISSION_TARGET_WAIT_MS: float = 500  # 排队时间目标（毫秒），预计或实际超过时返回503
+    ADMISSION_ROUTE_LIMITS: Dict[str, int] = {
+        "/crypto/compose": 16, "/crypto/price": 16, "/crypto/prices": 8,
+        "/crypto/orderbook": 8, "/crypto/boardcast": 2, "/history/backfill": 4
+    }  # 按路径的并发上限
+    ADMISSION_PRIORITY_ROUTES: List[str] = [
+        "/crypto/dashboard", "/crypto/spreads", "/crypto/consensus", "/crypto/exchanges",
+        "/crypto/instruments", "/crypto/stats", "/alerts", "/history/candles", "/history/coverage", "/telegram",
+        "/replication"
+    ]  # 只读本地数据的接口（路径前缀），排队时优先放行
+    ADMISSION_EXEMPT_ROUTES: List[str] = ["/admin", "/health", "/ping"]  # 不受准入控制的路径前缀
+    
+    # 诊断
+    ADMIN_TOKEN: str = ""  # /admin 接口的访问令牌（X-Admin-Token 请求头），为空时禁用 /admin 接口
+    DIAG_ROUTE_TIMING: bool = True  # 按路由统计请求耗时
+    DIAG_LOOP_WATCHDOG: bool = False  # 启动时开启事件循环阻塞检测（也可通过 /admin/loop 开启）
+    DIAG_BLOCK_THRESHOLD_MS: float = 100  # 事件循环阻塞阈值（毫秒）
+    DIAG_BLOCK_HISTORY: int = 50  # 保留的阻塞记录条数
+    DIAG_PROFILE_MAX_SECONDS: float = 60  # 单次采样分析最长时长（秒）
+    DIAG_PROFILE_INTERVAL_MS: float = 5  # 默认采样间隔（毫秒）
+    
+    # 主从复制
+    NODE_ROLE: str = "standalone"  # standalone 独立运行 / leader 主节点 / replica 只读节点
+    LEADER_URL: str = ""  # 只读节点连接的主节点地址，例如 ws://10.0.0.1:7700/replication/stream
+    REPLICATION_TOKEN: str = ""  # 复制连接的共享密钥，为空时不校验
+    REPLICATION_HEARTBEAT_SECONDS: float = 1.0  # 主节点心跳间隔（秒），同时检查倍率配置和交易对列表是否变化
+    REPLICATION_TIMEOUT_SECONDS: float = 5.0  # 只读节点超过该时长没有收到消息时重新连接（秒）
+    REPLICATION_QUEUE_SIZE: int = 1024  # 每个只读节点最多积压的消息数，满时丢弃，只读节点发现序号缺口后重新同步
+    LEADER_REFRESH_SECONDS: float = 5  # 主节点在没有请求时也保持compose行情和价差监控列表不超过该时长（秒），0表示不刷新
+    REPLICA_MAX_QUOTE_AGE_SECONDS: float = 60  # 只读节点不返回缓存时长超过该值的行情（503，秒），0表示不限制
+    
     # 配置文件路径
     DATA_DIR: str = "data"
+    SNAPSHOT_ENABLED: bool = True  # 定期保存运行状态快照，启动时恢复
+    SNAPSHOT_FILE: str = "state.snapshot"  # 状态快照文件（位于 DATA_DIR 下）
+    SNAPSHOT_INTERVAL_SECONDS: float = 30  # 快照保存间隔（秒）
+    SNAPSHOT_MAX_AGE_SECONDS: float = 86400  # 超过该时长的快照不恢复（秒）
+    SNAPSHOT_SERVE_SECONDS: float = 60  # 恢复的行情在该缓存时长内直接用于响应并在后台刷新（秒，含停机时长），0表示不使用
+    QUOTE_TABLE_ENABLED: bool = False  # 把最新行情写入共享内存行情表，供本机其他进程读取
+    QUOTE_TABLE_FILE: str = "quotes.table"  # 行情表文件（位于 DATA_DIR 下，可用绝对路径如 /dev/shm/crypto_ticker.quotes）
+    QUOTE_TABLE_SLOTS: int = 256  # 行情表槽位数（每条行情序列或compose分组占一个）
     POWER_CONFIG_FILE: str = "g-power.json"
     
     # Telegram配置
     TG_BOT_TOKEN: str
     TG_GID: str
+    TG_API_BASE_URL: str = "https://api.telegram.org/bot"  # Bot API地址（可指向本地Bot API服务或测试桩）
+    TG_COMMANDS_ENABLED: bool = False  # 是否响应用户命令（/price、/compose、/spread）
+    TG_WEBHOOK_URL: str = ""  # 公网可访问的 /telegram/webhook 地址，为空时使用长轮询
+    TG_WEBHOOK_SECRET: str = ""  # Webhook密钥，校验 X-Telegram-Bot-Api-Secret-Token 请求头，使用Webhook时必须设置
+    TG_POLL_TIMEOUT_SECONDS: int = 30  # 长轮询等待时间（秒）
+    TG_USER_RATE: float = 1.0  # 每个用户每秒可执行的命令数
+    TG_USER_BURST: int = 5  # 每个用户可积累的命令数
+    TG_SEND_RATE: float = 25.0  # 全局每秒发送回复数上限（Bot API限制约30条/秒）
+    TG_REPLY_QUEUE_SIZE: int = 1000  # 待发送回复队列长度，满时丢弃
+    BROADCAST_MODE: str = "message"  # 价格广播方式：message 每次发送新消息，board 原地更新置顶消息
+    LIVE_BOARD_FILE: str = "live_boards.json"  # 看板消息ID（位于 DATA_DIR 下）
+    LIVE_BOARD_MIN_EDIT_SECONDS: float = 3.0  # 同一会话两次编辑的最小间隔（秒），间隔内的更新合并
     
     # 定时任务配置
+    SCHEDULER_JOB_TIMEOUT_SECONDS: float = 60  # 单次任务执行超时（秒）
+    SCHEDULER_JOB_JITTER_SECONDS: int = 5  # 任务启动随机抖动上限（秒）
+    SCHEDULER_MISFIRE_GRACE_SECONDS: int = 30  # 错过触发时间后仍允许执行的宽限（秒）
+    SCHEDULER_TICK_SECONDS: float = 0.05  # 时间轮刻度（秒），也是周期任务的最小间隔
+    SCHEDULER_WHEEL_SLOTS: int = 1024  # 时间轮槽数
+    
     @property
     def PRICE_BROADCAST_INTERVAL(self) -> int:
-        config_file = Path(__file__).parent / "scheduler_config.json"
+        config_file = SCHEDULER_CONFIG_FILE
         try:
             with open(config_file, 'r') as f:
                 config = json.load(f)
@@ -49,7 +209,7 @@ class Settings(BaseSettings):
     
     @PRICE_BROADCAST_INTERVAL.setter
     def PRICE_BROADCAST_INTERVAL(self, minutes: int) -> None:
-        config_file = Path(__file__).parent / "scheduler_config.json"
+        config_file = SCHEDULER_CONFIG_FILE
         try:
             config = {}
             if config_file.exists():
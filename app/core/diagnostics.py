@@ -0,0 +1,268 @@
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Dict, Optional
+from core.config import settings
+from core.logging import logger
+from core.metrics import LatencyHistogram
+
+# 当前请求的耗时分解，由 RouteTimingMiddleware 设置，请求外为 None
+_request_timing: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("request_timing", default=None)
+
+
+def record_upstream(seconds: float):
+    """记录一次上游请求耗时到当前请求（并发请求累加，可能大于请求总耗时）"""
+    timing = _request_timing.get()
+    if timing is not None:
+        timing["upstream"] += seconds
+        timing["upstream_calls"] += 1
+
+
+class SamplingProfiler:
+    """
+    采样分析器
+
+    后台线程按固定间隔读取目标线程的调用栈（sys._current_frames），
+    输出折叠栈格式（"根;...;叶 次数"），可直接交给 flamegraph.pl 或 speedscope。
+    不修改被分析的代码，开销只与采样频率和栈深度有关；同时只允许一个分析在运行。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._labels: Dict[object, str] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _collapse(self, frame) -> str:
+        names = []
+        while frame is not None:
+            names.append(self._label(frame.f_code))
+            frame = frame.f_back
+        names.reverse()
+        return ";".join(names)
+
+    def run(self, seconds: float, interval: float, thread_id: Optional[int] = None) -> Optional[Counter]:
+        """
+        阻塞采样 seconds 秒，在线程中调用
+
+        Args:
+            thread_id: 只采样该线程（例如事件循环线程），为空时采样所有线程
+        Returns:
+            折叠栈 -> 采样次数；已有分析在运行时返回None
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            own = threading.get_ident()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks: Counter = Counter()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident == own or (thread_id is not None and ident != thread_id):
+                        continue
+                    stack = self._collapse(frame)
+                    if thread_id is None:
+                        stack = f"{names.get(ident, ident)};{stack}"
+                    stacks[stack] += 1
+                time.sleep(interval)
+            return stacks
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def render(stacks: Counter) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class LoopWatchdog:
+    """
+    事件循环阻塞检测
+
+    事件循环中的心跳协程定期更新时间戳，监视线程发现心跳超过阈值未更新时，
+    说明有回调正在同步阻塞事件循环，立即抓取事件循环线程当前的调用栈并记录日志。
+    心跳恢复后补记实际阻塞时长。
+    """
+
+    def __init__(self):
+        self.threshold = settings.DIAG_BLOCK_THRESHOLD_MS / 1000
+        self.blocks: deque = deque(maxlen=settings.DIAG_BLOCK_HISTORY)
+        self.detected = 0
+        self._beat = 0.0
+        self._thread_id: Optional[int] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return self._heartbeat is not None
+
+    def start(self, threshold_ms: Optional[float] = None):
+        """在事件循环中调用"""
+        if threshold_ms:
+            self.threshold = threshold_ms / 1000
+        if self.enabled:
+            return
+        self._thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat = asyncio.create_task(self._run_heartbeat())
+        self._watcher = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watcher.start()
+        logger.info("Event loop watchdog started, threshold %s ms", round(self.threshold * 1000))
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self._stop.set()
+        self._heartbeat.cancel()
+        self._heartbeat = None
+        logger.info("Event loop watchdog stopped")
+
+    async def _run_heartbeat(self):
+        while True:
+            interval = self.threshold / 4
+            self._beat = beat = time.monotonic()
+            await asyncio.sleep(interval)
+            late = time.monotonic() - beat - interval
+            if late > self.threshold and self.blocks and self.blocks[-1]["_beat"] == beat:
+                self.blocks[-1]["blocked_ms"] = round(late * 1000, 1)
+
+    def _watch(self):
+        reported = None
+        while not self._stop.wait(self.threshold / 4):
+            beat = self._beat
+            lag = time.monotonic() - beat
+            if lag <= self.threshold or beat == reported:
+                continue
+            reported = beat
+            frame = sys._current_frames().get(self._thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            self.detected += 1
+            self.blocks.append({
+                "_beat": beat,
+                "detected_at": int(time.time() * 1000),
+                "blocked_ms": round(lag * 1000, 1),
+                "stack": stack
+            })
+            logger.warning("Event loop blocked for more than %s ms:\n%s", round(lag * 1000), stack)
+
+    def summary(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "detected": self.detected,
+            "blocks": [
+                {key: value for key, value in block.items() if not key.startswith("_")}
+                for block in reversed(self.blocks)
+            ]
+        }
+
+
+class RouteStats:
+    """单个接口的耗时统计"""
+
+    def __init__(self):
+        self.statuses: Counter = Counter()
+        self.total = LatencyHistogram()
+        self.first_byte = LatencyHistogram()
+        self.upstream = LatencyHistogram()
+        self.upstream_calls = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.total.count,
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "total": self.total.snapshot(),
+            "first_byte": self.first_byte.snapshot(),
+            "upstream": self.upstream.snapshot(),
+            "upstream_calls": self.upstream_calls
+        }
+
+
+class RouteTimingMiddleware:
+    """
+    按路由模板统计请求耗时
+
+    分解为总耗时、首字节耗时（响应头发出前）和其中的上游请求耗时。
+    未匹配到路由的请求合并统计，避免按原始路径产生无限多的key。
+    """
+    routes: Dict[str, RouteStats] = {}
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        first_byte = None
+        status = 500
+
+        async def _send(message):
+            nonlocal first_byte, status
+            if message["type"] == "http.response.start":
+                first_byte = time.perf_counter()
+                status = message["status"]
+            await send(message)
+
+        timing = {"upstream": 0.0, "upstream_calls": 0}
+        token = _request_timing.set(timing)
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _request_timing.reset(token)
+            now = time.perf_counter()
+            key = f"{scope['method']} {self._route_path(scope)}"
+            stats = self.routes.get(key)
+            if stats is None:
+                stats = self.routes[key] = RouteStats()
+            stats.statuses[status] += 1
+            stats.total.observe(now - started)
+            stats.first_byte.observe((first_byte or now) - started)
+            stats.upstream.observe(timing["upstream"])
+            stats.upstream_calls += timing["upstream_calls"]
+
+    @staticmethod
+    def _route_path(scope) -> str:
+        """
+        请求对应的路由模板
+
+        嵌套路由时 scope 中的 route 只有子路由自身的路径，
+        因此由实际路径把路径参数值替换回 {参数名} 得到完整模板。
+        """
+        if scope.get("endpoint") is None:
+            return "<unmatched>"
+        path = scope["path"]
+        for name, value in scope.get("path_params", {}).items():
+            path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+        return path
+
+    @classmethod
+    def summary(cls) -> dict:
+        ordered = sorted(cls.routes.items(), key=lambda item: item[1].total.total, reverse=True)
+        return {key: stats.to_dict() for key, stats in ordered}
+
+    @classmethod
+    def reset(cls):
+        cls.routes.clear()
+
+
+profiler = SamplingProfiler()
+loop_watchdog = LoopWatchdog()
@@ -1,22 +1,157 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
-from datetime import datetime
+import uuid
+import orjson
+import structlog
+from structlog.contextvars import bind_contextvars, clear_contextvars, get_contextvars
+from core.config import settings
+
+
+class DebugSampler(logging.Filter):
+    """
+    高频DEBUG日志采样
+
+    按调用位置计数，每个位置每 rate 条只保留 1 条，被丢弃的记录不会进入队列。
+    """
+
+    def __init__(self, rate: int):
+        super().__init__()
+        self.rate = rate
+        self._counts = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate <= 1:
+            return True
+        key = (record.pathname, record.lineno)
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if count % self.rate:
+            return False
+        record.sample_rate = self.rate
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    把日志记录放入内存队列，由后台线程负责格式化和写出
+
+    与标准 QueueHandler 不同，这里不在调用线程中拼接消息，
+    只记录当前请求的上下文（如 request_id），格式化全部在后台线程完成。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.context = get_contextvars()
+        return record
+
+
+def _add_record_context(logger, method_name, event_dict):
+    """把入队时记录的请求上下文合并到日志字段中"""
+    record = event_dict.get("_record")
+    context = getattr(record, "context", None)
+    if context:
+        for key, value in context.items():
+            event_dict.setdefault(key, value)
+    sample_rate = getattr(record, "sample_rate", None)
+    if sample_rate:
+        event_dict["sample_rate"] = sample_rate
+    return event_dict
+
+
+def _json_dumps(obj, default=None):
+    return orjson.dumps(obj, default=default).decode()
+
+
+_shared_processors = [
+    structlog.stdlib.add_log_level,
+    structlog.stdlib.add_logger_name,
+    structlog.processors.TimeStamper(fmt="iso"),
+]
+
+if settings.LOG_FORMAT == "json":
+    _renderer = structlog.processors.JSONRenderer(serializer=_json_dumps, default=str)
+else:
+    _renderer = structlog.dev.ConsoleRenderer(colors=False)
+
+# 后台线程使用的格式化器：同时处理标准logging记录和structlog记录
+formatter = structlog.stdlib.ProcessorFormatter(
+    foreign_pre_chain=_shared_processors + [_add_record_context],
+    processors=[
+        _add_record_context,
+        structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+        structlog.processors.format_exc_info,
+        _renderer,
+    ],
+)
+
+structlog.configure(
+    processors=[
+        structlog.contextvars.merge_contextvars,
+        structlog.stdlib.filter_by_level,
+        *_shared_processors,
+        structlog.stdlib.PositionalArgumentsFormatter(),
+        structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+    ],
+    logger_factory=structlog.stdlib.LoggerFactory(),
+    wrapper_class=structlog.stdlib.BoundLogger,
+    cache_logger_on_first_use=True,
+)
 
 # 创建logger
 logger = logging.getLogger("crypto_ticker")
-logger.setLevel(logging.INFO)
+logger.setLevel(settings.LOG_LEVEL.upper())
+logger.propagate = False
 
-# 创建控制台处理器
+# 控制台处理器只在后台线程中被调用，事件循环不会阻塞在stdout写入上
 console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setLevel(logging.INFO)
-
-# 设置日志格式
-formatter = logging.Formatter(
-    '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 console_handler.setFormatter(formatter)
 
+log_queue = queue.SimpleQueue()
+queue_listener = logging.handlers.QueueListener(log_queue, console_handler, respect_handler_level=True)
+
 # 确保logger没有重复的处理器
 if not logger.handlers:
     # 添加处理器到logger
-    logger.addHandler(console_handler) 
\ No newline at end of file
+    logger.addHandler(NonBlockingQueueHandler(log_queue))
+    logger.addFilter(DebugSampler(settings.LOG_DEBUG_SAMPLE_RATE))
+    queue_listener.start()
+    atexit.register(queue_listener.stop)
+
+
+def get_logger(**initial_values):
+    """获取结构化logger，例如 get_logger(component="okx").info("fetched", symbol=symbol)"""
+    return structlog.get_logger("crypto_ticker").bind(**initial_values)
+
+
+class RequestIdMiddleware:
+    """为每个请求绑定关联ID，请求内的所有日志都带上 request_id，并在响应头中返回"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex[:16]
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        clear_contextvars()
+        bind_contextvars(request_id=request_id)
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            clear_contextvars()
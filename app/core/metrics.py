@@ -0,0 +1,58 @@
+import bisect
+from collections import deque
+from typing import Optional
+
+# 直方图桶上界（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class LatencyHistogram:
+    """
+    耗时直方图
+
+    固定桶累计全部样本的分布，最近的样本保存在定长环形缓冲中用于计算分位数，
+    内存占用与运行时长无关。
+    """
+
+    def __init__(self, window: int = 512, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.recent.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """最近样本的分位数，p 取值 0-100"""
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        idx = min(len(ordered) - 1, int(len(ordered) * p / 100))
+        return ordered[idx]
+
+    def snapshot(self) -> dict:
+        ordered = sorted(self.recent)
+
+        def _pick(p):
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))], 6)
+
+        labels = [f"le_{b}" for b in self.buckets] + ["le_inf"]
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 6) if self.count else None,
+            "p50": _pick(50),
+            "p90": _pick(90),
+            "p99": _pick(99),
+            "max": round(self.max, 6),
+            "buckets": dict(zip(labels, self.bucket_counts))
+        }
@@ -0,0 +1,172 @@
+import random
+import time
+from typing import Dict, List, Optional
+from fastapi import HTTPException
+from yarl import URL
+from core.ratelimit import TokenBucket
+
+# 代理池中表示直连（不经过代理）的写法
+DIRECT = "direct"
+
+
+def strip_userinfo(url: str) -> str:
+    """去掉代理地址中的用户名和密码（用于统计和日志）"""
+    if url == DIRECT:
+        return url
+    try:
+        return str(URL(url).with_user(None))
+    except ValueError:
+        return "<invalid proxy url>"
+
+
+class ProxyState:
+    """单个代理的健康状况"""
+
+    def __init__(self, url: str, rate: float, burst: int):
+        self.url = url
+        # 不含用户名和密码的地址，对外只显示这个
+        self.display = strip_userinfo(url)
+        self.limiter = TokenBucket(rate, burst)
+        # 成功率和耗时的指数加权平均
+        self.success = 1.0
+        self.latency: Optional[float] = None
+        self.inflight = 0
+        self.requests = 0
+        self.failures = 0
+        self.blocks = 0
+        # 连续网络错误次数和连续冷却次数，成功后清零
+        self.consecutive = 0
+        self.cooldowns = 0
+        self.cooldown_until = 0.0
+        self.last_error: Optional[str] = None
+
+    @property
+    def proxy(self) -> Optional[str]:
+        """传给aiohttp的代理地址，直连为None"""
+        return None if self.url == DIRECT else self.url
+
+    def redact(self, text: str) -> str:
+        """去掉文本（如异常信息）中的代理用户名和密码"""
+        if self.display == self.url:
+            return text
+        text = text.replace(self.url, self.display)
+        try:
+            url = URL(self.url)
+        except ValueError:
+            return text
+        for user, password in ((url.raw_user, url.raw_password), (url.user, url.password)):
+            userinfo = f"{user}:{password}@" if password else f"{user}@"
+            text = text.replace(userinfo, "")
+            if password:
+                text = text.replace(password, "***")
+        return text
+
+    def cooling(self, now: float) -> bool:
+        return now < self.cooldown_until
+
+    def to_dict(self, now: float) -> dict:
+        return {
+            "url": self.display,
+            "success": round(self.success, 4),
+            "latency": round(self.latency, 4) if self.latency is not None else None,
+            "inflight": self.inflight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "blocks": self.blocks,
+            "cooldown_seconds": round(max(0.0, self.cooldown_until - now), 3),
+            "last_error": self.last_error
+        }
+
+
+class ProxyPool:
+    """
+    代理池
+
+    按成功率和耗时给每个代理打分，按分数加权随机选择（同时考虑正在进行的请求数），
+    被封锁（429或验证码页面）时立即冷却，连续网络错误达到 failures_before_cooldown 次时冷却，
+    冷却时间随连续失败次数加倍。冷却中的代理不参与选择，全部冷却时直接返回503，不再等待超时。
+    每个代理有独立的限流器，总吞吐量随可用代理数变化。
+    """
+
+    def __init__(self, urls: List[str], rate: float, burst: int, cooldown: float, max_cooldown: float,
+                 failures_before_cooldown: int = 3, alpha: float = 0.2):
+        self.proxies: Dict[str, ProxyState] = {url: ProxyState(url, rate, burst) for url in urls}
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.failures_before_cooldown = failures_before_cooldown
+        self.alpha = alpha
+        self.unavailable = 0
+
+    @staticmethod
+    def _score(state: ProxyState, default_latency: float) -> float:
+        latency = state.latency if state.latency is not None else default_latency
+        return max(state.success, 0.05) ** 2 / max(latency, 0.05) / (1 + state.inflight)
+
+    def select(self) -> ProxyState:
+        """
+        选择一个代理
+
+        Raises:
+            HTTPException(503): 所有代理都在冷却中
+        """
+        now = time.monotonic()
+        available = [state for state in self.proxies.values() if not state.cooling(now)]
+        if not available:
+            self.unavailable += 1
+            retry_after = min(state.cooldown_until for state in self.proxies.values()) - now
+            raise HTTPException(
+                status_code=503,
+                detail=f"All proxies are cooling down, retry in {retry_after:.0f}s"
+            )
+        # 还没有耗时样本的代理按已知耗时的中位数打分，新代理和冷却结束的代理都能分到请求
+        known = sorted(state.latency for state in available if state.latency is not None)
+        default_latency = known[len(known) // 2] if known else 1.0
+        weights = [self._score(state, default_latency) for state in available]
+        state = random.choices(available, weights=weights)[0]
+        state.inflight += 1
+        state.requests += 1
+        return state
+
+    def release(self, state: ProxyState):
+        """请求没有发出（取消或调用链时限已到），不计入评分"""
+        state.inflight = max(0, state.inflight - 1)
+        state.requests -= 1
+
+    def _observe(self, state: ProxyState, elapsed: float, success: float):
+        state.inflight = max(0, state.inflight - 1)
+        state.success += self.alpha * (success - state.success)
+        state.latency = elapsed if state.latency is None else state.latency + self.alpha * (elapsed - state.latency)
+
+    def _cool(self, state: ProxyState):
+        state.cooldown_until = time.monotonic() + min(self.cooldown * 2 ** state.cooldowns, self.max_cooldown)
+        state.cooldowns += 1
+        state.consecutive = 0
+
+    def succeeded(self, state: ProxyState, elapsed: float):
+        self._observe(state, elapsed, 1.0)
+        state.consecutive = 0
+        state.cooldowns = 0
+
+    def failed(self, state: ProxyState, elapsed: float, error: str):
+        """网络错误、超时或5xx"""
+        self._observe(state, elapsed, 0.0)
+        state.failures += 1
+        state.consecutive += 1
+        state.last_error = state.redact(error)
+        if state.consecutive >= self.failures_before_cooldown:
+            self._cool(state)
+
+    def blocked(self, state: ProxyState, elapsed: float, error: str):
+        """被上游封锁（429或验证码页面），立即冷却"""
+        self._observe(state, elapsed, 0.0)
+        state.blocks += 1
+        state.last_error = state.redact(error)
+        self._cool(state)
+
+    def summary(self) -> dict:
+        now = time.monotonic()
+        return {
+            "available": sum(1 for state in self.proxies.values() if not state.cooling(now)),
+            "unavailable": self.unavailable,
+            "proxies": [state.to_dict(now) for state in self.proxies.values()]
+        }
@@ -0,0 +1,335 @@
+"""
+共享内存行情表
+
+固定布局的内存映射文件，本服务写入最新行情和compose结果，同一台机器上的其他进程
+（对冲、风控程序）直接映射读取，不经过HTTP。本模块只依赖标准库，可以单独复制给读取方使用:
+
+    from quote_table import QuoteTableReader
+
+    with QuoteTableReader("/dev/shm/crypto_ticker.quotes") as table:
+        quote = table.get("compose", "USDT/JPY")
+
+文件布局（小端）:
+    头部 64 字节: magic "QTBL", 布局版本, 头部长度, 槽位长度, 槽位数, 已用槽位数, 代号, 写入进程PID
+    槽位 128 字节: 序号 u64, 交易所 24s, 交易对 24s, ts i64(毫秒),
+                   bid, ask, last, bid_qty, ask_qty, volume, change_percent, written_at(秒) f64
+
+每个槽位用序号实现 seqlock：写入前序号加一（奇数表示正在写入），写完再加一；
+读取方前后两次读到相同的偶数序号时数据一致，否则重试，读写双方都不加锁。
+重试 READ_RETRIES 次仍在写入时返回该槽位上一次一致读取的值，从未读到过时抛出 TableBusy。
+槽位按首次出现的顺序分配，写入进程运行期间不移动；写入进程重启时代号变化，读取方重新建立索引。
+
+live 按头部的PID检查写入进程是否存在（读取方须与写入方在同一PID命名空间）；
+写入进程没有退出但停止更新时 live 仍为真，判断行情是否过期应使用 written_at。
+"""
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+MAGIC = b"QTBL"
+LAYOUT_VERSION = 1
+HEADER = struct.Struct("<4sIIIIIqI")
+HEADER_SIZE = 64
+SEQ = struct.Struct("<Q")
+BODY = struct.Struct("<24s24sq8d")
+SLOT_SIZE = SEQ.size + BODY.size
+NAME_SIZE = 24
+# 已用槽位数、代号、写入进程PID在头部中的偏移
+USED_OFFSET = 20
+GENERATION_OFFSET = 24
+PID_OFFSET = 32
+# 读取时遇到正在写入的槽位最多重试的次数
+READ_RETRIES = 1000
+
+# 默认分组的compose结果写为 ("compose", "USDT/JPY")，其他分组为 ("compose:<分组>", "USDT/JPY")
+COMPOSE_VENUE = "compose"
+COMPOSE_SYMBOL = "USDT/JPY"
+
+
+class TableQuote(NamedTuple):
+    venue: str
+    symbol: str
+    bid: float
+    ask: float
+    last: float
+    ts: int
+    bid_qty: float
+    ask_qty: float
+    volume: float
+    change_percent: float
+    written_at: float
+
+
+class TableBusy(Exception):
+    """槽位一直在写入，且之前没有一致读取过"""
+
+
+def _encode(name: str) -> Optional[bytes]:
+    data = name.encode("utf-8")
+    return data if len(data) <= NAME_SIZE else None
+
+
+def _decode(data: bytes) -> str:
+    return data.rstrip(b"\0").decode("utf-8", "replace")
+
+
+def _slot_offset(index: int) -> int:
+    return HEADER_SIZE + index * SLOT_SIZE
+
+
+class QuoteTableWriter:
+    """写入方（单进程单线程写入）"""
+
+    def __init__(self, path: str, slots: int):
+        self.path = path
+        self.slots = slots
+        self.size = HEADER_SIZE + slots * SLOT_SIZE
+        self._index: Dict[Tuple[str, str], int] = {}
+        self._seqs = [0] * slots
+        self._mm = self._open()
+
+    def _open(self) -> mmap.mmap:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path) and os.path.getsize(self.path) != self.size:
+            # 大小变化时换成新文件，已映射旧文件的读取方看到写入进程已退出后重新打开
+            self._mark_closed(self.path)
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.truncate(self.size)
+            os.replace(tmp, self.path)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, self.size)
+            mm = mmap.mmap(fd, self.size, access=mmap.ACCESS_WRITE)
+        finally:
+            os.close(fd)
+        mm[:] = bytes(self.size)
+        HEADER.pack_into(mm, 0, MAGIC, LAYOUT_VERSION, HEADER_SIZE, SLOT_SIZE, self.slots, 0,
+                         time.time_ns(), os.getpid())
+        return mm
+
+    @staticmethod
+    def _mark_closed(path: str):
+        try:
+            with open(path, "r+b") as f:
+                f.seek(PID_OFFSET)
+                f.write(struct.pack("<I", 0))
+        except OSError:
+            pass
+
+    @property
+    def used(self) -> int:
+        return len(self._index)
+
+    def write(self, venue: str, symbol: str, bid: float, ask: float, last: float, ts: int,
+              bid_qty: float = 0.0, ask_qty: float = 0.0, volume: float = 0.0,
+              change_percent: float = 0.0) -> bool:
+        """
+        写入一条行情
+
+        Returns:
+            槽位已满或名称超过24字节时为False
+        """
+        key = (venue, symbol)
+        index = self._index.get(key)
+        if index is None:
+            if len(self._index) >= self.slots:
+                return False
+            venue_bytes, symbol_bytes = _encode(venue), _encode(symbol)
+            if venue_bytes is None or symbol_bytes is None:
+                return False
+            index = len(self._index)
+        else:
+            venue_bytes, symbol_bytes = venue.encode("utf-8"), symbol.encode("utf-8")
+
+        mm = self._mm
+        offset = _slot_offset(index)
+        seq = self._seqs[index] + 1
+        SEQ.pack_into(mm, offset, seq)
+        BODY.pack_into(mm, offset + SEQ.size, venue_bytes, symbol_bytes, int(ts),
+                       bid, ask, last, bid_qty, ask_qty, volume, change_percent, time.time())
+        SEQ.pack_into(mm, offset, seq + 1)
+        self._seqs[index] = seq + 1
+
+        if key not in self._index:
+            self._index[key] = index
+            struct.pack_into("<I", mm, USED_OFFSET, len(self._index))
+        return True
+
+    def close(self):
+        """标记写入进程已退出（数据保留，读取方仍可读取最后的值）"""
+        if self._mm is None:
+            return
+        struct.pack_into("<I", self._mm, PID_OFFSET, 0)
+        self._mm.flush()
+        self._mm.close()
+        self._mm = None
+
+
+class QuoteTableReader:
+    """读取方，不加锁、不复制整个文件，每次读取只解析一个槽位"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mm: Optional[mmap.mmap] = None
+        self._open()
+
+    def _open(self):
+        with open(self.path, "rb") as f:
+            self._inode = os.fstat(f.fileno()).st_ino
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_size, slot_size, slots, _, generation, _ = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION or header_size != HEADER_SIZE or slot_size != SLOT_SIZE:
+            mm.close()
+            raise ValueError(f"Unsupported quote table: {self.path}")
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = mm
+        self.slots = slots
+        self.generation = generation
+        self._reset()
+
+    def _reset(self):
+        self._index: Dict[Tuple[str, str], int] = {}
+        self._scanned = 0
+        # 槽位 -> 上一次一致读取的值
+        self._last: Dict[int, TableQuote] = {}
+
+    @property
+    def live(self) -> bool:
+        """写入进程是否仍在运行（正常退出时PID清零，崩溃时按PID检查进程是否存在）"""
+        pid = struct.unpack_from("<I", self._mm, PID_OFFSET)[0]
+        if pid == 0:
+            return False
+        if os.name != "posix":
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            # 进程存在但属于其他用户
+            return True
+        return True
+
+    def _check(self):
+        """写入进程重启后重新建立索引，文件被替换时重新映射"""
+        if not self.live:
+            try:
+                if os.stat(self.path).st_ino != self._inode:
+                    self._open()
+                    return
+            except OSError:
+                return
+        generation = struct.unpack_from("<q", self._mm, GENERATION_OFFSET)[0]
+        if generation != self.generation:
+            self.generation = generation
+            self._reset()
+
+    def _scan(self):
+        used = min(struct.unpack_from("<I", self._mm, USED_OFFSET)[0], self.slots)
+        for index in range(self._scanned, used):
+            try:
+                quote = self.read_slot(index)
+            except TableBusy:
+                quote = None
+            if quote is None:
+                # 槽位尚未写完，下次再扫描
+                break
+            self._index[(quote.venue, quote.symbol)] = index
+            self._scanned = index + 1
+
+    def read_slot(self, index: int) -> Optional[TableQuote]:
+        """
+        一致地读取一个槽位，槽位为空时为None
+
+        一直在写入时返回该槽位上一次一致读取的值（written_at 不变）
+
+        Raises:
+            TableBusy: 一直在写入，且之前没有一致读取过该槽位
+        """
+        mm = self._mm
+        offset = _slot_offset(index)
+        for _ in range(READ_RETRIES):
+            before = SEQ.unpack_from(mm, offset)[0]
+            if before & 1:
+                continue
+            body = BODY.unpack_from(mm, offset + SEQ.size)
+            if SEQ.unpack_from(mm, offset)[0] == before:
+                if before == 0:
+                    return None
+                venue, symbol, ts, bid, ask, last, bid_qty, ask_qty, volume, change_percent, written_at = body
+                quote = TableQuote(_decode(venue), _decode(symbol), bid, ask, last, ts,
+                                   bid_qty, ask_qty, volume, change_percent, written_at)
+                self._last[index] = quote
+                return quote
+        quote = self._last.get(index)
+        if quote is None:
+            raise TableBusy(f"Slot {index} is being written")
+        return quote
+
+    def get(self, venue: str, symbol: str) -> Optional[TableQuote]:
+        """
+        读取一条行情，不存在时为None
+
+        Raises:
+            TableBusy: 见 read_slot
+        """
+        self._check()
+        key = (venue, symbol)
+        index = self._index.get(key)
+        if index is None:
+            self._scan()
+            index = self._index.get(key)
+            if index is None:
+                return None
+        quote = self.read_slot(index)
+        if quote is None or (quote.venue, quote.symbol) != key:
+            # 写入进程重启后槽位已重新分配
+            self._reset()
+            return None
+        return quote
+
+    def get_compose(self, group: Optional[str] = None) -> Optional[TableQuote]:
+        """读取分组的USDT/JPY组合价格（默认分组为None）"""
+        venue = COMPOSE_VENUE if group is None else f"{COMPOSE_VENUE}:{group}"
+        return self.get(venue, COMPOSE_SYMBOL)
+
+    def all(self) -> List[TableQuote]:
+        """读取所有已写入的行情"""
+        self._check()
+        self._scan()
+        quotes = []
+        for index in range(self._scanned):
+            try:
+                quote = self.read_slot(index)
+            except TableBusy:
+                continue
+            if quote is not None:
+                quotes.append(quote)
+        return quotes
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    # python quote_table.py <文件>：打印当前所有行情
+    with QuoteTableReader(sys.argv[1]) as table:
+        now = time.time()
+        for q in table.all():
+            print(f"{q.venue:<24} {q.symbol:<16} bid={q.bid:<16g} ask={q.ask:<16g} last={q.last:<16g} "
+                  f"age={now - q.written_at:.3f}s")
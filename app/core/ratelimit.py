@@ -0,0 +1,77 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    令牌桶限流
+
+    每秒补充 rate 个令牌，最多积累 burst 个；令牌不足时等待到下一个令牌可用。
+    只在事件循环内使用，检查和扣减之间没有await，不需要加锁。
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        """有令牌时取一个并返回True，否则立即返回False"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def acquire(self, timeout: Optional[float] = None) -> float:
+        """
+        取一个令牌
+
+        Args:
+            timeout: 最长等待秒数，为None时一直等待
+        Returns:
+            等待的秒数
+        Raises:
+            asyncio.TimeoutError: 下一个令牌在 timeout 之后才可用（立即抛出，不等待）
+        """
+        waited = 0.0
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return waited
+            delay = (1 - self.tokens) / self.rate
+            if timeout is not None and waited + delay > timeout:
+                raise asyncio.TimeoutError(f"Next token is available in {delay:.3f}s")
+            waited += delay
+            await asyncio.sleep(delay)
+
+
+class HedgeBudget:
+    """
+    对冲请求预算
+
+    每个正常请求存入 ratio 个令牌（最多积累 burst 个），每个对冲请求消耗1个，
+    对冲请求数因此不超过正常请求数的 ratio 倍，上游变慢时不会因对冲而负载翻倍。
+    """
+
+    def __init__(self, ratio: float, burst: int):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = float(burst)
+
+    def deposit(self):
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
@@ -3,10 +3,26 @@ from fastapi.middleware.cors import CORSMiddleware
 from core.config import settings
 from api.v1.api import api_router
 import uvicorn
-from core.logging import logger
+from core.logging import logger, RequestIdMiddleware
+from core.diagnostics import RouteTimingMiddleware, loop_watchdog
+from core.admission import AdmissionMiddleware
 import asyncio
 from services.scheduler_service import SchedulerService
-from api.v1.endpoints.crypto import get_compose_price_by_period
+from services.market_data_service import MarketDataService
+from services.instrument_service import InstrumentService
+from services.exchange_adapter import SessionPool
+from services.alert_service import AlertService
+from services.spread_service import SpreadService
+from services.leg_refresh_service import LegRefreshService, parse_legs
+from services.consensus_service import ConsensusService
+from services.compose_service import ComposeService
+from services.dashboard_service import DashboardService
+from services.compose_graph_service import ComposeGraphService
+from services.stats_service import StatsService
+from services.snapshot_service import SnapshotService
+from services.quote_table_service import QuoteTableService
+from services.bot_command_service import BotCommandService
+from services.replication_service import ReplicationService
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -26,6 +42,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 按路由统计请求耗时
+if settings.DIAG_ROUTE_TIMING:
+    app.add_middleware(RouteTimingMiddleware)
+
+# 准入控制：并发上限、排队和过载时返回503
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
+# 请求关联ID
+app.add_middleware(RequestIdMiddleware)
+
 # 注册路由
 app.include_router(api_router)
 
@@ -34,23 +61,104 @@ scheduler_service = SchedulerService()
 
 @app.on_event("startup")
 async def startup_event():
+    # 只读节点的行情、倍率配置和交易对列表都来自主节点，不请求上游、不发送通知
+    replica = settings.NODE_ROLE == "replica"
+    # 多交易所共识价格，随行情变化同步更新；compose的行情经共识价格校验
+    ConsensusService()
+    # 跨交易所价差监控，监控列表中的行情由后台刷新保持新鲜（spreads 任务类型可立即拉取整个列表）
+    scheduler_service.register_kind("spreads", SpreadService().poll)
+    leg_refresh = LegRefreshService()
+    leg_refresh.register("spreads", parse_legs(settings.SPREAD_WATCHLIST), settings.SPREAD_POLL_SECONDS)
+    # 共识价格需要的其他交易所行情（compose行情被剔除或请求失败时的替代）
+    leg_refresh.register("consensus", parse_legs(settings.CONSENSUS_SOURCES), settings.CONSENSUS_REFRESH_SECONDS)
+    # 看板展示的行情在超过 DASHBOARD_STALE_SECONDS 标记为过期之前重新拉取
+    leg_refresh.register("dashboard", DashboardService().legs, settings.DASHBOARD_STALE_SECONDS / 2)
+    # 主节点的行情即只读节点的数据来源，没有请求时也保持compose行情和价差监控列表新鲜
+    if settings.NODE_ROLE == "leader":
+        leader_legs = parse_legs(settings.SPREAD_WATCHLIST)
+        leader_legs += [leg for leg in ComposeService.LEGS if leg not in leader_legs]
+        leg_refresh.register("leader", leader_legs, settings.LEADER_REFRESH_SECONDS)
+    scheduler_service.register_kind("leg_refresh", leg_refresh.refresh)
+    if not replica:
+        scheduler_service.add_default_schedule("leg_refresh", {
+            "kind": "leg_refresh",
+            "interval_seconds": settings.LEG_REFRESH_TICK_SECONDS
+        })
+    # compose结果随行情变化增量计算，倍率配置变化由周期任务检查
+    compose_graph = ComposeGraphService()
+    await compose_graph.sync_powers()
+    scheduler_service.register_kind("compose_graph", compose_graph.sync_powers)
+    scheduler_service.add_default_schedule("compose_power_sync", {
+        "kind": "compose_graph",
+        "interval_seconds": settings.COMPOSE_POWER_SYNC_SECONDS
+    })
+    # 行情和USDT/JPY的滚动统计
+    StatsService()
+    # 恢复上次运行的状态快照（依赖行情的服务已创建，会收到恢复的行情），并定期保存
+    snapshot_service = SnapshotService()
+    snapshot_enabled = settings.SNAPSHOT_ENABLED and not replica
+    restored = await snapshot_service.restore() if snapshot_enabled else False
+    if snapshot_enabled:
+        scheduler_service.register_kind("snapshot", snapshot_service.save)
+        scheduler_service.add_default_schedule("state_snapshot", {
+            "kind": "snapshot",
+            "interval_seconds": settings.SNAPSHOT_INTERVAL_SECONDS
+        })
+    # 本机其他进程读取的共享内存行情表（包含恢复的行情）
+    if settings.QUOTE_TABLE_ENABLED:
+        QuoteTableService().start()
+    # 加载交易对注册表，并定期刷新；已从快照恢复时在后台刷新
+    instrument_service = InstrumentService()
+    scheduler_service.register_kind("instruments", instrument_service.refresh)
+    if not replica:
+        if restored:
+            asyncio.create_task(instrument_service.refresh())
+        else:
+            await instrument_service.refresh()
+        scheduler_service.add_default_schedule("instrument_refresh", {
+            "kind": "instruments",
+            "interval_seconds": settings.INSTRUMENT_REFRESH_MINUTES * 60
+        })
+    # 主节点发布数据 / 只读节点同步主节点的数据
+    await ReplicationService().start()
+    # 看板快照，后台定期重建
+    scheduler_service.register_kind("dashboard", DashboardService().rebuild)
+    scheduler_service.add_default_schedule("dashboard_rebuild", {
+        "kind": "dashboard",
+        "interval_seconds": settings.DASHBOARD_REFRESH_SECONDS
+    })
     # 启动调度器
     scheduler_service.start()
-    # 注册定时任务
-    scheduler_service.add_job(
-        get_compose_price_by_period,
-        'interval',
-        minutes=settings.PRICE_BROADCAST_INTERVAL,
-        id='price_broadcast'
-        # ,args=[1]  # 这里传入group_id参数，根据实际需求修改值
-    )
+    # 注册周期任务（广播、预热等，配置见 core/scheduler_config.json），只读节点不广播
+    if not replica:
+        scheduler_service.load_schedules()
     logger.info("Scheduler service started")
+    # 启动价格提醒通知发送
+    if not replica:
+        AlertService().start()
+    # 响应Telegram用户命令
+    if settings.TG_COMMANDS_ENABLED and not replica:
+        await BotCommandService().start()
+    if settings.DIAG_LOOP_WATCHDOG:
+        loop_watchdog.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     # 关闭调度器
     scheduler_service.shutdown()
     logger.info("Scheduler service stopped")
+    await AlertService().stop()
+    await BotCommandService().stop()
+    await ReplicationService().stop()
+    loop_watchdog.stop()
+    # 保存最终状态，下次启动时恢复
+    if settings.SNAPSHOT_ENABLED and settings.NODE_ROLE != "replica":
+        await SnapshotService().save()
+    QuoteTableService().stop()
+    # 关闭交易所连接池
+    await SessionPool.close_all()
+    # 关闭行情录制文件
+    MarketDataService().close()
 
 # 健康检查
 @app.get("/health")
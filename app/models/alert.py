@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class AlertRule(BaseModel):
+    id: str = None
+    kind: str  # 规则类型: above（上穿）, below（下穿）, move（窗口内涨跌幅%）, divergence（OKJ与Google价差%）
+    exchange: str = "compose"  # 交易所，compose 表示组合计算的USDT/JPY
+    symbol: str = "USDT/JPY"  # 交易对，任意写法，保存为 BASE/QUOTE
+    threshold: float  # 阈值（价格或百分比）
+    window_seconds: Optional[float] = None  # move规则的统计窗口（秒）
+    hysteresis: float = 0.0  # 触发后需回落（或回升）超过该幅度才会再次触发，单位同threshold
+    cooldown_seconds: float = 60.0  # 两次触发的最小间隔（秒）
+    chat_id: Optional[str] = None  # 通知的Telegram会话，默认为 TG_GID
+    note: Optional[str] = None  # 附加在通知中的备注
+    enabled: bool = True
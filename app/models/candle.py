@@ -0,0 +1,5 @@
+from typing import Tuple
+
+# K线: (开盘时间毫秒, 开盘价, 最高价, 最低价, 收盘价, 成交量)
+# 回补时数量很大，使用元组而不是对象以减少内存并直接批量写入数据库
+Candle = Tuple[int, float, float, float, float, float]
@@ -0,0 +1,102 @@
+from datetime import datetime
+from typing import Optional, Tuple
+from models.consensus import ConsensusPrice
+from models.quote import EXCHANGE_NAMES, Quote
+
+
+class ComposeResult:
+    """USDT/JPY组合计算结果，legs中的价格已乘以倍率"""
+    __slots__ = (
+        "bid", "ask", "last", "spread_percent", "google_last",
+        "btc_usdt", "btc_jpy", "btc_jpy_google", "power", "ts", "consensus", "consensus_last", "restored"
+    )
+
+    def __init__(self, bid: float, ask: float, last: float, spread_percent: float, google_last: float,
+                 btc_usdt: Quote, btc_jpy: Quote, btc_jpy_google: Quote, power: float, ts: int):
+        self.bid = bid
+        self.ask = ask
+        self.last = last
+        self.spread_percent = spread_percent
+        self.google_last = google_last
+        self.btc_usdt = btc_usdt
+        self.btc_jpy = btc_jpy
+        self.btc_jpy_google = btc_jpy_google
+        self.power = power
+        self.ts = ts
+        # 共识价格 (BTC/USDT, BTC/JPY)，未倍率调整；及由其计算的USDT/JPY
+        self.consensus: Optional[Tuple[ConsensusPrice, ConsensusPrice]] = None
+        self.consensus_last: Optional[float] = None
+        # 是否使用了从状态快照恢复、重启后还没有更新的行情
+        self.restored = False
+
+    @property
+    def calculated_at(self) -> datetime:
+        return datetime.fromtimestamp(self.ts / 1000)
+
+    def _consensus_dict(self) -> Optional[dict]:
+        if self.consensus is None:
+            return None
+        section = {"usdt_jpy": {"last_price": self.consensus_last}}
+        for name, price in zip(("btc_usdt", "btc_jpy"), self.consensus):
+            section[name] = {
+                "price": price.price * self.power,
+                "used": price.used,
+                "rejected": price.rejected
+            }
+        return section
+
+    # to_row 的字段顺序（二进制接口），三条行情为 Quote.ROW_FIELDS 数组，只允许在末尾追加
+    ROW_FIELDS = (
+        "bid", "ask", "last", "spread_percent", "google_last", "consensus_last",
+        "power", "ts", "btc_usdt", "btc_jpy", "btc_jpy_google"
+    )
+
+    def to_row(self) -> list:
+        """按 ROW_FIELDS 顺序的数组，时间为毫秒整数"""
+        return [
+            self.bid, self.ask, self.last, self.spread_percent, self.google_last, self.consensus_last,
+            self.power, self.ts, self.btc_usdt.to_row(), self.btc_jpy.to_row(), self.btc_jpy_google.to_row()
+        ]
+
+    def to_dict(self) -> dict:
+        btc_usdt, btc_jpy, btc_jpy_google = self.btc_usdt, self.btc_jpy, self.btc_jpy_google
+        return {
+            "usdt_jpy": {
+                "bid_price": self.bid,
+                "ask_price": self.ask,
+                "last_price": self.last,
+                "spread_percent": self.spread_percent
+            },
+            "usdt_jpy_google": {
+                "last_price": self.google_last
+            },
+            "source_data": {
+                "btc_usdt": {
+                    "bid_price": btc_usdt.bid,
+                    "ask_price": btc_usdt.ask,
+                    "last_price": btc_usdt.last,
+                    "change_percent_24h": btc_usdt.change_percent,
+                    "exchange": EXCHANGE_NAMES.get(btc_usdt.exchange, btc_usdt.exchange),
+                    "timestamp": btc_usdt.legacy_timestamp
+                },
+                "btc_jpy": {
+                    "bid_price": btc_jpy.bid,
+                    "ask_price": btc_jpy.ask,
+                    "last_price": btc_jpy.last,
+                    "change_percent_24h": btc_jpy.change_percent,
+                    "exchange": EXCHANGE_NAMES.get(btc_jpy.exchange, btc_jpy.exchange),
+                    "timestamp": btc_jpy.legacy_timestamp
+                },
+                "btc_jpy_google": {
+                    "last_price": btc_jpy_google.last,
+                    # Google行情被共识价格剔除时为替代的交易所行情
+                    "exchange": "Google" if btc_jpy_google.exchange == "google"
+                    else EXCHANGE_NAMES.get(btc_jpy_google.exchange, btc_jpy_google.exchange),
+                    "timestamp": btc_jpy_google.legacy_timestamp
+                }
+            },
+            "consensus": self._consensus_dict(),
+            "restored": self.restored,
+            "calculation_time": self.calculated_at.isoformat(),
+            "power_multiplier": self.power
+        }
@@ -0,0 +1,61 @@
+from typing import List
+
+
+class ConsensusSource:
+    """参与共识计算的一条行情"""
+    __slots__ = ("exchange", "price", "age", "weight", "used")
+
+    def __init__(self, exchange: str, price: float, age: float, weight: float, used: bool = True):
+        self.exchange = exchange
+        self.price = price
+        self.age = age
+        self.weight = weight
+        self.used = used
+
+    def to_dict(self) -> dict:
+        return {
+            "exchange": self.exchange,
+            "price": self.price,
+            "age_seconds": round(self.age, 3),
+            "weight": round(self.weight, 4),
+            "used": self.used
+        }
+
+
+class ConsensusPrice:
+    """
+    多个交易所行情的共识价格
+
+    method 为剔除离群值的方式："mad"（按中位数绝对偏差）或 "reference"（行情太少时与参考价格比较）
+    """
+    __slots__ = ("symbol", "price", "median", "mad", "sources", "ts", "method")
+
+    def __init__(self, symbol: str, price: float, median: float, mad: float,
+                 sources: List[ConsensusSource], ts: int, method: str = "mad"):
+        self.symbol = symbol
+        self.price = price
+        self.median = median
+        self.mad = mad
+        self.sources = sources
+        self.ts = ts
+        self.method = method
+
+    @property
+    def used(self) -> List[str]:
+        return [s.exchange for s in self.sources if s.used]
+
+    @property
+    def rejected(self) -> List[str]:
+        return [s.exchange for s in self.sources if not s.used]
+
+    def to_dict(self) -> dict:
+        return {
+            "symbol": self.symbol,
+            "price": self.price,
+            "median": self.median,
+            "mad": self.mad,
+            "method": self.method,
+            "used": self.used,
+            "rejected": self.rejected,
+            "sources": [s.to_dict() for s in self.sources]
+        }
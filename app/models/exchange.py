@@ -0,0 +1,10 @@
+from enum import Enum
+
+
+class Exchange(str, Enum):
+    BINANCE = "binance"
+    OKX = "okx"
+    OKJ = "okj"
+    GOOGLE = "google"
+    BITFLYER = "bitflyer"
+    COINCHECK = "coincheck"
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class BackfillRequest(BaseModel):
+    venue: str  # 交易所（binance, okx, okj）
+    symbols: List[str]  # 交易对，任意写法
+    interval_seconds: int = 60  # K线周期（秒）
+    start: int  # 开始时间（毫秒时间戳）
+    end: Optional[int] = None  # 结束时间（毫秒时间戳），默认为当前时间
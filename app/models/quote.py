@@ -0,0 +1,143 @@
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+# 交易所显示名称
+EXCHANGE_NAMES = {
+    "binance": "Binance",
+    "okx": "OKX",
+    "okj": "OKJ",
+    "google": "Google Finance",
+    "bitflyer": "bitFlyer",
+    "coincheck": "Coincheck",
+}
+
+
+class Quote:
+    """
+    单条行情
+
+    价格和数量保存为float，时间为毫秒时间戳（int）。
+    只在接口层通过 to_dict 转换为JSON格式。
+    """
+    __slots__ = (
+        "exchange", "symbol", "bid", "bid_qty", "ask", "ask_qty",
+        "last", "volume", "change", "change_percent", "ts"
+    )
+
+    def __init__(self, exchange: str, symbol: str, bid: float, ask: float, last: float, ts: int,
+                 bid_qty: float = 0.0, ask_qty: float = 0.0, volume: float = 0.0,
+                 change: float = 0.0, change_percent: float = 0.0):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.bid = bid
+        self.bid_qty = bid_qty
+        self.ask = ask
+        self.ask_qty = ask_qty
+        self.last = last
+        self.volume = volume
+        self.change = change
+        self.change_percent = change_percent
+        self.ts = ts
+
+    def same_price(self, other: Optional["Quote"]) -> bool:
+        return other is not None and self.bid == other.bid and self.ask == other.ask and self.last == other.last
+
+    @property
+    def timestamp(self) -> str:
+        return datetime.fromtimestamp(self.ts / 1000).isoformat()
+
+    @property
+    def legacy_timestamp(self) -> str:
+        """原有响应中的时间格式：OKJ为交易所返回的UTC时间（例如 2024-01-01T00:00:00.000Z），其他为本地时间"""
+        if self.exchange == "okj":
+            return datetime.fromtimestamp(self.ts / 1000, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        return self.timestamp
+
+    def to_dict(self) -> dict:
+        return {
+            "symbol": self.symbol,
+            "exchange": EXCHANGE_NAMES.get(self.exchange, self.exchange),
+            "bid_price": self.bid,
+            "bid_qty": self.bid_qty,
+            "ask_price": self.ask,
+            "ask_qty": self.ask_qty,
+            "last_price": self.last,
+            "volume_24h": self.volume,
+            "timestamp": self.timestamp,
+            "price_change_24h": self.change,
+            "price_change_percent": self.change_percent
+        }
+
+    def to_legacy_dict(self, symbol: str) -> dict:
+        """
+        /crypto/price 的原有响应格式（各交易所不同）
+
+        交易对为请求时的写法（Binance为大写）；Binance没有exchange字段，成交量字段为volume；
+        时间格式见 legacy_timestamp
+        """
+        data = self.to_dict()
+        data["symbol"] = symbol
+        if self.exchange == "binance":
+            data = {("volume" if k == "volume_24h" else k): v for k, v in data.items() if k != "exchange"}
+            data["symbol"] = symbol.upper()
+        data["timestamp"] = self.legacy_timestamp
+        return data
+
+    # to_row 的字段顺序（二进制接口），只允许在末尾追加
+    ROW_FIELDS = (
+        "exchange", "symbol", "bid", "ask", "last", "ts",
+        "bid_qty", "ask_qty", "volume", "change", "change_percent"
+    )
+
+    def to_row(self) -> list:
+        """按 ROW_FIELDS 顺序的数组，时间为毫秒整数"""
+        return [
+            self.exchange, self.symbol, self.bid, self.ask, self.last, self.ts,
+            self.bid_qty, self.ask_qty, self.volume, self.change, self.change_percent
+        ]
+
+    @classmethod
+    def from_row(cls, row: list) -> "Quote":
+        """从 to_row 的结果还原"""
+        exchange, symbol, bid, ask, last, ts, bid_qty, ask_qty, volume, change, change_percent = row[:11]
+        return cls(exchange, symbol, bid, ask, last, ts, bid_qty=bid_qty, ask_qty=ask_qty,
+                   volume=volume, change=change, change_percent=change_percent)
+
+    @classmethod
+    def from_dict(cls, exchange: str, data: dict) -> "Quote":
+        """从 to_dict 的结果还原（用于读取磁盘缓存）"""
+        return cls(
+            exchange,
+            data["symbol"],
+            data["bid_price"],
+            data["ask_price"],
+            data["last_price"],
+            int(datetime.fromisoformat(data["timestamp"]).timestamp() * 1000),
+            bid_qty=data.get("bid_qty", 0.0),
+            ask_qty=data.get("ask_qty", 0.0),
+            volume=data.get("volume_24h", 0.0),
+            change=data.get("price_change_24h", 0.0),
+            change_percent=data.get("price_change_percent", 0.0)
+        )
+
+
+class OrderBook:
+    """盘口深度，bids按价格从高到低，asks按价格从低到高，每档为 (价格, 数量)"""
+    __slots__ = ("exchange", "symbol", "bids", "asks", "ts")
+
+    def __init__(self, exchange: str, symbol: str, bids: List[Tuple[float, float]],
+                 asks: List[Tuple[float, float]], ts: int):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.bids = bids
+        self.asks = asks
+        self.ts = ts
+
+    def to_dict(self) -> dict:
+        return {
+            "symbol": self.symbol,
+            "exchange": EXCHANGE_NAMES.get(self.exchange, self.exchange),
+            "bids": [list(level) for level in self.bids],
+            "asks": [list(level) for level in self.asks],
+            "timestamp": datetime.fromtimestamp(self.ts / 1000).isoformat()
+        }
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class ScheduleConfig(BaseModel):
+    kind: str  # 任务类型: broadcast（分组广播）, warm（预热compose缓存）
+    group: Optional[str] = None  # 价格倍率分组
+    interval_seconds: Optional[float] = None  # 执行间隔（秒），支持小数
+    cron: Optional[str] = None  # crontab表达式，与interval_seconds二选一
+    timeout_seconds: Optional[float] = None  # 单次执行超时（秒）
+    jitter_seconds: Optional[float] = None  # 启动随机抖动上限（秒）
@@ -0,0 +1,455 @@
+import asyncio
+import bisect
+import json
+import random
+import string
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+import aiofiles
+from fastapi import HTTPException
+from core.config import settings
+from core.logging import logger
+from core.metrics import LatencyHistogram
+from models.alert import AlertRule
+from models.quote import Quote, EXCHANGE_NAMES
+from services.compose_service import ComposeService
+from services.instrument_service import InstrumentService
+from services.quote_cache_service import QuoteCacheService
+from services.telegram_service import TelegramService
+from services.template_service import TemplateService
+
+# 规则类型
+KINDS = ("above", "below", "move", "divergence")
+# 组合计算的USDT/JPY
+COMPOSE = ("compose", "USDT/JPY")
+# OKJ与Google的BTC/JPY价差序列
+DIVERGENCE_KEY = COMPOSE + ("divergence",)
+
+
+class _LevelIndex:
+    """按阈值排序的规则索引，只返回本次价格变化穿过的规则"""
+    __slots__ = ("levels", "ids")
+
+    def __init__(self):
+        self.levels: List[float] = []
+        self.ids: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, level: float, rule_id: str):
+        i = bisect.bisect_right(self.levels, level)
+        self.levels.insert(i, level)
+        self.ids.insert(i, rule_id)
+
+    def remove(self, level: float, rule_id: str):
+        i = bisect.bisect_left(self.levels, level)
+        while i < len(self.ids) and self.levels[i] == level:
+            if self.ids[i] == rule_id:
+                del self.levels[i]
+                del self.ids[i]
+                return
+            i += 1
+
+    def crossed(self, prev: float, value: float) -> List[str]:
+        """上涨时返回 (prev, value] 内的规则，下跌时返回 [value, prev) 内的规则"""
+        if value > prev:
+            lo = bisect.bisect_right(self.levels, prev)
+            hi = bisect.bisect_right(self.levels, value)
+        else:
+            lo = bisect.bisect_left(self.levels, value)
+            hi = bisect.bisect_left(self.levels, prev)
+        return self.ids[lo:hi]
+
+
+class _Series:
+    """一条被监控的数值序列（价格、窗口涨跌幅或价差）及其上的规则索引"""
+    __slots__ = ("value", "up", "up_rearm", "down", "down_rearm")
+
+    def __init__(self):
+        self.value: Optional[float] = None
+        # 上穿触发的规则及其重新启用的位置（阈值 - 回差）
+        self.up = _LevelIndex()
+        self.up_rearm = _LevelIndex()
+        # 下穿触发的规则及其重新启用的位置（阈值 + 回差）
+        self.down = _LevelIndex()
+        self.down_rearm = _LevelIndex()
+
+    def __len__(self) -> int:
+        return len(self.up) + len(self.down)
+
+
+class _MoveWindow:
+    """滑动窗口内的最高/最低价（单调队列），用于计算窗口内涨跌幅"""
+    __slots__ = ("window", "mins", "maxs")
+
+    def __init__(self, window: float):
+        self.window = window
+        self.mins: Deque[Tuple[float, float]] = deque()
+        self.maxs: Deque[Tuple[float, float]] = deque()
+
+    def update(self, now: float, price: float) -> float:
+        """加入最新价格，返回相对窗口内最低价或最高价的最大变动（%）"""
+        mins, maxs = self.mins, self.maxs
+        while mins and mins[-1][1] >= price:
+            mins.pop()
+        mins.append((now, price))
+        while maxs and maxs[-1][1] <= price:
+            maxs.pop()
+        maxs.append((now, price))
+        start = now - self.window
+        while mins[0][0] < start:
+            mins.popleft()
+        while maxs[0][0] < start:
+            maxs.popleft()
+        low, high = mins[0][1], maxs[0][1]
+        return max((price - low) / low, (high - price) / high) * 100
+
+
+class AlertService:
+    """
+    价格提醒
+
+    规则按监控序列分组，每组内按阈值排序。每次价格变化只用二分查找取出
+    被穿过的阈值区间内的规则，与规则总数无关。触发后规则停用，
+    直到数值回到阈值另一侧超过回差（hysteresis）才重新启用，并受冷却时间限制。
+    通知通过队列异步发送到Telegram，不阻塞行情处理。
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self.rules_file = Path(settings.DATA_DIR) / settings.ALERT_RULES_FILE
+        self._rules: Dict[str, AlertRule] = {}
+        # (交易所, 交易对, 指标[, 窗口]) -> 序列
+        self._series: Dict[tuple, _Series] = {}
+        # (交易所, 交易对) -> 窗口秒数 -> 窗口
+        self._windows: Dict[Tuple[str, str], Dict[float, _MoveWindow]] = {}
+        self._armed: Dict[str, bool] = {}
+        self._last_fired: Dict[str, float] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.history: Deque[dict] = deque(maxlen=settings.ALERT_HISTORY_SIZE)
+        self.stats = {"ticks": 0, "fired": 0, "suppressed": 0, "dropped": 0, "delivered": 0, "failed": 0}
+        self.evaluation = LatencyHistogram()
+        self._load()
+        QuoteCacheService().add_listener(self.on_quote)
+
+    # ---- 规则管理 ----
+
+    def _load(self):
+        if not self.rules_file.exists():
+            return
+        try:
+            with open(self.rules_file, 'r') as f:
+                data = json.load(f)
+            for item in data.get("rules", []):
+                self._add(AlertRule(**item))
+            logger.info("Loaded %s alert rule(s)", len(self._rules))
+        except Exception as e:
+            logger.error("Failed to load alert rules: %s", e)
+
+    async def _persist(self):
+        try:
+            self.rules_file.parent.mkdir(parents=True, exist_ok=True)
+            data = {"rules": [rule.dict() for rule in self._rules.values()]}
+            async with aiofiles.open(self.rules_file, 'w') as f:
+                await f.write(json.dumps(data, indent=2, ensure_ascii=False))
+        except Exception as e:
+            logger.error("Failed to write alert rules: %s", e)
+            raise HTTPException(
+                status_code=500,
+                detail="Failed to write alert rules"
+            )
+
+    @staticmethod
+    def _generate_random_id() -> str:
+        characters = string.ascii_letters + string.digits
+        return ''.join(random.choices(characters, k=6))
+
+    def _normalize(self, rule: AlertRule) -> AlertRule:
+        """校验规则并统一交易所和交易对写法"""
+        if rule.kind not in KINDS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid alert kind: {rule.kind}, expected one of {', '.join(KINDS)}"
+            )
+        if rule.hysteresis < 0 or rule.cooldown_seconds < 0:
+            raise HTTPException(
+                status_code=400,
+                detail="hysteresis and cooldown_seconds must not be negative"
+            )
+        if rule.kind == "divergence":
+            rule.exchange, rule.symbol = COMPOSE
+        else:
+            rule.exchange = rule.exchange.lower()
+            if rule.exchange == COMPOSE[0]:
+                rule.symbol = InstrumentService().canonical(rule.symbol)
+                if rule.symbol != COMPOSE[1]:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Only {COMPOSE[1]} is available for exchange {COMPOSE[0]}"
+                    )
+            elif rule.exchange in EXCHANGE_NAMES:
+                rule.symbol = InstrumentService().resolve(rule.exchange, rule.symbol).canonical
+            else:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid exchange: {rule.exchange}"
+                )
+        if rule.kind == "move":
+            if not rule.window_seconds or rule.window_seconds <= 0 or rule.threshold <= 0:
+                raise HTTPException(
+                    status_code=400,
+                    detail="move rules require positive window_seconds and threshold"
+                )
+        else:
+            rule.window_seconds = None
+        return rule
+
+    @staticmethod
+    def _series_key(rule: AlertRule) -> tuple:
+        if rule.kind == "divergence":
+            return DIVERGENCE_KEY
+        if rule.kind == "move":
+            return (rule.exchange, rule.symbol, "move", rule.window_seconds)
+        return (rule.exchange, rule.symbol, "last")
+
+    def _add(self, rule: AlertRule):
+        self._rules[rule.id] = rule
+        self._armed[rule.id] = True
+        if not rule.enabled:
+            return
+        key = self._series_key(rule)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series()
+            if rule.kind == "move":
+                windows = self._windows.setdefault(key[:2], {})
+                windows[rule.window_seconds] = _MoveWindow(rule.window_seconds)
+        if rule.kind == "below":
+            series.down.add(rule.threshold, rule.id)
+            series.down_rearm.add(rule.threshold + rule.hysteresis, rule.id)
+        else:
+            series.up.add(rule.threshold, rule.id)
+            series.up_rearm.add(rule.threshold - rule.hysteresis, rule.id)
+
+    def _remove(self, rule: AlertRule):
+        self._rules.pop(rule.id, None)
+        self._armed.pop(rule.id, None)
+        self._last_fired.pop(rule.id, None)
+        key = self._series_key(rule)
+        series = self._series.get(key)
+        if series is None:
+            return
+        if rule.kind == "below":
+            series.down.remove(rule.threshold, rule.id)
+            series.down_rearm.remove(rule.threshold + rule.hysteresis, rule.id)
+        else:
+            series.up.remove(rule.threshold, rule.id)
+            series.up_rearm.remove(rule.threshold - rule.hysteresis, rule.id)
+        if not series:
+            del self._series[key]
+            if rule.kind == "move":
+                windows = self._windows[key[:2]]
+                windows.pop(rule.window_seconds, None)
+                if not windows:
+                    del self._windows[key[:2]]
+
+    def list_rules(self) -> List[AlertRule]:
+        return list(self._rules.values())
+
+    def get_rule(self, rule_id: str) -> AlertRule:
+        rule = self._rules.get(rule_id)
+        if rule is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Alert rule not found: {rule_id}"
+            )
+        return rule
+
+    async def create_rule(self, rule: AlertRule) -> AlertRule:
+        """创建规则"""
+        rule = self._normalize(rule.copy())
+        rule.id = self._generate_random_id()
+        while rule.id in self._rules:
+            rule.id = self._generate_random_id()
+        self._add(rule)
+        await self._persist()
+        return rule
+
+    async def update_rule(self, rule_id: str, rule: AlertRule) -> AlertRule:
+        """更新规则（触发状态和冷却时间重置）"""
+        existing = self.get_rule(rule_id)
+        rule = self._normalize(rule.copy())
+        rule.id = rule_id
+        self._remove(existing)
+        self._add(rule)
+        await self._persist()
+        return rule
+
+    async def delete_rule(self, rule_id: str):
+        """删除规则"""
+        self._remove(self.get_rule(rule_id))
+        await self._persist()
+
+    # ---- 规则判断 ----
+
+    def on_quote(self, quote: Quote):
+        """行情变化回调（同步执行，只做内存计算）"""
+        started = time.perf_counter()
+        now = time.monotonic()
+        self._observe(quote.exchange, quote.symbol, quote.last, now)
+        # compose的行情经共识价格校验，同一交易对其他交易所的行情也可能改变结果
+        if quote.symbol in ComposeService.CONSENSUS_LEGS:
+            self._observe_compose(now)
+        self.stats["ticks"] += 1
+        self.evaluation.observe(time.perf_counter() - started)
+
+    def _observe(self, exchange: str, symbol: str, price: float, now: float):
+        series = self._series.get((exchange, symbol, "last"))
+        if series is not None:
+            self._update(series, price, now)
+        windows = self._windows.get((exchange, symbol))
+        if windows:
+            for window, tracker in windows.items():
+                self._update(self._series[(exchange, symbol, "move", window)], tracker.update(now, price), now)
+
+    def _observe_compose(self, now: float):
+        watched = (COMPOSE + ("last",)) in self._series or COMPOSE in self._windows
+        divergence = self._series.get(DIVERGENCE_KEY)
+        if not watched and divergence is None:
+            return
+        quote_cache = QuoteCacheService()
+        legs = [quote_cache.get(exchange, symbol) for exchange, symbol in ComposeService.LEGS]
+        if None in legs:
+            return
+        btc_usdt, btc_jpy, btc_jpy_google = legs
+        if watched:
+            checked = ComposeService.consensus_legs(*legs)
+            if None not in checked:
+                result = ComposeService.compose(*checked)
+                self._observe(COMPOSE[0], COMPOSE[1], result.last, now)
+        if divergence is not None:
+            value = abs(btc_jpy.last - btc_jpy_google.last) / btc_jpy_google.last * 100
+            self._update(divergence, value, now)
+
+    def _update(self, series: _Series, value: float, now: float):
+        prev = series.value
+        series.value = value
+        if prev is None or value == prev:
+            return
+        if value > prev:
+            for rule_id in series.up.crossed(prev, value):
+                self._trigger(rule_id, value, now)
+            for rule_id in series.down_rearm.crossed(prev, value):
+                self._armed[rule_id] = True
+        else:
+            for rule_id in series.down.crossed(prev, value):
+                self._trigger(rule_id, value, now)
+            for rule_id in series.up_rearm.crossed(prev, value):
+                self._armed[rule_id] = True
+
+    def _trigger(self, rule_id: str, value: float, now: float):
+        if not self._armed.get(rule_id):
+            return
+        rule = self._rules[rule_id]
+        last_fired = self._last_fired.get(rule_id)
+        if last_fired is not None and now - last_fired < rule.cooldown_seconds:
+            # 冷却中保持启用，冷却结束后的下一次穿越再通知
+            self.stats["suppressed"] += 1
+            return
+        self._armed[rule_id] = False
+        self._last_fired[rule_id] = now
+        self.stats["fired"] += 1
+        event = {
+            "rule_id": rule_id,
+            "kind": rule.kind,
+            "exchange": rule.exchange,
+            "symbol": rule.symbol,
+            "threshold": rule.threshold,
+            "window_seconds": rule.window_seconds,
+            "value": round(value, 6),
+            "note": rule.note,
+            "chat_id": rule.chat_id,
+            "fired_at": datetime.now().isoformat()
+        }
+        self.history.append(event)
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            logger.warning("Alert queue full, dropping alert for rule %s", rule_id)
+
+    # ---- 通知发送 ----
+
+    def start(self):
+        """启动通知发送协程"""
+        if self._worker is None:
+            self._queue = asyncio.Queue(maxsize=settings.ALERT_QUEUE_SIZE)
+            self._worker = asyncio.create_task(self._deliver())
+            logger.info("Alert service started with %s rule(s)", len(self._rules))
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+            self._queue = None
+
+    @staticmethod
+    def _title(event: dict) -> str:
+        kind = event["kind"]
+        if kind == "above":
+            return f"价格上穿 {event['threshold']}"
+        if kind == "below":
+            return f"价格下穿 {event['threshold']}"
+        if kind == "move":
+            return f"{event['window_seconds']:g}秒内波动超过 {event['threshold']}%"
+        return f"OKJ与Google价差超过 {event['threshold']}%"
+
+    async def _deliver(self):
+        template_service = TemplateService()
+        telegram_service = TelegramService()
+        while True:
+            event = await self._queue.get()
+            try:
+                template_data = await template_service.get_template('price_alert')
+                markdown_text = template_data['content'].format(
+                    title=self._title(event),
+                    symbol=event["symbol"],
+                    exchange=EXCHANGE_NAMES.get(event["exchange"], "Compose"),
+                    value=event["value"],
+                    threshold=event["threshold"],
+                    note=event["note"] or "",
+                    formatted_time=datetime.fromisoformat(event["fired_at"]).strftime('%Y-%m-%d %H:%M:%S')
+                )
+                await telegram_service.send_markdown(markdown_text, event["chat_id"])
+                self.stats["delivered"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error("Failed to deliver alert for rule %s: %s", event['rule_id'], e)
+
+    def summary(self) -> dict:
+        return {
+            "rules": len(self._rules),
+            "series": len(self._series),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "stats": dict(self.stats),
+            "evaluation": self.evaluation.snapshot()
+        }
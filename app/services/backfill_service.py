@@ -0,0 +1,217 @@
+import asyncio
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional, Tuple
+from fastapi import HTTPException
+from core.config import settings
+from core.logging import logger
+from models.candle import Candle
+from models.history import BackfillRequest
+from services.exchange_adapter import ExchangeAdapter
+from services.exchanges import get_adapter
+from services.history_service import HistoryStore
+from services.instrument_service import Instrument, InstrumentService
+
+
+class BackfillJob:
+    """一次K线回补任务的进度"""
+
+    def __init__(self, request: BackfillRequest, symbols: List[str], start: int, end: int, span: int):
+        self.id = uuid.uuid4().hex[:8]
+        self.venue = request.venue
+        self.symbols = symbols
+        self.interval = request.interval_seconds
+        self.start = start
+        self.end = end
+        # 每个分段的时长（毫秒），即单次请求最多返回的K线所覆盖的时间
+        self.span = span
+        self.status = "pending"
+        self.chunks_total = 0
+        self.chunks_skipped = 0
+        self.chunks_done = 0
+        self.chunks_failed = 0
+        self.candles = 0
+        self.errors: List[str] = []
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> dict:
+        elapsed = (self.finished or time.time()) - self.created
+        return {
+            "id": self.id,
+            "venue": self.venue,
+            "symbols": self.symbols,
+            "interval_seconds": self.interval,
+            "start": self.start,
+            "end": self.end,
+            "status": self.status,
+            "chunks_total": self.chunks_total,
+            "chunks_skipped": self.chunks_skipped,
+            "chunks_done": self.chunks_done,
+            "chunks_failed": self.chunks_failed,
+            "candles": self.candles,
+            "elapsed_seconds": round(elapsed, 3),
+            "candles_per_second": round(self.candles / elapsed, 1) if elapsed > 0 else 0.0,
+            "errors": self.errors[-10:]
+        }
+
+
+class BackfillService:
+    """
+    K线历史回补
+
+    时间范围按交易所单次请求的K线上限切成固定分段，分段起点对齐到绝对时间网格，
+    因此同一范围的重复任务会得到相同的分段，已完成的分段直接跳过，中断后重新提交即可续传。
+    多个协程并发拉取分段（受交易所限流控制），结果经有界队列交给单个写入协程批量入库，
+    内存中最多同时存在 并发数 + 队列长度 个分段，与回补范围无关。
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self.store = HistoryStore()
+        self._jobs: Dict[str, BackfillJob] = {}
+
+    # ---- 任务管理 ----
+
+    def submit(self, request: BackfillRequest) -> BackfillJob:
+        """校验参数并在后台启动回补任务"""
+        request.venue = request.venue.lower()
+        adapter = get_adapter(request.venue)
+        if not adapter.candle_limit:
+            raise HTTPException(
+                status_code=501,
+                detail=f"Candles are not supported by {adapter.display_name}"
+            )
+        adapter.candle_interval(request.interval_seconds)
+        if not request.symbols:
+            raise HTTPException(
+                status_code=400,
+                detail="symbols must not be empty"
+            )
+        instrument_service = InstrumentService()
+        instruments = [instrument_service.resolve(request.venue, symbol) for symbol in request.symbols]
+
+        now = int(time.time() * 1000)
+        end = min(request.end or now, now)
+        if request.start >= end:
+            raise HTTPException(
+                status_code=400,
+                detail="start must be earlier than end"
+            )
+        interval_ms = request.interval_seconds * 1000
+        span = adapter.candle_limit * interval_ms
+        job = BackfillJob(request, [i.canonical for i in instruments], request.start, end, span)
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, adapter, instruments))
+        logger.info("Backfill job %s started: %s %s %ss", job.id, job.venue, job.symbols, job.interval)
+        return job
+
+    def get(self, job_id: str) -> BackfillJob:
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Backfill job not found: {job_id}"
+            )
+        return job
+
+    def list_jobs(self) -> List[BackfillJob]:
+        return sorted(self._jobs.values(), key=lambda job: job.created, reverse=True)
+
+    def cancel(self, job_id: str) -> BackfillJob:
+        job = self.get(job_id)
+        if job.task and not job.task.done():
+            job.task.cancel()
+        return job
+
+    # ---- 执行 ----
+
+    def _chunks(self, job: BackfillJob, instruments: List[Instrument],
+                completed: Dict[str, set]) -> Iterator[Tuple[Instrument, int]]:
+        """按交易对依次生成需要拉取的分段起点"""
+        first = job.start - job.start % job.span
+        for instrument in instruments:
+            done = completed[instrument.canonical]
+            for chunk_start in range(first, job.end, job.span):
+                job.chunks_total += 1
+                if chunk_start in done:
+                    job.chunks_skipped += 1
+                    continue
+                yield instrument, chunk_start
+
+    async def _run(self, job: BackfillJob, adapter: ExchangeAdapter, instruments: List[Instrument]):
+        job.status = "running"
+        now = int(time.time() * 1000)
+        completed = {
+            i.canonical: await self.store.completed_chunks(job.venue, i.canonical, job.interval, job.start - job.span, job.end)
+            for i in instruments
+        }
+        chunks = self._chunks(job, instruments, completed)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.BACKFILL_QUEUE_SIZE)
+
+        async def _fetch():
+            # 各协程共用同一个分段生成器，生成器在事件循环内顺序推进，不需要加锁
+            for instrument, chunk_start in chunks:
+                chunk_end = chunk_start + job.span
+                try:
+                    candles = await adapter.get_history(instrument, job.interval, chunk_start, chunk_end)
+                except HTTPException as e:
+                    job.chunks_failed += 1
+                    job.errors.append(f"{instrument.canonical}@{chunk_start}: {e.detail}")
+                    logger.warning("Backfill job %s chunk %s@%s failed: %s", job.id, instrument.canonical, chunk_start, e.detail)
+                    continue
+                # 尚未结束的分段之后还会有新的K线，不记录为已完成
+                closed = chunk_end <= now
+                await queue.put((instrument.canonical, chunk_start if closed else None, candles))
+
+        async def _write():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                symbol, chunk_start, candles = item
+                await self.store.write_chunk(job.venue, symbol, job.interval, candles, chunk_start)
+                job.chunks_done += 1
+                job.candles += len(candles)
+
+        writer = asyncio.create_task(_write())
+        workers = [asyncio.create_task(_fetch()) for _ in range(settings.BACKFILL_CONCURRENCY)]
+        try:
+            fetching = asyncio.gather(*workers)
+            await asyncio.wait({fetching, writer}, return_when=asyncio.FIRST_COMPLETED)
+            if writer.done():
+                # 写入协程只会因出错提前结束
+                fetching.cancel()
+                writer.result()
+            await fetching
+            await queue.put(None)
+            await writer
+            job.status = "failed" if job.chunks_failed else "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.errors.append(str(e))
+            logger.error("Backfill job %s failed: %s", job.id, e)
+        finally:
+            for task in workers + [writer]:
+                task.cancel()
+            job.finished = time.time()
+            logger.info("Backfill job %s %s: %s chunk(s), %s candle(s), %s skipped, %s failed",
+                        job.id, job.status, job.chunks_done, job.candles, job.chunks_skipped, job.chunks_failed)
+
+    # ---- 查询 ----
+
+    async def candles(self, venue: str, symbol: str, interval: int, start: int, end: Optional[int],
+                      limit: int) -> List[Candle]:
+        venue = venue.lower()
+        get_adapter(venue)
+        symbol = InstrumentService().canonical(symbol)
+        return await self.store.query(venue, symbol, interval, start, end or int(time.time() * 1000), limit)
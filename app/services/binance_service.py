@@ -1,48 +1,103 @@
-from binance.client import Client
-from binance.exceptions import BinanceAPIException
+import json
+import time
+from typing import List
 from fastapi import HTTPException
-from datetime import datetime
-
-class BinanceService:
-    def __init__(self):
-        self.client = Client()
-        
-    async def get_price(self, symbol: str) -> dict:
-        """
-        获取指定交易对的实时买卖价格
-        
-        Args:
-            symbol: 交易对名称（例如：BTCUSDT, ETHUSDT）
-        """
+from models.candle import Candle
+from models.quote import OrderBook, Quote
+from services.exchange_adapter import ExchangeAdapter, register_adapter
+from services.instrument_service import Instrument
+
+@register_adapter
+class BinanceService(ExchangeAdapter):
+    """
+    Binance现货
+    API文档: https://developers.binance.com/docs/binance-spot-api-docs/rest-api
+    """
+    name = "binance"
+    base_url = "https://api.binance.com"
+    native_format = "{base}{quote}"
+    # 请求权重上限 6000/分钟，24hr行情单个交易对权重为2
+    rate_limit = 20.0
+    burst = 40
+    candle_intervals = {60: "1m", 300: "5m", 900: "15m", 3600: "1h", 14400: "4h", 86400: "1d"}
+    candle_limit = 1000
+
+    def _raise_for_status(self, status: int, body: str):
         try:
-            symbol = symbol.upper()
-            # 使用get_ticker获取更详细的价格信息
-            ticker = self.client.get_ticker(symbol=symbol)
-            
-            return {
-                "symbol": symbol,
-                "bid_price": float(ticker['bidPrice']),    # 买入价
-                "bid_qty": float(ticker['bidQty']),        # 买入数量
-                "ask_price": float(ticker['askPrice']),    # 卖出价
-                "ask_qty": float(ticker['askQty']),        # 卖出数量
-                "last_price": float(ticker['lastPrice']),  # 最新成交价
-                "volume": float(ticker['volume']),         # 24小时成交量
-                "timestamp": datetime.fromtimestamp(ticker['closeTime']/1000).isoformat(),
-                "price_change_24h": float(ticker['priceChange']),        # 24小时价格变化
-                "price_change_percent": float(ticker['priceChangePercent']) # 24小时价格变化百分比
-            }
-        except BinanceAPIException as e:
-            if e.code == -1121:  # 无效的交易对
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid symbol: {symbol}"
-                )
+            code = json.loads(body).get("code")
+        except Exception:
+            code = None
+        if code == -1121:  # 无效的交易对
             raise HTTPException(
-                status_code=500,
-                detail=f"Binance API error: {str(e)}"
+                status_code=400,
+                detail="Invalid symbol"
             )
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to fetch price: {str(e)}"
-            ) 
\ No newline at end of file
+        raise HTTPException(
+            status_code=500,
+            detail=f"Binance API error: {body}"
+        )
+
+    @staticmethod
+    def _parse_ticker(symbol: str, ticker: dict) -> Quote:
+        return Quote(
+            "binance", symbol,
+            float(ticker['bidPrice']),    # 买入价
+            float(ticker['askPrice']),    # 卖出价
+            float(ticker['lastPrice']),   # 最新成交价
+            int(ticker['closeTime']),
+            bid_qty=float(ticker['bidQty']),        # 买入数量
+            ask_qty=float(ticker['askQty']),        # 卖出数量
+            volume=float(ticker['volume']),         # 24小时成交量
+            change=float(ticker['priceChange']),                # 24小时价格变化
+            change_percent=float(ticker['priceChangePercent'])  # 24小时价格变化百分比
+        )
+
+    async def get_ticker(self, instrument: Instrument) -> Quote:
+        ticker = await self.get_json("/api/v3/ticker/24hr", {"symbol": instrument.native_id})
+        return self._parse_ticker(instrument.canonical, ticker)
+
+    async def get_tickers(self, instruments: List[Instrument]) -> List[Quote]:
+        # 一次请求获取多个交易对
+        by_id = {i.native_id: i for i in instruments}
+        tickers = await self.get_json(
+            "/api/v3/ticker/24hr",
+            {"symbols": json.dumps(list(by_id), separators=(',', ':'))}
+        )
+        return [self._parse_ticker(by_id[t['symbol']].canonical, t) for t in tickers if t['symbol'] in by_id]
+
+    async def get_order_book(self, instrument: Instrument, depth: int) -> OrderBook:
+        data = await self.get_json("/api/v3/depth", {"symbol": instrument.native_id, "limit": depth})
+        return OrderBook(
+            "binance", instrument.canonical,
+            [(float(p), float(q)) for p, q in data['bids']],
+            [(float(p), float(q)) for p, q in data['asks']],
+            int(time.time() * 1000)
+        )
+
+    async def get_candles(self, instrument: Instrument, interval: int, start: int, end: int) -> List[Candle]:
+        # 按开盘时间筛选，endTime 为闭区间
+        rows = await self.get_json("/api/v3/klines", {
+            "symbol": instrument.native_id,
+            "interval": self.candle_interval(interval),
+            "startTime": start,
+            "endTime": end - 1,
+            "limit": self.candle_limit
+        })
+        return [
+            (int(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]), float(r[5]))
+            for r in rows
+        ]
+
+    async def load_instruments(self) -> List[Instrument]:
+        data = await self.get_json("/api/v3/exchangeInfo")
+        instruments = []
+        for item in data.get("symbols", []):
+            tick_size = None
+            for f in item.get("filters", []):
+                if f.get("filterType") == "PRICE_FILTER":
+                    tick_size = float(f["tickSize"])
+            instruments.append(Instrument(
+                "binance", item["symbol"], item["baseAsset"], item["quoteAsset"],
+                tick_size, "live" if item.get("status") == "TRADING" else item.get("status", "").lower()
+            ))
+        return instruments
@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+from typing import List
+from models.quote import OrderBook, Quote
+from services.exchange_adapter import ExchangeAdapter, register_adapter
+from services.instrument_service import Instrument
+
+@register_adapter
+class BitflyerService(ExchangeAdapter):
+    """
+    bitFlyer现货
+    API文档: https://lightning.bitflyer.com/docs?lang=zh-CN
+    """
+    name = "bitflyer"
+    base_url = "https://api.bitflyer.com"
+    native_format = "{base}_{quote}"
+    # 公开接口限频 500次/5分钟
+    rate_limit = 1.5
+    burst = 10
+
+    async def get_ticker(self, instrument: Instrument) -> Quote:
+        ticker = await self.get_json("/v1/ticker", {"product_code": instrument.native_id})
+        # 时间为不带时区的UTC时间（例如 2024-01-01T00:00:00.123）
+        ts = datetime.fromisoformat(ticker['timestamp'].rstrip('Z')).replace(tzinfo=timezone.utc)
+        return Quote(
+            "bitflyer", instrument.canonical,
+            float(ticker['best_bid']),
+            float(ticker['best_ask']),
+            float(ticker['ltp']),
+            int(ts.timestamp() * 1000),
+            bid_qty=float(ticker['best_bid_size']),
+            ask_qty=float(ticker['best_ask_size']),
+            volume=float(ticker['volume_by_product'])
+        )
+
+    async def get_order_book(self, instrument: Instrument, depth: int) -> OrderBook:
+        board = await self.get_json("/v1/board", {"product_code": instrument.native_id})
+        return OrderBook(
+            "bitflyer", instrument.canonical,
+            [(float(level['price']), float(level['size'])) for level in board['bids'][:depth]],
+            [(float(level['price']), float(level['size'])) for level in board['asks'][:depth]],
+            int(datetime.now().timestamp() * 1000)
+        )
+
+    async def load_instruments(self) -> List[Instrument]:
+        markets = await self.get_json("/v1/markets")
+        instruments = []
+        for item in markets:
+            # 只保留现货（FX_BTC_JPY、期货等不是 BASE_QUOTE 格式）
+            if item.get("market_type", "Spot") != "Spot":
+                continue
+            parts = item["product_code"].split("_")
+            if len(parts) != 2:
+                continue
+            instruments.append(Instrument("bitflyer", item["product_code"], parts[0], parts[1], status="live"))
+        return instruments
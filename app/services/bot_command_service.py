@@ -0,0 +1,256 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+import telegram
+from fastapi import HTTPException
+from core.config import settings
+from core.logging import logger
+from core.ratelimit import TokenBucket
+from models.quote import EXCHANGE_NAMES
+from services.dashboard_service import DashboardService
+from services.instrument_service import InstrumentService
+from services.quote_cache_service import QuoteCacheService
+from services.spread_service import SpreadService
+from services.telegram_service import TelegramService
+
+# 保留限流状态的最多用户数
+_MAX_TRACKED_USERS = 10000
+
+HELP_TEXT = (
+    "**可用命令**\n"
+    "/price BTCJPY - 各交易所最新行情\n"
+    "/compose [分组] - USDT/JPY组合价格\n"
+    "/spread [交易对] - 跨交易所价差和三角套利\n"
+    "/help - 显示帮助"
+)
+
+
+def _age(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f}秒前"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}分钟前"
+    return f"{seconds / 3600:.1f}小时前"
+
+
+class BotCommandService:
+    """
+    Telegram用户命令
+
+    通过Webhook（TG_WEBHOOK_URL）或长轮询接收消息。命令只读取内存中的最新行情、
+    看板快照中预先计算好的compose结果和价差监控结果，不请求任何上游，
+    命令数量不会放大为交易所请求数。每个用户按令牌桶限流，超出的命令直接丢弃；
+    回复经有界队列由后台协程按 TG_SEND_RATE 发送，Webhook请求立即返回。
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self.commands: Dict[str, Callable[[List[str]], str]] = {
+            "start": self._help,
+            "help": self._help,
+            "price": self._price,
+            "compose": self._compose,
+            "spread": self._spread
+        }
+        self._users: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self._send_limiter = TokenBucket(settings.TG_SEND_RATE, max(1, int(settings.TG_SEND_RATE)))
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._offset: Optional[int] = None
+        self.mode: Optional[str] = None
+        self.stats = {"updates": 0, "commands": 0, "unknown": 0, "throttled": 0, "dropped": 0, "sent": 0, "failed": 0}
+
+    # ---- 启动/停止 ----
+
+    async def start(self):
+        """注册Webhook，未配置时启动长轮询；同时启动回复发送协程"""
+        if settings.TG_WEBHOOK_URL and not settings.TG_WEBHOOK_SECRET:
+            # 没有密钥时任何人都能向Webhook伪造更新（任意会话ID、绕过按用户限流）
+            logger.error("TG_WEBHOOK_URL is set but TG_WEBHOOK_SECRET is empty, Telegram commands disabled")
+            return
+        self._queue = asyncio.Queue(maxsize=settings.TG_REPLY_QUEUE_SIZE)
+        self._tasks.append(asyncio.create_task(self._deliver()))
+        bot = TelegramService().bot
+        try:
+            if settings.TG_WEBHOOK_URL:
+                await bot.set_webhook(settings.TG_WEBHOOK_URL, secret_token=settings.TG_WEBHOOK_SECRET)
+                self.mode = "webhook"
+            else:
+                # 存在Webhook时getUpdates不可用
+                await bot.delete_webhook()
+                self._tasks.append(asyncio.create_task(self._poll()))
+                self.mode = "polling"
+            logger.info("Telegram commands enabled (%s)", self.mode)
+        except Exception as e:
+            logger.error("Failed to start Telegram commands: %s", e)
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _poll(self):
+        bot = TelegramService().bot
+        backoff = 1.0
+        while True:
+            try:
+                updates = await bot.get_updates(
+                    offset=self._offset, timeout=settings.TG_POLL_TIMEOUT_SECONDS, allowed_updates=["message"]
+                )
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Telegram polling failed: %s", e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+                continue
+            for update in updates:
+                self._offset = update.update_id + 1
+                self.handle_update(update)
+
+    # ---- 命令处理 ----
+
+    def handle_json(self, data: dict):
+        """处理Webhook收到的更新"""
+        self.handle_update(telegram.Update.de_json(data, TelegramService().bot))
+
+    def handle_update(self, update: telegram.Update):
+        """解析命令并把回复放入发送队列（同步执行，不等待发送）"""
+        self.stats["updates"] += 1
+        message = update.effective_message
+        if message is None or not message.text or not message.text.startswith("/"):
+            return
+        parts = message.text.split()
+        # 群组中的命令形如 /price@bot_name
+        name = parts[0][1:].split("@", 1)[0].lower()
+        handler = self.commands.get(name)
+        if handler is None:
+            self.stats["unknown"] += 1
+            return
+        user = update.effective_user
+        if user is not None and not self._allow(user.id):
+            self.stats["throttled"] += 1
+            return
+        self.stats["commands"] += 1
+        try:
+            text = handler(parts[1:])
+        except HTTPException as e:
+            text = f"⚠️ {e.detail}"
+        except Exception as e:
+            logger.error("Telegram command /%s failed: %s", name, e)
+            text = "⚠️ 命令执行失败"
+        self._reply(message.chat_id, text)
+
+    def _allow(self, user_id: int) -> bool:
+        bucket = self._users.get(user_id)
+        if bucket is None:
+            bucket = self._users[user_id] = TokenBucket(settings.TG_USER_RATE, settings.TG_USER_BURST)
+            if len(self._users) > _MAX_TRACKED_USERS:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        return bucket.try_acquire()
+
+    def _help(self, args: List[str]) -> str:
+        return HELP_TEXT
+
+    def _price(self, args: List[str]) -> str:
+        if not args:
+            return "用法: /price BTCJPY [交易所]"
+        symbol = InstrumentService().canonical(args[0])
+        venue = args[1].lower() if len(args) > 1 else None
+        entries = [
+            (quote, age) for quote, age in QuoteCacheService().get_all(symbol)
+            if venue is None or quote.exchange == venue
+        ]
+        if not entries:
+            return f"暂无 {symbol} 的行情"
+        entries.sort(key=lambda entry: entry[0].exchange)
+        lines = [f"**{symbol}**"]
+        for quote, age in entries:
+            name = EXCHANGE_NAMES.get(quote.exchange, quote.exchange)
+            if quote.bid == quote.ask:
+                lines.append(f"{name}: {quote.last:,} （{_age(age)}）")
+            else:
+                lines.append(f"{name}: {quote.last:,} 买 {quote.bid:,} / 卖 {quote.ask:,} （{_age(age)}）")
+        return "\n".join(lines)
+
+    def _compose(self, args: List[str]) -> str:
+        snapshot = DashboardService().snapshot
+        if snapshot is None:
+            return "数据准备中，请稍后再试"
+        group = args[0] if args else None
+        entry = next((g for g in snapshot.payload["groups"] if g["group"] == group), None)
+        if entry is None:
+            return f"分组不存在: {group}"
+        compose = entry["compose"]
+        if compose is None:
+            return "行情数据不完整，暂时无法计算"
+        usdt_jpy = compose["usdt_jpy"]
+        age = time.time() - snapshot.payload["meta"]["generated_at"] / 1000
+        lines = [
+            f"**USDT/JPY**{f'（{group}）' if group else ''}",
+            f"⬆️买入价格：{usdt_jpy['bid_price']}",
+            f"⬇️卖出价格：{usdt_jpy['ask_price']}",
+            f"🤝最新成交价格：{usdt_jpy['last_price']}",
+            f"💴Google：{compose['usdt_jpy_google']['last_price']}"
+        ]
+        if compose.get("consensus"):
+            lines.append(f"📊共识价格：{compose['consensus']['usdt_jpy']['last_price']}")
+        lines.append(f"⌚️{_age(age)}")
+        return "\n".join(lines)
+
+    def _spread(self, args: List[str]) -> str:
+        symbol = InstrumentService().canonical(args[0]) if args else None
+        snapshot = SpreadService().snapshot(symbol)
+        if not snapshot["pairs"] and not snapshot["triangles"]:
+            return "暂无价差数据"
+        lines = ["**跨交易所价差**"]
+        for pair in snapshot["pairs"][:5]:
+            best = max(pair["a_to_b_percent"], pair["b_to_a_percent"])
+            lines.append(f"{pair['symbol']} {pair['venue_a']}/{pair['venue_b']}: {pair['spread_percent']}%（套利 {best}%）")
+        if snapshot["triangles"]:
+            lines.append("**三角套利**")
+            for triangle in snapshot["triangles"][:3]:
+                best = max(triangle["forward_percent"], triangle["reverse_percent"])
+                lines.append(f"{triangle['direct']} ↔ {triangle['via']} × {triangle['cross']}: {best}%")
+        return "\n".join(lines)
+
+    # ---- 发送 ----
+
+    def _reply(self, chat_id: int, text: str):
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait((chat_id, text))
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+
+    async def _deliver(self):
+        telegram_service = TelegramService()
+        while True:
+            chat_id, text = await self._queue.get()
+            await self._send_limiter.acquire()
+            try:
+                await telegram_service.send_markdown(text, chat_id=chat_id)
+                self.stats["sent"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.warning("Failed to send Telegram reply to %s: %s", chat_id, e)
+
+    def summary(self) -> dict:
+        return {
+            "mode": self.mode,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "tracked_users": len(self._users),
+            **self.stats
+        }
@@ -0,0 +1,41 @@
+import time
+from models.quote import OrderBook, Quote
+from services.exchange_adapter import ExchangeAdapter, register_adapter
+from services.instrument_service import Instrument
+
+@register_adapter
+class CoincheckService(ExchangeAdapter):
+    """
+    Coincheck现货
+    API文档: https://coincheck.com/documents/exchange/api
+
+    没有交易对列表接口，交易对ID按 btc_jpy 格式生成。
+    """
+    name = "coincheck"
+    base_url = "https://coincheck.com"
+    rate_limit = 2.0
+    burst = 5
+
+    @classmethod
+    def native_symbol(cls, base: str, quote: str) -> str:
+        return f"{base}_{quote}".lower()
+
+    async def get_ticker(self, instrument: Instrument) -> Quote:
+        ticker = await self.get_json("/api/ticker", {"pair": instrument.native_id})
+        return Quote(
+            "coincheck", instrument.canonical,
+            float(ticker['bid']),
+            float(ticker['ask']),
+            float(ticker['last']),
+            int(ticker['timestamp']) * 1000,
+            volume=float(ticker['volume'])
+        )
+
+    async def get_order_book(self, instrument: Instrument, depth: int) -> OrderBook:
+        book = await self.get_json("/api/order_books", {"pair": instrument.native_id})
+        return OrderBook(
+            "coincheck", instrument.canonical,
+            [(float(p), float(q)) for p, q in book['bids'][:depth]],
+            [(float(p), float(q)) for p, q in book['asks'][:depth]],
+            int(time.time() * 1000)
+        )
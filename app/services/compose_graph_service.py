@@ -0,0 +1,229 @@
+import asyncio
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+from core.config import settings
+from core.logging import logger
+from core.metrics import LatencyHistogram
+from models.compose import ComposeResult
+from models.quote import Quote
+from services.compose_service import ComposeService
+from services.consensus_service import ConsensusService
+from services.power_service import PowerService
+from services.quote_cache_service import QuoteCacheService
+
+# 输入节点：("quote", 交易所, 交易对) / ("consensus", 交易对) / ("power", 分组)
+Node = Tuple[str, ...]
+
+
+def _output_values(result: Optional[ComposeResult]) -> Optional[tuple]:
+    """用于判断输出是否真正变化的字段"""
+    if result is None:
+        return None
+    return result.bid, result.ask, result.last, result.google_last, result.consensus_last
+
+
+class ComposeGraphService:
+    """
+    compose结果的增量计算
+
+    维护输入（三条行情、两个共识价格、各分组倍率）到输出（每个分组的USDT/JPY）的依赖关系，
+    三条行情先经共识价格校验（见 ComposeService.consensus_legs）。
+    输入变化时只把依赖它的输出标记为待计算，同一轮事件循环内的多次变化合并为一次计算；
+    版本号未变的输入直接跳过。输出的价格与上一次相同时不通知订阅者。
+    计算量只与行情变化频率有关，与请求数无关。
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        # 输入 -> 依赖它的输出（分组，默认分组为None）
+        self._dependents: Dict[Node, Set[Optional[str]]] = {}
+        # 输入 -> 上一次计算时的版本
+        self._seen: Dict[Node, Hashable] = {}
+        self._powers: Dict[Optional[str], float] = {}
+        self._power_version: Optional[tuple] = None
+        self._results: Dict[Optional[str], ComposeResult] = {}
+        self._versions: Dict[Optional[str], int] = {}
+        self._changed: Set[Node] = set()
+        self._scheduled = False
+        self._listeners: List[Callable[[Optional[str], ComposeResult], None]] = []
+        self._subscribers: Set[asyncio.Queue] = set()
+        self.evaluation = LatencyHistogram()
+        self.stats = {"inputs_changed": 0, "inputs_skipped": 0, "recomputed": 0, "unchanged": 0, "published": 0, "dropped": 0}
+        self._add_output(None, 1.0)
+        QuoteCacheService().add_listener(self.on_quote)
+
+    # ---- 依赖关系 ----
+
+    def _inputs(self, group: Optional[str]) -> List[Node]:
+        nodes: List[Node] = [("quote", venue, symbol) for venue, symbol in ComposeService.LEGS]
+        nodes += [("consensus", symbol) for symbol in ComposeService.CONSENSUS_LEGS]
+        nodes.append(("power", group))
+        return nodes
+
+    def _add_output(self, group: Optional[str], power: float):
+        self._powers[group] = power
+        for node in self._inputs(group):
+            self._dependents.setdefault(node, set()).add(group)
+
+    def _remove_output(self, group: Optional[str]):
+        self._powers.pop(group, None)
+        self._results.pop(group, None)
+        for node in self._inputs(group):
+            dependents = self._dependents.get(node)
+            if dependents is not None:
+                dependents.discard(group)
+                if not dependents:
+                    del self._dependents[node]
+                    self._seen.pop(node, None)
+
+    def _version(self, node: Node) -> Hashable:
+        kind = node[0]
+        if kind == "quote":
+            return QuoteCacheService().version(node[1:])
+        if kind == "consensus":
+            return ConsensusService().version(node[1])
+        return self._powers.get(node[1])
+
+    async def sync_powers(self):
+        """倍率配置变化时更新分组（周期任务，配置未变化时只检查文件版本）"""
+        power_service = PowerService()
+        version = power_service.version
+        if version == self._power_version:
+            return
+        try:
+            configs = {config.group: config.power for config in await power_service.get_all_configs()}
+        except Exception as e:
+            # 保留当前分组，下次检查时重试
+            logger.error("Failed to sync power configs: %s", e)
+            return
+        self._power_version = version
+        for group in [g for g in self._powers if g is not None and g not in configs]:
+            self._remove_output(group)
+        for group, power in configs.items():
+            if group not in self._powers:
+                self._add_output(group, power)
+            else:
+                self._powers[group] = power
+            self._mark(("power", group))
+
+    # ---- 变化传播 ----
+
+    def on_quote(self, quote: Quote):
+        if (quote.exchange, quote.symbol) in ComposeService.LEGS:
+            self._mark(("quote", quote.exchange, quote.symbol))
+        if quote.symbol in ComposeService.CONSENSUS_LEGS:
+            # 共识价格在它自己的回调中更新，是否真正变化在计算时按版本号判断
+            self._mark(("consensus", quote.symbol))
+
+    def _mark(self, node: Node):
+        if node not in self._dependents:
+            return
+        self._changed.add(node)
+        if not self._scheduled:
+            self._scheduled = True
+            try:
+                asyncio.get_running_loop().call_soon(self._flush)
+            except RuntimeError:
+                # 不在事件循环中（如启动前的同步调用），立即计算
+                self._flush()
+
+    def _flush(self):
+        self._scheduled = False
+        changed, self._changed = self._changed, set()
+        started = time.perf_counter()
+        dirty: Set[Optional[str]] = set()
+        for node in changed:
+            version = self._version(node)
+            if node in self._seen and self._seen[node] == version:
+                self.stats["inputs_skipped"] += 1
+                continue
+            self._seen[node] = version
+            self.stats["inputs_changed"] += 1
+            dirty |= self._dependents.get(node, set())
+        if not dirty:
+            return
+
+        quote_cache = QuoteCacheService()
+        legs = ComposeService.consensus_legs(*(quote_cache.get(venue, symbol) for venue, symbol in ComposeService.LEGS))
+        updates = []
+        for group in dirty:
+            if group not in self._powers or any(leg is None for leg in legs):
+                continue
+            result = ComposeService.compose(*legs, self._powers[group])
+            ComposeService.attach_consensus(result)
+            self.stats["recomputed"] += 1
+            prev = self._results.get(group)
+            self._results[group] = result
+            if _output_values(result) == _output_values(prev):
+                self.stats["unchanged"] += 1
+                continue
+            self._versions[group] = self._versions.get(group, 0) + 1
+            updates.append((group, result))
+        self.evaluation.observe(time.perf_counter() - started)
+        for group, result in updates:
+            self._notify(group, result)
+
+    # ---- 读取和订阅 ----
+
+    def get(self, group: Optional[str] = None) -> Optional[ComposeResult]:
+        """分组最新的compose结果，行情不全或分组不存在时为None"""
+        return self._results.get(group)
+
+    def groups(self) -> List[Optional[str]]:
+        """所有分组（默认分组为None）"""
+        return list(self._powers)
+
+    def version(self, group: Optional[str] = None) -> int:
+        """分组输出的版本号，价格变化时加一"""
+        return self._versions.get(group, 0)
+
+    def add_listener(self, listener: Callable[[Optional[str], ComposeResult], None]):
+        """注册输出变化监听器，在事件循环中同步调用"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=settings.COMPOSE_STREAM_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def _notify(self, group: Optional[str], result: ComposeResult):
+        self.stats["published"] += 1
+        for listener in self._listeners:
+            try:
+                listener(group, result)
+            except Exception as e:
+                logger.error("Compose listener failed: %s", e)
+        if not self._subscribers:
+            return
+        item = {"group": group, "version": self._versions[group], **result.to_dict()}
+        for queue in self._subscribers:
+            if queue.full():
+                # 订阅者处理不过来时丢弃最旧的一条
+                queue.get_nowait()
+                self.stats["dropped"] += 1
+            queue.put_nowait(item)
+
+    def snapshot(self) -> List[dict]:
+        return [
+            {"group": group, "version": self._versions.get(group, 0), **result.to_dict()}
+            for group, result in self._results.items()
+        ]
+
+    def summary(self) -> dict:
+        return {
+            "groups": [{"group": group, "power": power, "version": self._versions.get(group, 0)}
+                       for group, power in self._powers.items()],
+            "inputs": len(self._dependents),
+            "evaluation": self.evaluation.snapshot(),
+            **self.stats
+        }
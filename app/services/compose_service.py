@@ -0,0 +1,197 @@
+import asyncio
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from core.config import settings
+from core.logging import logger
+from models.compose import ComposeResult
+from models.quote import Quote
+from services.binance_service import BinanceService
+from services.consensus_service import ConsensusService
+from services.exchange_adapter import deadline
+from services.google_service import GoogleService
+from services.okj_service import OKJService
+from services.power_service import PowerService
+from services.quote_cache_service import QuoteCacheService
+
+
+def round_half_up(value: float, digits: int = 2) -> float:
+    """四舍五入（ROUND_HALF_UP），按浮点数的最短十进制表示取舍，0.285 -> 0.29"""
+    return float(Decimal(repr(value)).quantize(Decimal(1).scaleb(-digits), rounding=ROUND_HALF_UP))
+
+
+class ComposeService:
+    """通过BTC价格计算USDT/JPY汇率"""
+
+    # compose计算依赖的行情 (交易所, 交易对)
+    LEGS = (("binance", "BTC/USDT"), ("okj", "BTC/JPY"), ("google", "BTC/JPY"))
+    # 共识价格使用的交易对（所有交易所）
+    CONSENSUS_LEGS = ("BTC/USDT", "BTC/JPY")
+
+    def __init__(
+        self,
+        binance_service: Optional[BinanceService] = None,
+        okj_service: Optional[OKJService] = None,
+        google_service: Optional[GoogleService] = None,
+        power_service: Optional[PowerService] = None
+    ):
+        self.binance_service = binance_service or BinanceService()
+        self.okj_service = okj_service or OKJService()
+        self.google_service = google_service or GoogleService()
+        self.power_service = power_service or PowerService()
+
+    async def get_power(self, group: Optional[str] = None, id: Optional[str] = None) -> float:
+        """获取分组的价格倍率，分组不存在时使用1.0"""
+        power = 1.0
+        if group:
+            try:
+                power_config = await self.power_service.get_config_by_group(group)
+                power = power_config.power
+                logger.info("Using power multiplier %s for group %s", power, group)
+            except HTTPException as e:
+                if e.status_code == 404:
+                    logger.warning("Power config not found for group %s, using default power 1.0", group)
+                else:
+                    raise
+        elif id:
+            try:
+                power_config = await self.power_service.get_config_by_id(id)
+                power = power_config.power
+                logger.info("Using power multiplier %s for id %s", power, id)
+            except HTTPException as e:
+                if e.status_code == 404:
+                    logger.warning("Power config not found for group id %s, using default power 1.0", id)
+                else:
+                    raise
+        return power
+
+    async def calculate(self, group: Optional[str] = None, id: Optional[str] = None) -> ComposeResult:
+        """获取倍率和行情并计算"""
+        try:
+            power = await self.get_power(group, id)
+            # 三条行情并发请求，总耗时受 COMPOSE_DEADLINE_SECONDS 限制；
+            # 交易所行情在超过各自p90耗时仍未返回时发出对冲请求
+            with deadline(settings.COMPOSE_DEADLINE_SECONDS):
+                fetched = await asyncio.gather(
+                    self.binance_service.get_price_hedged(
+                        "BTCUSDT", settings.HEDGE_ALTERNATES.get("binance:BTC/USDT", ())
+                    ),
+                    self.okj_service.get_price_hedged(
+                        "BTCJPY", settings.HEDGE_ALTERNATES.get("okj:BTC/JPY", ())
+                    ),
+                    self.google_service.get_price("BTC/JPY"),
+                    return_exceptions=True
+                )
+            errors = [item for item in fetched if isinstance(item, BaseException)]
+            for error in errors:
+                if isinstance(error, asyncio.CancelledError):
+                    raise error
+            # 请求失败或被共识价格剔除的行情改用参与共识的其他交易所的行情
+            legs = self.consensus_legs(*(None if isinstance(item, BaseException) else item for item in fetched))
+            for (venue, symbol), leg in zip(self.LEGS, legs):
+                if leg is None:
+                    if errors:
+                        raise errors[0]
+                    raise HTTPException(
+                        status_code=503,
+                        detail=f"No {symbol} quote is consistent with the consensus price"
+                    )
+            result = self.compose(*legs, power)
+            self.attach_consensus(result)
+            return result
+        except Exception as e:
+            logger.error("Failed to calculate USDT/JPY rate: %s", e)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to calculate USDT/JPY rate: {str(e)}"
+            )
+
+    @classmethod
+    def consensus_legs(cls, btc_usdt: Optional[Quote], btc_jpy: Optional[Quote],
+                       btc_jpy_google: Optional[Quote]) -> Tuple[Optional[Quote], Optional[Quote], Optional[Quote]]:
+        """
+        用共识价格校验compose的三条行情
+
+        - 行情所在交易所参与了共识价格时原样使用
+        - Binance、OKJ行情被剔除（离群值）或为None（请求失败）时，改用参与共识的其他交易所中权重最高、
+          有盘口的行情（如OKX、bitFlyer、Coincheck），Google BTC/JPY 则改用校验后的交易所BTC/JPY行情
+        - 交易对不计算共识价格时原样使用；有共识价格但没有可用的行情时为None
+        """
+        consensus_service = ConsensusService()
+        btc_usdt = cls._checked(consensus_service, "BTC/USDT", btc_usdt)
+        btc_jpy = cls._checked(consensus_service, "BTC/JPY", btc_jpy)
+        btc_jpy_google = cls._checked(consensus_service, "BTC/JPY", btc_jpy_google, substitute=False) or btc_jpy
+        return btc_usdt, btc_jpy, btc_jpy_google
+
+    @staticmethod
+    def _checked(consensus_service: ConsensusService, symbol: str, quote: Optional[Quote],
+                 substitute: bool = True) -> Optional[Quote]:
+        if symbol not in consensus_service.symbols:
+            return quote
+        price = consensus_service.get(symbol)
+        if price is None:
+            return None
+        if quote is not None and quote.exchange in price.used:
+            return quote
+        if not substitute:
+            return None
+        quote_cache = QuoteCacheService()
+        # Google只有最新价，不作为买卖价的替代
+        candidates = sorted(
+            (source for source in price.sources if source.used and source.exchange != "google"),
+            key=lambda source: source.weight, reverse=True
+        )
+        for source in candidates:
+            candidate = quote_cache.get(source.exchange, symbol)
+            if candidate is not None:
+                return candidate
+        return None
+
+    @classmethod
+    def attach_consensus(cls, result: ComposeResult):
+        """附加多交易所共识价格，任一交易对没有可用行情时不附加"""
+        consensus_service = ConsensusService()
+        btc_usdt, btc_jpy = (consensus_service.get(symbol) for symbol in cls.CONSENSUS_LEGS)
+        if btc_usdt is None or btc_jpy is None:
+            return
+        result.consensus = (btc_usdt, btc_jpy)
+        # 倍率在比值中抵消
+        result.consensus_last = round_half_up(btc_jpy.price / btc_usdt.price)
+
+    @staticmethod
+    def _scaled(quote: Quote, power: float) -> Quote:
+        """应用倍率后的行情副本"""
+        return Quote(
+            quote.exchange, quote.symbol,
+            quote.bid * power, quote.ask * power, quote.last * power, quote.ts,
+            bid_qty=quote.bid_qty, ask_qty=quote.ask_qty, volume=quote.volume,
+            change=quote.change * power, change_percent=quote.change_percent
+        )
+
+    @classmethod
+    def compose(cls, btc_usdt: Quote, btc_jpy: Quote, btc_jpy_google: Quote, power: float = 1.0) -> ComposeResult:
+        """
+        由三条行情计算USDT/JPY
+
+        - 买卖价使用OKJ的BTC/JPY和Binance的BTC/USDT（经 consensus_legs 校验后可能是其他交易所的行情）
+        - 另外给出使用Google BTC/JPY计算的最新价
+        - 任一行情是从状态快照恢复、还没有更新的行情时 restored 为真
+        """
+        btc_usdt = cls._scaled(btc_usdt, power)
+        btc_jpy = cls._scaled(btc_jpy, power)
+        btc_jpy_google = cls._scaled(btc_jpy_google, power)
+
+        bid = round_half_up(btc_jpy.bid / btc_usdt.ask)
+        ask = round_half_up(btc_jpy.ask / btc_usdt.bid)
+        last = round_half_up(btc_jpy.last / btc_usdt.last)
+        google_last = round_half_up(btc_jpy_google.last / btc_usdt.last)
+        # 计算买卖价差
+        spread = round_half_up((ask - bid) / bid * 100)
+
+        result = ComposeResult(
+            bid, ask, last, spread, google_last,
+            btc_usdt, btc_jpy, btc_jpy_google, power, btc_usdt.ts
+        )
+        quote_cache = QuoteCacheService()
+        result.restored = any(quote_cache.is_restored(q.exchange, q.symbol) for q in (btc_usdt, btc_jpy, btc_jpy_google))
+        return result
@@ -0,0 +1,149 @@
+import time
+from typing import Dict, List, Optional
+from core.config import settings
+from core.logging import logger
+from core.metrics import LatencyHistogram
+from models.consensus import ConsensusPrice, ConsensusSource
+from models.quote import Quote
+from services.quote_cache_service import QuoteCacheService
+
+# MAD换算为正态分布标准差的系数
+_MAD_SCALE = 1.4826
+
+
+def _median(values: List[float]) -> float:
+    values = sorted(values)
+    n = len(values)
+    mid = n // 2
+    return values[mid] if n % 2 else (values[mid - 1] + values[mid]) / 2
+
+
+def weighted_median(points: List[tuple]) -> float:
+    """加权中位数，points 为 (值, 权重) 列表"""
+    points = sorted(points)
+    half = sum(w for _, w in points) / 2
+    acc = 0.0
+    for value, weight in points:
+        acc += weight
+        if acc >= half:
+            return value
+    return points[-1][0]
+
+
+class ConsensusService:
+    """
+    多交易所共识价格
+
+    同一交易对在各交易所的最新价先按中位数绝对偏差（MAD）剔除离群值，
+    再按行情新旧程度衰减权重取加权中位数。可用行情少于 CONSENSUS_MIN_MAD_SOURCES 条时
+    MAD无法区分离群值（两条行情各自恰好偏离中位数一个MAD），改为与参考价格比较。
+    每次行情变化时在回调中同步重算，参与计算的行情数有上限，单次计算耗时固定在微秒级。
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self.symbols = set(settings.CONSENSUS_SYMBOLS)
+        self._results: Dict[str, ConsensusPrice] = {}
+        # 最近一次得到的共识价格，作为行情太少时的参考价格
+        self._references: Dict[str, ConsensusPrice] = {}
+        self._versions: Dict[str, int] = {}
+        self.evaluation = LatencyHistogram()
+        self.over_budget = 0
+        QuoteCacheService().add_listener(self.on_quote)
+
+    def on_quote(self, quote: Quote):
+        if quote.symbol in self.symbols:
+            self.update(quote.symbol)
+
+    def update(self, symbol: str) -> Optional[ConsensusPrice]:
+        """重新计算交易对的共识价格"""
+        started = time.perf_counter()
+        result = self.compute(symbol, QuoteCacheService().get_all(symbol), self._reference(symbol))
+        prev = self._results.get(symbol)
+        if result is None:
+            self._results.pop(symbol, None)
+            if prev is not None:
+                logger.warning("Consensus %s has no consistent quote", symbol)
+        else:
+            self._results[symbol] = result
+            self._references[symbol] = result
+            if result.rejected and (prev is None or result.rejected != prev.rejected):
+                logger.warning("Consensus %s rejected outliers: %s (median %s)", symbol, result.rejected, result.median)
+        # compose从参与共识的行情中选用买卖价，任一行情变化都可能改变结果，版本号每次重算都加一
+        self._versions[symbol] = self._versions.get(symbol, 0) + 1
+        elapsed = time.perf_counter() - started
+        self.evaluation.observe(elapsed)
+        if elapsed * 1e6 > settings.CONSENSUS_BUDGET_US:
+            self.over_budget += 1
+        return result
+
+    def _reference(self, symbol: str) -> Optional[float]:
+        """不超过 CONSENSUS_REFERENCE_MAX_AGE_SECONDS 的上一次共识价格"""
+        reference = self._references.get(symbol)
+        if reference is None or time.time() * 1000 - reference.ts > settings.CONSENSUS_REFERENCE_MAX_AGE_SECONDS * 1000:
+            return None
+        return reference.price
+
+    @staticmethod
+    def compute(symbol: str, entries: List[tuple], reference: Optional[float] = None) -> Optional[ConsensusPrice]:
+        """
+        由 (行情, 数据时长) 列表计算共识价格
+
+        - 超过 CONSENSUS_MAX_AGE_SECONDS 的行情不参与计算
+        - 偏离中位数超过 CONSENSUS_MAD_THRESHOLD 倍标准差（由MAD估计）的行情剔除，
+          标准差下限为中位数的 CONSENSUS_MIN_DEVIATION_PERCENT，避免行情几乎一致时误剔除
+        - 行情少于 CONSENSUS_MIN_MAD_SOURCES 条时，偏离参考价格（reference，没有时为权重最高的行情）
+          超过 CONSENSUS_REFERENCE_DEVIATION_PERCENT 的行情剔除
+        - 权重 = 交易所权重 × 0.5^(数据时长 / 半衰期)
+        """
+        half_life = settings.CONSENSUS_HALF_LIFE_SECONDS
+        venue_weights = settings.CONSENSUS_VENUE_WEIGHTS
+        sources = [
+            ConsensusSource(
+                quote.exchange, quote.last, age,
+                venue_weights.get(quote.exchange, 1.0) * 0.5 ** (age / half_life)
+            )
+            for quote, age in entries
+            if age <= settings.CONSENSUS_MAX_AGE_SECONDS and quote.last > 0
+        ]
+        if not sources:
+            return None
+        # 只保留最新的若干条，限制单次计算量
+        sources.sort(key=lambda s: s.age)
+        del sources[settings.CONSENSUS_MAX_SOURCES:]
+
+        median = _median([s.price for s in sources])
+        mad = _median([abs(s.price - median) for s in sources])
+        if len(sources) >= settings.CONSENSUS_MIN_MAD_SOURCES:
+            method, center = "mad", median
+            scale = max(_MAD_SCALE * mad, median * settings.CONSENSUS_MIN_DEVIATION_PERCENT / 100)
+            limit = settings.CONSENSUS_MAD_THRESHOLD * scale
+        else:
+            method = "reference"
+            center = reference if reference is not None else max(sources, key=lambda s: s.weight).price
+            limit = center * settings.CONSENSUS_REFERENCE_DEVIATION_PERCENT / 100
+        for source in sources:
+            source.used = abs(source.price - center) <= limit
+        used = [(s.price, s.weight) for s in sources if s.used and s.weight > 0]
+        if not used:
+            return None
+        return ConsensusPrice(symbol, weighted_median(used), median, mad, sources, int(time.time() * 1000), method)
+
+    def get(self, symbol: str) -> Optional[ConsensusPrice]:
+        return self._results.get(symbol)
+
+    def version(self, *symbols: str) -> tuple:
+        return tuple(self._versions.get(symbol, 0) for symbol in symbols)
+
+    def summary(self) -> dict:
+        return {
+            "prices": {symbol: result.to_dict() for symbol, result in self._results.items()},
+            "evaluation": self.evaluation.snapshot(),
+            "over_budget": self.over_budget
+        }
@@ -0,0 +1,162 @@
+import asyncio
+import gzip
+import hashlib
+import time
+from typing import Hashable, List, Optional, Tuple
+import orjson
+from fastapi import HTTPException, Request, Response
+from core.config import settings
+from core.logging import logger
+from services.compose_graph_service import ComposeGraphService
+from services.compose_service import ComposeService
+from services.consensus_service import ConsensusService
+from services.power_service import PowerService
+from services.quote_cache_service import QuoteCacheService
+
+
+class DashboardSnapshot:
+    """预先序列化并压缩好的看板数据"""
+    __slots__ = ("version", "payload", "body", "gzip_body", "etag", "built_at")
+
+    def __init__(self, version: Hashable, payload: dict, body: bytes):
+        self.version = version
+        self.payload = payload
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=6)
+        self.etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        self.built_at = time.monotonic()
+
+
+class DashboardService:
+    """
+    看板快照
+
+    把所有监控行情、每个倍率分组的compose结果、共识价格和数据新旧信息合并为一个响应，
+    由周期任务在后台重建：依赖的行情、共识价格或倍率配置变化时，或快照超过
+    DASHBOARD_MAX_AGE_SECONDS 时重新生成。展示的行情注册到后台刷新，在标记为过期前重新拉取。快照生成时即序列化并gzip压缩，
+    请求只从内存返回字节，不触发任何上游请求或计算。
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        # 看板展示的行情：价差监控列表和compose依赖的行情
+        legs = [tuple(item.split(":", 1)) for item in settings.SPREAD_WATCHLIST]
+        legs += [leg for leg in ComposeService.LEGS if leg not in legs]
+        self.legs: List[Tuple[str, str]] = legs
+        self.snapshot: Optional[DashboardSnapshot] = None
+        self._lock = asyncio.Lock()
+        self.builds = 0
+        self.failures = 0
+
+    def _version(self, power_service: PowerService) -> tuple:
+        return (
+            QuoteCacheService().version(*self.legs),
+            ConsensusService().version(*ComposeService.CONSENSUS_LEGS),
+            power_service.version
+        )
+
+    def _quotes(self) -> Tuple[dict, int]:
+        quote_cache = QuoteCacheService()
+        quotes, stale = {}, 0
+        now = time.time() * 1000
+        for venue, symbol in self.legs:
+            quote = quote_cache.get(venue, symbol)
+            if quote is None:
+                quotes[f"{venue}:{symbol}"] = None
+                stale += 1
+                continue
+            age = max(0.0, (now - quote.ts) / 1000)
+            item = quote.to_dict()
+            item["age_seconds"] = round(age, 3)
+            # 从状态快照恢复、重启后还没有更新的行情也视为过期
+            item["restored"] = quote_cache.is_restored(venue, symbol)
+            item["stale"] = age > settings.DASHBOARD_STALE_SECONDS or item["restored"]
+            stale += item["stale"]
+            quotes[f"{venue}:{symbol}"] = item
+        return quotes, stale
+
+    async def _groups(self, power_service: PowerService) -> List[dict]:
+        """默认倍率和每个分组的compose结果"""
+        quote_cache = QuoteCacheService()
+        legs = ComposeService.consensus_legs(*(quote_cache.get(venue, symbol) for venue, symbol in ComposeService.LEGS))
+        groups = [{"group": None, "id": None, "power": 1.0, "description": None}]
+        groups += [config.dict() for config in await power_service.get_all_configs()]
+        compose_graph = ComposeGraphService()
+        for group in groups:
+            if any(leg is None for leg in legs):
+                group["compose"] = None
+                continue
+            # 优先使用增量计算的结果，分组刚创建还未计算时现算
+            result = compose_graph.get(group["group"])
+            if result is None or result.power != group["power"]:
+                result = ComposeService.compose(*legs, group["power"])
+                ComposeService.attach_consensus(result)
+            group["compose"] = result.to_dict()
+        return groups
+
+    async def rebuild(self) -> Optional[DashboardSnapshot]:
+        """依赖数据变化或快照过期时重新生成快照，正在生成时返回当前快照"""
+        if self._lock.locked() and self.snapshot is not None:
+            return self.snapshot
+        async with self._lock:
+            power_service = PowerService()
+            snapshot = self.snapshot
+            if snapshot is not None \
+                    and snapshot.version == self._version(power_service) \
+                    and time.monotonic() - snapshot.built_at < settings.DASHBOARD_MAX_AGE_SECONDS:
+                return snapshot
+
+            started = time.perf_counter()
+            try:
+                version = self._version(power_service)
+                quotes, stale = self._quotes()
+                consensus_service = ConsensusService()
+                consensus = {}
+                for symbol in ComposeService.CONSENSUS_LEGS:
+                    price = consensus_service.get(symbol)
+                    consensus[symbol] = price.to_dict() if price else None
+                data = {
+                    "quotes": quotes,
+                    "groups": await self._groups(power_service),
+                    "consensus": consensus,
+                    "meta": {
+                        "generated_at": int(time.time() * 1000),
+                        "build": self.builds + 1,
+                        "stale_quotes": stale,
+                        "stale_after_seconds": settings.DASHBOARD_STALE_SECONDS,
+                        "refresh_seconds": settings.DASHBOARD_REFRESH_SECONDS
+                    }
+                }
+                data["meta"]["build_ms"] = round((time.perf_counter() - started) * 1000, 3)
+                self.snapshot = DashboardSnapshot(version, data, orjson.dumps(data))
+                self.builds += 1
+            except Exception as e:
+                # 保留上一个快照，客户端可以通过 generated_at 判断数据新旧
+                self.failures += 1
+                logger.error("Failed to rebuild dashboard snapshot: %s", e)
+            return self.snapshot
+
+    async def respond(self, request: Request) -> Response:
+        """返回快照，支持 If-None-Match 和 gzip"""
+        snapshot = self.snapshot or await self.rebuild()
+        if snapshot is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Dashboard snapshot is not available"
+            )
+        headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            if snapshot.etag in tags or "*" in tags:
+                return Response(status_code=304, headers=headers)
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            return Response(content=snapshot.gzip_body, media_type="application/json", headers=headers)
+        return Response(content=snapshot.body, media_type="application/json", headers=headers)
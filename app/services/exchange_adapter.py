@@ -0,0 +1,614 @@
+import asyncio
+import contextvars
+import json
+import ssl
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Type
+from urllib.parse import urlencode
+import aiohttp
+from fastapi import HTTPException
+from tenacity import (
+    AsyncRetrying, retry_if_exception_type, retry_if_not_exception_type, stop_after_attempt, stop_any,
+    wait_exponential_jitter
+)
+from core.config import settings
+from core.diagnostics import record_upstream
+from core.logging import logger
+from core.metrics import LatencyHistogram
+from core.proxy_pool import ProxyPool, ProxyState
+from core.ratelimit import HedgeBudget, TokenBucket
+from models.candle import Candle
+from models.quote import EXCHANGE_NAMES, OrderBook, Quote
+from services.instrument_service import Instrument, InstrumentService
+from services.market_data_service import MarketDataService
+from services.quote_cache_service import QuoteCacheService
+
+# 需要重试的上游状态码
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# 当前调用链的截止时间（time.monotonic），由 deadline() 设置
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("adapter_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    为块内（及其中创建的任务）的所有上游请求设置总时限
+
+    已有更早的截止时间时保持不变。重试等待和单次请求超时都会被截断到剩余时间内。
+    """
+    current = _deadline.get()
+    target = time.monotonic() + seconds
+    token = _deadline.set(target if current is None else min(current, target))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """距截止时间的秒数，没有截止时间时为None"""
+    target = _deadline.get()
+    return None if target is None else target - time.monotonic()
+
+
+def _stop_at_deadline(retry_state) -> bool:
+    remaining = remaining_time()
+    return remaining is not None and remaining <= 0
+
+
+_backoff = wait_exponential_jitter(initial=0.2, max=2)
+
+
+def _wait_within_deadline(retry_state) -> float:
+    """指数退避，但不超过剩余时间"""
+    wait = _backoff(retry_state)
+    remaining = remaining_time()
+    return wait if remaining is None else max(0.0, min(wait, remaining))
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """调用链的总时限已用完"""
+
+
+def _retryable(error: BaseException) -> bool:
+    """失败是否可能是上游暂时的问题（超时、网络错误、429、5xx）"""
+    if isinstance(error, HTTPException):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientError))
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, status: int, body: str):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.body = body
+
+
+class AdapterStats:
+    """单个交易所的请求统计"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedges_skipped = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self.statuses: Counter = Counter()
+        self.latency = LatencyHistogram()
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedges_skipped": self.hedges_skipped,
+            "throttled": self.throttled,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "latency": self.latency.snapshot()
+        }
+
+
+class SessionPool:
+    """每个交易所一个长连接 aiohttp 会话，所有适配器实例共用"""
+    _sessions: Dict[str, aiohttp.ClientSession] = {}
+
+    @classmethod
+    def get(cls, venue: str, headers: dict) -> aiohttp.ClientSession:
+        """venue 也可以是 "交易所@代理"，使用代理池时每个代理一个会话，连接按代理分别复用"""
+        session = cls._sessions.get(venue)
+        if session is None or session.closed:
+            ssl_context = ssl.create_default_context()
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+            connector = aiohttp.TCPConnector(
+                ssl=ssl_context,
+                limit=settings.ADAPTER_POOL_SIZE,
+                ttl_dns_cache=300
+            )
+            session = aiohttp.ClientSession(
+                headers=headers,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=settings.ADAPTER_TIMEOUT_SECONDS)
+            )
+            cls._sessions[venue] = session
+        return session
+
+    @classmethod
+    async def close_all(cls):
+        sessions, cls._sessions = cls._sessions, {}
+        for session in sessions.values():
+            await session.close()
+
+
+# 交易所名 -> 适配器类
+_REGISTRY: Dict[str, Type["ExchangeAdapter"]] = {}
+# 交易所名 -> (限流器, 统计)，同一交易所的所有实例共用
+_STATE: Dict[str, Tuple[TokenBucket, AdapterStats]] = {}
+# 交易所名 -> 对冲请求预算（对冲请求计入发起对冲的交易所）
+_HEDGE_BUDGETS: Dict[str, HedgeBudget] = {}
+# (交易所, 交易对) -> 替换快照恢复行情的后台请求
+_RESTORED_REFRESHES: Dict[Tuple[str, str], asyncio.Task] = {}
+
+
+def register_adapter(cls: Type["ExchangeAdapter"]) -> Type["ExchangeAdapter"]:
+    """类装饰器：注册交易所适配器，并向交易对注册表登记原生ID格式和交易对列表接口"""
+    _REGISTRY[cls.name] = cls
+    loader = None
+    if cls.load_instruments is not ExchangeAdapter.load_instruments:
+        async def loader():
+            return await cls().load_instruments()
+    InstrumentService.register_venue(cls.name, cls.native_symbol, loader)
+    return cls
+
+
+class ExchangeAdapter:
+    """
+    交易所适配器基类
+
+    子类只需实现与交易所相关的部分（请求路径和响应解析）：
+        - get_ticker: 单个交易对行情（必须实现）
+        - get_tickers: 批量行情，默认并发调用 get_ticker
+        - get_order_book: 盘口深度，默认不支持
+        - load_instruments: 交易对列表，默认没有
+        - subscribe: 行情订阅，默认通过轮询批量行情实现
+    连接池、限流、重试、录制/回放和请求统计由基类统一提供。
+    """
+    name: str = ""
+    base_url: str = ""
+    # 原生交易对ID格式
+    native_format: str = "{base}{quote}"
+    headers: dict = {
+        "Accept": "application/json",
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+    }
+    # 每秒请求数上限及可积累的突发请求数
+    rate_limit: float = 10.0
+    burst: int = 10
+    # 是否通过 HTTPS_PROXY 访问
+    use_proxy: bool = False
+    # 代理池（由子类按配置创建），设置后每次尝试从池中选择代理，替代 HTTPS_PROXY 和交易所级限流
+    proxy_pool: Optional[ProxyPool] = None
+    # K线周期（秒）-> 交易所参数；candle_limit 为单次请求最多返回的根数
+    candle_intervals: Dict[int, str] = {}
+    candle_limit: int = 0
+    # 只读节点是否已与主节点同步（由 ReplicationService 维护），未同步时不返回复制的行情
+    replica_synced: bool = False
+
+    def __init__(self):
+        self.market_data = MarketDataService()
+        self.proxy = (settings.HTTPS_PROXY or None) if self.use_proxy else None
+        if self.name not in _STATE:
+            _STATE[self.name] = (TokenBucket(self.rate_limit, self.burst), AdapterStats())
+        self.limiter, self.stats = _STATE[self.name]
+
+    @property
+    def display_name(self) -> str:
+        return EXCHANGE_NAMES.get(self.name, self.name)
+
+    @classmethod
+    def native_symbol(cls, base: str, quote: str) -> str:
+        return cls.native_format.format(base=base, quote=quote)
+
+    # ---- 请求 ----
+
+    async def request(self, path: str, params: Optional[dict] = None) -> Tuple[int, str]:
+        """
+        发起一次GET请求，返回 (状态码, 响应文本)
+
+        请求经过行情录制/回放服务，key 为路径加参数；
+        实际请求前先取限流令牌，网络错误和 429/5xx 按指数退避重试。
+        """
+        if settings.NODE_ROLE == "replica":
+            # 只读节点不请求上游，行情由主节点同步
+            raise HTTPException(
+                status_code=503,
+                detail=f"{self.display_name} is not requested by read-only replicas"
+            )
+        key = f"{path}?{urlencode(params)}" if params else path
+
+        async def _fetch():
+            return await self._send(f"{self.base_url}{path}", params)
+
+        return await self.market_data.fetch(self.name, key, _fetch)
+
+    def is_blocked(self, status: int, body: str) -> bool:
+        """响应是否表示被上游封锁（子类可识别验证码页面等），被封锁的响应按429重试"""
+        return status == 429
+
+    async def _send(self, url: str, params: Optional[dict]) -> Tuple[int, str]:
+        stats = self.stats
+        pool = self.proxy_pool
+
+        def _before_sleep(retry_state):
+            stats.retries += 1
+            logger.warning("Retrying %s request (attempt %s): %s",
+                           self.name, retry_state.attempt_number, retry_state.outcome.exception())
+
+        last_status: Optional[_RetryableStatus] = None
+        try:
+            async for attempt in AsyncRetrying(
+                stop=stop_any(stop_after_attempt(settings.ADAPTER_RETRY_ATTEMPTS), _stop_at_deadline),
+                wait=_wait_within_deadline,
+                retry=retry_if_exception_type((aiohttp.ClientError, asyncio.TimeoutError, _RetryableStatus))
+                & retry_if_not_exception_type(DeadlineExceeded),
+                before_sleep=_before_sleep,
+                reraise=True
+            ):
+                with attempt:
+                    # 使用代理池时每次尝试重新选择代理，重试会换到其他代理
+                    state: Optional[ProxyState] = pool.select() if pool is not None else None
+                    started = None
+                    try:
+                        limiter = state.limiter if state is not None else self.limiter
+                        try:
+                            waited = await limiter.acquire(remaining_time())
+                        except asyncio.TimeoutError:
+                            # 下一个令牌在调用链时限之后才可用，不等待；有上一次的失败响应时按其返回
+                            if last_status is None:
+                                raise DeadlineExceeded(f"Deadline exceeded waiting for {self.name} rate limit") from None
+                            if state is not None:
+                                pool.release(state)
+                            return last_status.status, last_status.body
+                        if waited:
+                            stats.throttled += 1
+                            stats.throttled_seconds += waited
+                        # 单次请求超时不超过调用链的剩余时间
+                        timeout = settings.PROXY_TIMEOUT_SECONDS if state is not None else settings.ADAPTER_TIMEOUT_SECONDS
+                        remaining = remaining_time()
+                        if remaining is not None:
+                            if remaining <= 0:
+                                # 时限用完，有上一次的失败响应时按其返回
+                                raise last_status or DeadlineExceeded(f"Deadline exceeded before requesting {self.name}")
+                            timeout = min(timeout, remaining)
+                        if state is not None:
+                            session = SessionPool.get(f"{self.name}@{state.url}", self.headers)
+                            proxy = state.proxy
+                        else:
+                            session = SessionPool.get(self.name, self.headers)
+                            proxy = self.proxy
+                        stats.requests += 1
+                        started = time.perf_counter()
+                        try:
+                            async with session.get(url, params=params, proxy=proxy,
+                                                   timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                                status, body = response.status, await response.text()
+                        finally:
+                            elapsed = time.perf_counter() - started
+                            stats.latency.observe(elapsed)
+                            record_upstream(elapsed)
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        if started is None:
+                            # 请求前就已超时（调用链时限）
+                            if state is not None:
+                                pool.release(state)
+                            raise
+                        stats.errors += 1
+                        if state is not None:
+                            error = f"{type(e).__name__}: {e}"
+                            pool.failed(state, elapsed, error)
+                            redacted = state.redact(error)
+                            if redacted != error:
+                                # 异常信息中带有代理的用户名和密码时替换，避免写入日志和响应
+                                raise aiohttp.ClientError(redacted) from None
+                        raise
+                    except BaseException:
+                        if state is not None:
+                            pool.release(state)
+                        raise
+                    stats.statuses[status] += 1
+                    blocked = self.is_blocked(status, body)
+                    if state is not None:
+                        if blocked:
+                            pool.blocked(state, elapsed, f"Blocked (HTTP {status})")
+                        elif status >= 500:
+                            pool.failed(state, elapsed, f"HTTP {status}")
+                        else:
+                            pool.succeeded(state, elapsed)
+                    if blocked and status not in RETRY_STATUSES:
+                        status = 429
+                    if status in RETRY_STATUSES:
+                        last_status = _RetryableStatus(status, body)
+                        raise last_status
+                    return status, body
+        except _RetryableStatus as e:
+            # 重试用尽后按普通失败响应返回
+            return e.status, e.body
+
+    async def get_json(self, path: str, params: Optional[dict] = None) -> Any:
+        """请求并解析JSON，非200响应交给 _raise_for_status 处理"""
+        status, body = await self.request(path, params)
+        if status != 200:
+            self._raise_for_status(status, body)
+        return json.loads(body)
+
+    def _raise_for_status(self, status: int, body: str):
+        raise HTTPException(
+            status_code=status,
+            detail=f"{self.display_name} API request failed: {body}"
+        )
+
+    # ---- 交易所接口（子类实现） ----
+
+    async def get_ticker(self, instrument: Instrument) -> Quote:
+        raise NotImplementedError
+
+    async def get_tickers(self, instruments: List[Instrument]) -> List[Quote]:
+        return list(await asyncio.gather(*(self.get_ticker(i) for i in instruments)))
+
+    async def get_order_book(self, instrument: Instrument, depth: int) -> OrderBook:
+        raise HTTPException(
+            status_code=501,
+            detail=f"Order book is not supported by {self.display_name}"
+        )
+
+    async def load_instruments(self) -> List[Instrument]:
+        raise NotImplementedError
+
+    async def get_candles(self, instrument: Instrument, interval: int, start: int, end: int) -> List[Candle]:
+        """
+        获取 [start, end) 毫秒区间内的K线，按时间升序
+
+        区间内的K线数不超过 candle_limit，分页由调用方负责。
+        """
+        raise HTTPException(
+            status_code=501,
+            detail=f"Candles are not supported by {self.display_name}"
+        )
+
+    def candle_interval(self, interval: int) -> str:
+        """K线周期对应的交易所参数"""
+        value = self.candle_intervals.get(interval)
+        if value is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported candle interval for {self.display_name}: {interval}s, "
+                       f"expected one of {sorted(self.candle_intervals)}"
+            )
+        return value
+
+    async def subscribe(self, symbols: List[str], interval: Optional[float] = None) -> AsyncIterator[Quote]:
+        """订阅行情，只推送价格变化的行情（默认实现为定时轮询批量行情）"""
+        interval = interval or settings.ADAPTER_STREAM_INTERVAL_SECONDS
+        instrument_service = InstrumentService()
+        instruments = [instrument_service.resolve(self.name, symbol) for symbol in symbols]
+        last: Dict[str, Quote] = {}
+        while True:
+            for quote in await self._guard(self.get_tickers(instruments)):
+                QuoteCacheService().put(self.name, quote.symbol, quote)
+                if not quote.same_price(last.get(quote.symbol)):
+                    last[quote.symbol] = quote
+                    yield quote
+            await asyncio.sleep(interval)
+
+    # ---- 对外接口 ----
+
+    def _replicated(self, instrument: Instrument) -> Quote:
+        """
+        只读节点：返回主节点同步的最新行情
+
+        与主节点断开（重新同步前）或行情缓存时长超过 REPLICA_MAX_QUOTE_AGE_SECONDS 时返回503，不返回过期行情
+        """
+        if not ExchangeAdapter.replica_synced:
+            raise HTTPException(
+                status_code=503,
+                detail="Replica is not synced with the leader"
+            )
+        quote_cache = QuoteCacheService()
+        quote = quote_cache.get(self.name, instrument.canonical)
+        if quote is None:
+            raise HTTPException(
+                status_code=503,
+                detail=f"{self.display_name} {instrument.canonical} has not been replicated from the leader yet"
+            )
+        age = quote_cache.age(self.name, instrument.canonical)
+        if settings.REPLICA_MAX_QUOTE_AGE_SECONDS > 0 and age is not None and age > settings.REPLICA_MAX_QUOTE_AGE_SECONDS:
+            raise HTTPException(
+                status_code=503,
+                detail=f"{self.display_name} {instrument.canonical} replicated from the leader is {age:.0f}s old"
+            )
+        return quote
+
+    async def _guard(self, coro):
+        """统一错误处理：HTTPException原样抛出，其他错误转换为500"""
+        try:
+            return await coro
+        except HTTPException:
+            raise
+        except asyncio.TimeoutError as e:
+            logger.error("%s request timed out: %s", self.display_name, e)
+            raise HTTPException(
+                status_code=504,
+                detail=f"{self.display_name} request timed out"
+            )
+        except aiohttp.ClientError as e:
+            logger.error("Network error: %s", e)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Network error: {str(e)}"
+            )
+        except Exception as e:
+            logger.error("Failed to fetch %s price: %s", self.display_name, e)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to fetch {self.display_name} price: {str(e)}"
+            )
+
+    async def get_price(self, symbol: str) -> Quote:
+        """
+        获取指定交易对的实时行情
+
+        Args:
+            symbol: 任意写法的交易对（例如：BTCUSDT, BTC-JPY, BTC/JPY）
+        """
+        # 交易对在本地注册表中校验，未知交易对不请求上游
+        instrument = InstrumentService().resolve(self.name, symbol)
+        if settings.NODE_ROLE == "replica":
+            return self._replicated(instrument)
+        quote = self._restored(instrument)
+        if quote is not None:
+            return quote
+        quote = await self._guard(self.get_ticker(instrument))
+        QuoteCacheService().put(self.name, quote.symbol, quote)
+        return quote
+
+    def _restored(self, instrument: Instrument) -> Optional[Quote]:
+        """
+        重启后使用状态快照恢复的行情（缓存时长不超过 SNAPSHOT_SERVE_SECONDS），同时在后台拉取新行情
+
+        新行情写入缓存后不再是恢复的行情，之后的请求照常请求上游；回放模式下不使用
+        """
+        if settings.SNAPSHOT_SERVE_SECONDS <= 0 or self.market_data.replaying:
+            return None
+        quote_cache = QuoteCacheService()
+        if not quote_cache.is_restored(self.name, instrument.canonical):
+            return None
+        quote = quote_cache.get(self.name, instrument.canonical, max_age=settings.SNAPSHOT_SERVE_SECONDS)
+        if quote is None:
+            return None
+        key = (self.name, instrument.canonical)
+        if key not in _RESTORED_REFRESHES:
+            # 不继承当前请求的截止时间
+            _RESTORED_REFRESHES[key] = asyncio.create_task(
+                self._refresh_restored(instrument), context=contextvars.Context()
+            )
+        return quote
+
+    async def _refresh_restored(self, instrument: Instrument):
+        try:
+            quote = await self._guard(self.get_ticker(instrument))
+            QuoteCacheService().put(self.name, quote.symbol, quote)
+        except Exception as e:
+            logger.warning("Failed to refresh restored %s %s quote: %s",
+                           self.display_name, instrument.canonical, getattr(e, "detail", e))
+        finally:
+            _RESTORED_REFRESHES.pop((self.name, instrument.canonical), None)
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        发出对冲请求前的等待时间：最近请求耗时的p90（不低于 HEDGE_MIN_DELAY_MS）
+
+        样本不足时返回None，不做对冲。
+        """
+        latency = self.stats.latency
+        if len(latency.recent) < settings.HEDGE_MIN_SAMPLES:
+            return None
+        return max(latency.percentile(90), settings.HEDGE_MIN_DELAY_MS / 1000)
+
+    async def get_price_hedged(self, symbol: str, alternates: Sequence[str] = ()) -> Quote:
+        """
+        带对冲的行情请求
+
+        请求在 hedge_delay() 内没有返回（或因超时、网络错误、429、5xx失败）时，依次向同一交易所再发一次、
+        再向 alternates 中的等价行情（"交易所:交易对"）发请求，取最先成功的结果，其余取消。
+        首个请求返回4xx等确定的错误时直接抛出，不再对冲。
+        对冲请求受预算限制（HEDGE_BUDGET_PERCENT），预算用完时只等待已发出的请求。
+        """
+        delay = self.hedge_delay() if settings.HEDGE_ENABLED else None
+        if delay is None:
+            return await self.get_price(symbol)
+        budget = _HEDGE_BUDGETS.get(self.name)
+        if budget is None:
+            budget = _HEDGE_BUDGETS[self.name] = HedgeBudget(
+                settings.HEDGE_BUDGET_PERCENT / 100, settings.HEDGE_BUDGET_BURST
+            )
+        budget.deposit()
+
+        backups = [(self, symbol)]
+        for item in alternates:
+            venue, alt_symbol = item.split(":", 1)
+            backups.append((_REGISTRY[venue](), alt_symbol))
+
+        primary = asyncio.create_task(self.get_price(symbol))
+        pending = {primary}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=delay if backups else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.stats.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+                    if task is primary and not _retryable(error):
+                        # 参数错误、交易对不存在等确定的失败，对冲也不会成功
+                        raise error
+                if backups:
+                    if budget.withdraw():
+                        adapter, backup_symbol = backups.pop(0)
+                        self.stats.hedges += 1
+                        pending.add(asyncio.create_task(adapter.get_price(backup_symbol)))
+                    else:
+                        self.stats.hedges_skipped += 1
+                        backups = []
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def get_prices(self, symbols: List[str]) -> List[Quote]:
+        """批量获取行情"""
+        instrument_service = InstrumentService()
+        instruments = [instrument_service.resolve(self.name, symbol) for symbol in symbols]
+        if settings.NODE_ROLE == "replica":
+            return [self._replicated(instrument) for instrument in instruments]
+        quotes = await self._guard(self.get_tickers(instruments))
+        quote_cache = QuoteCacheService()
+        for quote in quotes:
+            quote_cache.put(self.name, quote.symbol, quote)
+        return quotes
+
+    async def get_book(self, symbol: str, depth: int = 20) -> OrderBook:
+        """获取盘口深度"""
+        instrument = InstrumentService().resolve(self.name, symbol)
+        return await self._guard(self.get_order_book(instrument, depth))
+
+    async def get_history(self, instrument: Instrument, interval: int, start: int, end: int) -> List[Candle]:
+        """获取 [start, end) 内的K线（不超过 candle_limit 根）"""
+        return await self._guard(self.get_candles(instrument, interval, start, end))
+
+    def info(self) -> dict:
+        """适配器能力和请求统计"""
+        cls = type(self)
+        return {
+            "name": self.name,
+            "display_name": self.display_name,
+            "order_book": cls.get_order_book is not ExchangeAdapter.get_order_book,
+            "batch_tickers": cls.get_tickers is not ExchangeAdapter.get_tickers,
+            "instruments": cls.load_instruments is not ExchangeAdapter.load_instruments,
+            "candle_intervals": sorted(self.candle_intervals),
+            "rate_limit": self.rate_limit,
+            "proxy_pool": self.proxy_pool.summary() if self.proxy_pool is not None else None,
+            "stats": self.stats.to_dict()
+        }
@@ -0,0 +1,32 @@
+from typing import Dict, List
+from fastapi import HTTPException
+from models.exchange import Exchange
+from services.exchange_adapter import ExchangeAdapter, _REGISTRY
+# 导入即注册
+from services.binance_service import BinanceService
+from services.okx_service import OKXService
+from services.okj_service import OKJService
+from services.google_service import GoogleService
+from services.bitflyer_service import BitflyerService
+from services.coincheck_service import CoincheckService
+
+_instances: Dict[str, ExchangeAdapter] = {}
+
+
+def get_adapter(exchange: str) -> ExchangeAdapter:
+    """按交易所名获取适配器"""
+    name = exchange.value if isinstance(exchange, Exchange) else exchange
+    adapter = _instances.get(name)
+    if adapter is None:
+        cls = _REGISTRY.get(name)
+        if cls is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown exchange: {name}"
+            )
+        adapter = _instances[name] = cls()
+    return adapter
+
+
+def list_adapters() -> List[ExchangeAdapter]:
+    return [get_adapter(exchange) for exchange in Exchange if exchange.value in _REGISTRY]
@@ -1,4 +1,3 @@
-import aiohttp
 from fastapi import HTTPException
 from datetime import datetime, timedelta
 from core.logging import logger
@@ -6,26 +5,43 @@ import re
 from bs4 import BeautifulSoup
 from decimal import Decimal
 from core.config import settings
-import ssl
+from core.proxy_pool import ProxyPool
 import json
 from pathlib import Path
 import aiofiles
+import time
+from models.quote import Quote
+from services.exchange_adapter import ExchangeAdapter, register_adapter
+from services.instrument_service import Instrument, InstrumentService
+from services.quote_cache_service import QuoteCacheService
+
+@register_adapter
+class GoogleService(ExchangeAdapter):
+    """Google Finance 页面抓取（只有最新价，没有盘口）"""
+    name = "google"
+    base_url = "https://www.google.com"
+    native_format = "{base}-{quote}"
+    headers = {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:109.0) Gecko/20100101 Firefox/119.0"
+    }
+    rate_limit = 1.0
+    burst = 5
+    # 使用配置的代理
+    use_proxy = True
+    # 验证码页面的特征
+    BLOCK_MARKERS = ("unusual traffic from your computer network", "/sorry/index", "g-recaptcha")
 
-class GoogleService:
     def __init__(self):
-        self.base_url = "https://www.google.com/finance/quote"
-        self.search_url = "https://www.google.com/search"
-        self.headers = {
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:109.0) Gecko/20100101 Firefox/119.0"
-        }
-        # 配置SSL
-        self.ssl_context = ssl.create_default_context()
-        self.ssl_context.check_hostname = False
-        self.ssl_context.verify_mode = ssl.CERT_NONE
-        # 使用配置的代理
-        self.proxy = settings.HTTPS_PROXY if settings.HTTPS_PROXY != "" else None
+        super().__init__()
+        # 配置了代理池时所有实例共用一个池，每个代理按 rate_limit 限流
+        if settings.GOOGLE_PROXIES and GoogleService.proxy_pool is None:
+            GoogleService.proxy_pool = ProxyPool(
+                settings.GOOGLE_PROXIES, self.rate_limit, self.burst,
+                settings.PROXY_COOLDOWN_SECONDS, settings.PROXY_MAX_COOLDOWN_SECONDS,
+                settings.PROXY_FAILURES_BEFORE_COOLDOWN
+            )
         
         # 缓存配置
         self.cache_dir = Path("cache")
@@ -66,94 +82,89 @@ class GoogleService:
         except Exception:
             return False
     
-    async def get_price(self, symbol: str) -> dict:
+    def is_blocked(self, status: int, body: str) -> bool:
+        """429或验证码页面（Google限流时常返回带验证码的200/302页面）"""
+        if status == 429:
+            return True
+        head = body[:20000]
+        return any(marker in head for marker in self.BLOCK_MARKERS)
+
+    async def get_ticker(self, instrument: Instrument) -> Quote:
+        """从Google Finance页面抓取最新价"""
+        formatted_symbol = instrument.native_id
+        logger.info("Fetching from Google Finance for: %s", formatted_symbol)
+        logger.debug("Using proxy: %s", "pool" if self.proxy_pool is not None else self.proxy)
+        
+        status, html = await self.request(f"/finance/quote/{formatted_symbol}")
+        if status != 200:
+            raise HTTPException(
+                status_code=status,
+                detail=f"Failed to fetch data from Google Finance: HTTP {status}"
+            )
+        
+        price_info = self._extract_price_from_finance(html, formatted_symbol)
+        price = price_info["price"]
+        return Quote(
+            "google", instrument.canonical,
+            price, price, price,
+            int(time.time() * 1000),
+            volume=price_info.get("volume_24h", 0.0),
+            change=price_info.get("price_change_24h", 0.0),
+            change_percent=price_info.get("price_change_percent", 0.0)
+        )
+    
+    async def get_price(self, symbol: str) -> Quote:
         """
         从Google Finance获取价格信息，支持缓存
         """
+        if settings.NODE_ROLE == "replica":
+            # 只读节点直接使用主节点同步的行情
+            return await super().get_price(symbol)
+        # 格式化交易对（Google Finance格式: BTC-JPY）
+        instrument = InstrumentService().resolve("google", symbol)
+        quote_cache = QuoteCacheService()
+        # 回放模式下跳过缓存，保证结果只取决于录制文件
+        use_cache = not self.market_data.replaying
         try:
-            # 格式化交易对
-            formatted_symbol = self._format_symbol(symbol)
-            
+            # 先查内存中的最新行情，命中时不再读取磁盘缓存
+            if use_cache:
+                cached = quote_cache.get("google", instrument.canonical, max_age=self.cache_expire_minutes * 60)
+                if cached is not None:
+                    return cached
+
             # 检查缓存
-            cache_data = await self._read_cache()
+            cache_data = await self._read_cache() if use_cache else {}
             if symbol in cache_data:
                 cache_entry = cache_data[symbol]
                 if self._is_cache_valid(cache_entry["timestamp"]):
-                    logger.info(f"Cache hit for symbol: {symbol}")
-                    return cache_entry
+                    logger.info("Cache hit for symbol: %s", symbol)
+                    result = Quote.from_dict("google", cache_entry)
+                    quote_cache.put("google", instrument.canonical, result)
+                    return result
             
             # 如果缓存不存在或已过期，从Google Finance获取数据
-            formatted_symbol = formatted_symbol.replace("/", "-")  # 转换为Google Finance格式
-            logger.info(f"Fetching from Google Finance for: {formatted_symbol}")
-            logger.info(f"Using proxy: {self.proxy}")
-            
-            # 使用SSL和代理配置
-            connector = aiohttp.TCPConnector(ssl=self.ssl_context)
-            timeout = aiohttp.ClientTimeout(total=10, connect=5)
+            result = await super().get_price(symbol)
             
-            async with aiohttp.ClientSession(headers=self.headers, connector=connector) as session:
-                async with session.get(
-                    f"{self.base_url}/{formatted_symbol}",
-                    proxy=self.proxy if self.proxy else None,
-                    timeout=timeout
-                ) as response:
-                    if response.status != 200:
-                        raise HTTPException(
-                            status_code=response.status,
-                            detail=f"Failed to fetch data from Google Finance: HTTP {response.status}"
-                        )
-                    
-                    html = await response.text()
-                    price_info = self._extract_price_from_finance(html, formatted_symbol)
-                    
-                    # 构建响应数据
-                    result = {
-                        "symbol": symbol,
-                        "exchange": "Google Finance",
-                        "bid_price": price_info["price"],
-                        "ask_price": price_info["price"],
-                        "last_price": price_info["price"],
-                        "bid_qty": 0,
-                        "ask_qty": 0,
-                        "volume_24h": price_info.get("volume_24h", 0),
-                        "timestamp": datetime.now().isoformat(),
-                        "price_change_24h": price_info.get("price_change_24h", 0),
-                        "price_change_percent": price_info.get("price_change_percent", 0)
-                    }
-                    
-                    # 更新缓存
-                    cache_data[symbol] = result
-                    await self._write_cache(cache_data)
-                    
-                    return result
+            # 更新缓存
+            if use_cache:
+                cache_data[symbol] = result.to_dict()
+                await self._write_cache(cache_data)
+            return result
                     
         except Exception as e:
-            logger.error(f"Failed to fetch price from Google Finance: {str(e)}")
+            detail = getattr(e, "detail", str(e))
+            logger.error("Failed to fetch price from Google Finance: %s", detail)
             # 尝试返回缓存数据
-            cache_data = await self._read_cache()
+            cache_data = await self._read_cache() if use_cache else {}
             if symbol in cache_data:
-                logger.info(f"Returning cached data for {symbol} after error")
-                return cache_data[symbol]
+                logger.info("Returning cached data for %s after error", symbol)
+                return Quote.from_dict("google", cache_data[symbol])
             # 如果没有缓存数据，则抛出异常
             raise HTTPException(
                 status_code=500,
-                detail=f"Failed to fetch price from Google Finance: {str(e)}"
+                detail=f"Failed to fetch price from Google Finance: {detail}"
             )
     
-    def _format_symbol(self, symbol: str) -> str:
-        """格式化交易对为Google搜索格式"""
-        symbol = symbol.upper()
-        # 处理不同的分隔符
-        symbol = symbol.replace("-", "/").replace("_", "/")
-        if "/" not in symbol:
-            if "JPY" in symbol:
-                base = symbol.replace("JPY", "")
-                return f"{base}/JPY"
-            elif "USDT" in symbol:
-                base = symbol.replace("USDT", "")
-                return f"{base}/USDT"
-        return symbol
-    
     def _extract_price_from_finance(self, html: str, symbol: str) -> dict:
         """从Google Finance页面提取价格信息"""
         try:
@@ -165,7 +176,7 @@ class GoogleService:
                 with open(debug_file, 'w', encoding='utf-8') as f:
                     f.write(html)
             except Exception as e:
-                logger.warning(f"Failed to save debug HTML: {e}")
+                logger.warning("Failed to save debug HTML: %s", e)
 
             # Google Finance特定的价格选择器
             price_selectors = [
@@ -186,7 +197,7 @@ class GoogleService:
             
             # 提取价格文本
             price_text = price_element.text.strip()
-            logger.debug(f"Found price text: {price_text}")
+            logger.debug("Found price text: %s", price_text)
             
             # 移除货币符号并提取数字
             price_text = re.sub(r'[^\d,.]', '', price_text)
@@ -230,7 +241,7 @@ class GoogleService:
                     result["price_change_24h"] = float(change_match.group(1).replace(',', ''))
                     result["price_change_percent"] = float(change_match.group(2).replace(',', ''))
             
-            logger.info(f"Successfully extracted price info from Google Finance for {symbol}")
+            logger.info("Successfully extracted price info from Google Finance for %s", symbol)
             return result
             
         except Exception as e:
@@ -240,9 +251,9 @@ class GoogleService:
             try:
                 with open(error_file, 'w', encoding='utf-8') as f:
                     f.write(html)
-                logger.info(f"Saved error HTML to {error_file}")
+                logger.info("Saved error HTML to %s", error_file)
             except Exception as write_err:
-                logger.warning(f"Failed to save error HTML: {write_err}")
+                logger.warning("Failed to save error HTML: %s", write_err)
             raise ValueError(f"Could not extract price information from Google Finance for {symbol}: {str(e)}")
 
     def _parse_volume(self, volume_text: str) -> float:
@@ -262,5 +273,5 @@ class GoogleService:
             volume = float(volume_text.replace(',', ''))
             return volume * multiplier
         except Exception as e:
-            logger.warning(f"Failed to parse volume: {volume_text}, error: {e}")
+            logger.warning("Failed to parse volume: %s, error: %s", volume_text, e)
             return 0 
\ No newline at end of file
@@ -0,0 +1,120 @@
+import asyncio
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional, Set
+from core.config import settings
+from models.candle import Candle
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    venue TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    interval INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    close REAL NOT NULL,
+    volume REAL NOT NULL,
+    PRIMARY KEY (venue, symbol, interval, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS backfill_chunks (
+    venue TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    interval INTEGER NOT NULL,
+    chunk_start INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (venue, symbol, interval, chunk_start)
+) WITHOUT ROWID;
+"""
+
+
+class HistoryStore:
+    """
+    本地K线历史库（SQLite）
+
+    K线按 (交易所, 交易对, 周期, 开盘时间) 作主键，重复写入直接覆盖。
+    backfill_chunks 记录回补已完成的分段，用于中断后续传。
+    数据库操作在线程中执行，不阻塞事件循环。
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self.db_file = Path(settings.DATA_DIR) / settings.HISTORY_DB_FILE
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    # ---- 写入 ----
+
+    def _write_chunk(self, venue: str, symbol: str, interval: int, candles: List[Candle],
+                     chunk_start: Optional[int]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(venue, symbol, interval) + candle for candle in candles]
+            )
+            if chunk_start is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO backfill_chunks VALUES (?, ?, ?, ?, ?)",
+                    (venue, symbol, interval, chunk_start, len(candles))
+                )
+
+    async def write_chunk(self, venue: str, symbol: str, interval: int, candles: List[Candle],
+                          chunk_start: Optional[int] = None):
+        """
+        批量写入K线，chunk_start 不为空时在同一事务中记录该分段已完成
+
+        K线和分段记录一起提交，进程中途退出不会出现记录完成但数据缺失的分段。
+        """
+        await asyncio.to_thread(self._write_chunk, venue, symbol, interval, candles, chunk_start)
+
+    # ---- 查询 ----
+
+    def _fetch(self, sql: str, params: tuple) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    async def completed_chunks(self, venue: str, symbol: str, interval: int, start: int, end: int) -> Set[int]:
+        """[start, end) 内已完成回补的分段起点"""
+        rows = await asyncio.to_thread(
+            self._fetch,
+            "SELECT chunk_start FROM backfill_chunks "
+            "WHERE venue = ? AND symbol = ? AND interval = ? AND chunk_start >= ? AND chunk_start < ?",
+            (venue, symbol, interval, start, end)
+        )
+        return {row[0] for row in rows}
+
+    async def query(self, venue: str, symbol: str, interval: int, start: int, end: int,
+                    limit: int) -> List[Candle]:
+        """[start, end) 内的K线，按时间升序"""
+        return await asyncio.to_thread(
+            self._fetch,
+            "SELECT ts, open, high, low, close, volume FROM candles "
+            "WHERE venue = ? AND symbol = ? AND interval = ? AND ts >= ? AND ts < ? "
+            "ORDER BY ts LIMIT ?",
+            (venue, symbol, interval, start, end, limit)
+        )
+
+    async def coverage(self) -> List[dict]:
+        """每个 (交易所, 交易对, 周期) 已保存的K线数量和时间范围"""
+        rows = await asyncio.to_thread(
+            self._fetch,
+            "SELECT venue, symbol, interval, COUNT(*), MIN(ts), MAX(ts) FROM candles "
+            "GROUP BY venue, symbol, interval",
+            ()
+        )
+        return [
+            {"venue": r[0], "symbol": r[1], "interval": r[2], "count": r[3], "first": r[4], "last": r[5]}
+            for r in rows
+        ]
@@ -0,0 +1,231 @@
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from core.logging import logger
+
+# 无法从交易所列表识别时，用于拆分 BASEQUOTE 格式交易对的计价币种（按长度优先匹配）
+KNOWN_QUOTES = ("FDUSD", "USDT", "USDC", "BUSD", "JPY", "USD", "EUR", "BTC", "ETH")
+# 解析结果最多缓存的原始输入数，超出时淘汰最久未使用的
+_MAX_RESOLVED = 4096
+
+# (BASE, QUOTE) -> 交易所原生交易对ID
+NativeSymbol = Callable[[str, str], str]
+# 加载交易所的全部交易对
+InstrumentLoader = Callable[[], Awaitable[List["Instrument"]]]
+
+
+class Instrument:
+    """交易所上的一个交易对"""
+    __slots__ = ("venue", "native_id", "base", "quote", "tick_size", "status")
+
+    def __init__(self, venue: str, native_id: str, base: str, quote: str,
+                 tick_size: Optional[float] = None, status: str = "unknown"):
+        self.venue = venue
+        self.native_id = native_id
+        self.base = base
+        self.quote = quote
+        self.tick_size = tick_size
+        self.status = status
+
+    @property
+    def canonical(self) -> str:
+        return f"{self.base}/{self.quote}"
+
+    @property
+    def tradable(self) -> bool:
+        return self.status in ("live", "unknown")
+
+    def to_dict(self) -> dict:
+        return {
+            "native_id": self.native_id,
+            "tick_size": self.tick_size,
+            "status": self.status
+        }
+
+
+class InstrumentService:
+    """
+    交易对注册表
+
+    启动时加载各交易所适配器提供的交易对列表，并定期刷新，
+    维护 BASE/QUOTE 到各交易所原生ID、最小价格单位和状态的映射。
+    已加载列表的交易所上不存在的交易对直接在本地拒绝，不再请求上游。
+    """
+    _instance = None
+    # 交易所 -> (原生ID格式, 交易对列表加载函数)，由交易所适配器注册
+    _venues: Dict[str, Tuple[NativeSymbol, Optional[InstrumentLoader]]] = {}
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    @classmethod
+    def register_venue(cls, venue: str, native_symbol: NativeSymbol, loader: Optional[InstrumentLoader] = None):
+        """注册交易所；没有交易对列表接口的交易所只按原生ID格式生成"""
+        cls._venues[venue] = (native_symbol, loader)
+
+    def _init(self):
+        # venue -> canonical -> Instrument
+        self._instruments: Dict[str, Dict[str, Instrument]] = {}
+        # 各种写法（BTCJPY, BTC-JPY, BTC_JPY）-> canonical
+        self._aliases: Dict[str, str] = {}
+        # (venue, 原始输入) -> Instrument，按LRU淘汰，刷新时清空
+        self._resolved: "OrderedDict[Tuple[str, str], Instrument]" = OrderedDict()
+        self._loaded_at: Dict[str, datetime] = {}
+        # 交易对列表每次更新后加一
+        self.version = 0
+
+    async def refresh(self):
+        """并发刷新所有交易所的交易对列表，单个交易所失败不影响其他交易所"""
+        await asyncio.gather(*(
+            self._load(venue, loader) for venue, (_, loader) in self._venues.items() if loader is not None
+        ))
+        self._rebuild_aliases()
+
+    async def _load(self, venue: str, loader: InstrumentLoader):
+        try:
+            instruments = {}
+            for instrument in await loader():
+                instruments[instrument.canonical] = instrument
+            self._instruments[venue] = instruments
+            self._loaded_at[venue] = datetime.now()
+            logger.info("Loaded %s instruments from %s", len(instruments), venue)
+        except Exception as e:
+            logger.error("Failed to load instruments from %s: %s", venue, e)
+
+    def _rebuild_aliases(self):
+        aliases = {}
+        for instruments in self._instruments.values():
+            for canonical, instrument in instruments.items():
+                for sep in ("", "-", "_", "/"):
+                    aliases.setdefault(f"{instrument.base}{sep}{instrument.quote}", canonical)
+        self._aliases = aliases
+        self._resolved = OrderedDict()
+        self.version += 1
+
+    def export(self) -> dict:
+        """已加载的交易对列表（用于状态快照）"""
+        return {
+            venue: {
+                "loaded_at": self._loaded_at[venue].isoformat() if venue in self._loaded_at else None,
+                "instruments": [[i.native_id, i.base, i.quote, i.tick_size, i.status] for i in instruments.values()]
+            }
+            for venue, instruments in self._instruments.items()
+        }
+
+    def restore(self, data: dict, overwrite: bool = False) -> int:
+        """
+        从状态快照（或主节点）恢复交易对列表，返回恢复的交易对数
+
+        Args:
+            overwrite: 是否覆盖已加载的交易所，只读节点同步主节点的列表时为True
+        """
+        count = 0
+        for venue, item in data.items():
+            if venue not in self._venues or (venue in self._instruments and not overwrite):
+                continue
+            try:
+                instruments = {}
+                for native_id, base, quote, tick_size, status in item["instruments"]:
+                    instrument = Instrument(venue, native_id, base, quote, tick_size, status)
+                    instruments[instrument.canonical] = instrument
+                loaded_at = datetime.fromisoformat(item["loaded_at"]) if item.get("loaded_at") else None
+            except (AttributeError, KeyError, TypeError, ValueError) as e:
+                # 格式不正确的交易所跳过，照常从上游加载
+                logger.warning("Ignoring malformed instruments of %s: %s", venue, e)
+                continue
+            self._instruments[venue] = instruments
+            if loaded_at is not None:
+                self._loaded_at[venue] = loaded_at
+            count += len(instruments)
+        self._rebuild_aliases()
+        return count
+
+    def canonical(self, symbol: str) -> str:
+        """把 BTCJPY / BTC-JPY / BTC_JPY / btc/jpy 统一为 BTC/JPY"""
+        symbol = symbol.upper()
+        canonical = self._aliases.get(symbol)
+        if canonical:
+            return canonical
+        normalized = symbol.replace("-", "/").replace("_", "/")
+        if "/" in normalized:
+            return normalized
+        for quote in KNOWN_QUOTES:
+            if symbol.endswith(quote) and len(symbol) > len(quote):
+                return f"{symbol[:-len(quote)]}/{quote}"
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid symbol: {symbol}"
+        )
+
+    def resolve(self, venue: str, symbol: str) -> Instrument:
+        """
+        解析交易对在指定交易所上的原生信息
+
+        Args:
+            venue: 交易所（binance, okx, okj, google）
+            symbol: 任意写法的交易对
+
+        Raises:
+            HTTPException(400): 交易对格式无效、交易所上不存在或已停止交易
+        """
+        key = (venue, symbol)
+        instrument = self._resolved.get(key)
+        if instrument is not None:
+            self._resolved.move_to_end(key)
+            return instrument
+
+        if venue not in self._venues:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown exchange: {venue}"
+            )
+        canonical = self.canonical(symbol)
+        instruments = self._instruments.get(venue)
+        if instruments is not None:
+            instrument = instruments.get(canonical)
+            if instrument is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unknown symbol for {venue}: {symbol}"
+                )
+            if not instrument.tradable:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Symbol {symbol} is not trading on {venue} (status: {instrument.status})"
+                )
+        else:
+            # 交易对列表未加载（如Google或加载失败）时按交易所的命名规则生成
+            base, quote = canonical.split("/", 1)
+            instrument = Instrument(venue, self._venues[venue][0](base, quote), base, quote)
+
+        # 未加载列表的交易所（如Google）任何格式有效的输入都能解析，按LRU限制缓存大小
+        self._resolved[key] = instrument
+        if len(self._resolved) > _MAX_RESOLVED:
+            self._resolved.popitem(last=False)
+        return instrument
+
+    def lookup(self, symbol: str) -> dict:
+        """交易对在各交易所上的信息"""
+        canonical = self.canonical(symbol)
+        return {
+            "symbol": canonical,
+            "venues": {
+                venue: instruments[canonical].to_dict()
+                for venue, instruments in self._instruments.items()
+                if canonical in instruments
+            }
+        }
+
+    def summary(self) -> dict:
+        return {
+            venue: {
+                "count": len(self._instruments[venue]),
+                "loaded_at": loaded_at.isoformat()
+            }
+            for venue, loaded_at in self._loaded_at.items()
+        }
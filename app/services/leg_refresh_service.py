@@ -0,0 +1,118 @@
+import asyncio
+import time
+from typing import Dict, Iterable, List, Tuple
+from core.config import settings
+from core.logging import logger
+from services.exchanges import get_adapter
+from services.quote_cache_service import QuoteCacheService
+
+# (交易所, 交易对)
+Leg = Tuple[str, str]
+
+
+def parse_legs(items: Iterable[str]) -> List[Leg]:
+    """把 "交易所:交易对" 列表转换为 (交易所, 交易对)"""
+    return [tuple(item.split(":", 1)) for item in items]
+
+
+class LegRefreshService:
+    """
+    行情后台刷新
+
+    价差监控、共识价格、看板和主节点都需要在没有用户请求时保持行情不过期。各自按名称注册
+    需要的行情和可接受的最长缓存时长（同一行情取最短的），周期任务 leg_refresh 每
+    LEG_REFRESH_TICK_SECONDS 检查一次，只请求缓存时长已超过要求的行情，其他请求刚拉取过的直接复用。
+    每轮最多请求 LEG_REFRESH_MAX_PER_TICK 条（超时最多的优先），其余留到下一轮，上游请求速率有固定上限；
+    同一行情两次请求至少间隔它的缓存时长，请求失败或上游仍返回旧行情（如Google的页面缓存）时不会每轮重试。
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        # 注册方 -> 行情 -> 最长缓存时长（秒）
+        self._owners: Dict[str, Dict[Leg, float]] = {}
+        # 行情 -> 所有注册方中最短的缓存时长
+        self._max_age: Dict[Leg, float] = {}
+        # 行情 -> 上次请求的时间（monotonic）
+        self._attempted: Dict[Leg, float] = {}
+        self.stats = {"runs": 0, "fetched": 0, "failed": 0, "deferred": 0}
+
+    def register(self, owner: str, legs: Iterable[Leg], max_age: float):
+        """
+        注册需要保持新鲜的行情，同一注册方重复注册时替换
+
+        Args:
+            max_age: 可接受的最长缓存时长（秒），<=0 表示取消注册
+        """
+        if max_age > 0:
+            self._owners[owner] = {leg: max_age for leg in legs}
+        else:
+            self._owners.pop(owner, None)
+        self._max_age = {}
+        for owned in self._owners.values():
+            for leg, age in owned.items():
+                self._max_age[leg] = min(age, self._max_age.get(leg, age))
+
+    def unregister(self, owner: str):
+        self.register(owner, (), 0)
+
+    def _due(self) -> List[Leg]:
+        """缓存时长超过要求、且距上次请求已超过该时长的行情，超时比例高的在前"""
+        quote_cache = QuoteCacheService()
+        now = time.monotonic()
+        due = []
+        for leg, max_age in self._max_age.items():
+            if now - self._attempted.get(leg, float("-inf")) < max_age:
+                continue
+            age = quote_cache.age(*leg)
+            if age is None:
+                due.append((float("inf"), leg))
+            elif age >= max_age or quote_cache.is_restored(*leg):
+                due.append((age / max_age, leg))
+        due.sort(key=lambda item: item[0], reverse=True)
+        return [leg for _, leg in due]
+
+    async def refresh(self):
+        """请求到期的行情（周期任务），结果由行情缓存通知价差、共识价格等"""
+        self.stats["runs"] += 1
+        due = self._due()
+        batch = due[:max(settings.LEG_REFRESH_MAX_PER_TICK, 0)]
+        self.stats["deferred"] += len(due) - len(batch)
+        if not batch:
+            return
+        now = time.monotonic()
+        for leg in batch:
+            self._attempted[leg] = now
+        results = await asyncio.gather(
+            *(get_adapter(venue).get_price(symbol) for venue, symbol in batch),
+            return_exceptions=True
+        )
+        for (venue, symbol), result in zip(batch, results):
+            if isinstance(result, Exception):
+                self.stats["failed"] += 1
+                logger.warning("Failed to refresh %s:%s: %s", venue, symbol, getattr(result, "detail", result))
+            else:
+                self.stats["fetched"] += 1
+
+    def summary(self) -> dict:
+        quote_cache = QuoteCacheService()
+        legs = []
+        for leg, max_age in self._max_age.items():
+            age = quote_cache.age(*leg)
+            legs.append({
+                "leg": f"{leg[0]}:{leg[1]}",
+                "max_age_seconds": max_age,
+                "age_seconds": round(age, 3) if age is not None else None,
+                "owners": [owner for owner, owned in self._owners.items() if leg in owned]
+            })
+        return {
+            "tick_seconds": settings.LEG_REFRESH_TICK_SECONDS,
+            "max_per_tick": settings.LEG_REFRESH_MAX_PER_TICK,
+            "legs": legs,
+            **self.stats
+        }
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Dict, Hashable, Optional, Tuple
+import aiofiles
+import telegramify_markdown
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, RetryAfter
+from core.config import settings
+from core.logging import logger
+from services.telegram_service import TelegramService
+
+
+class LiveBoard:
+    """一个会话中某个分组的置顶价格消息"""
+    __slots__ = ("chat_id", "group", "message_id", "text", "pending", "fingerprint", "task")
+
+    def __init__(self, chat_id: str, group: str, message_id: Optional[int] = None):
+        self.chat_id = chat_id
+        self.group = group
+        self.message_id = message_id
+        # 消息当前显示的内容（MarkdownV2）
+        self.text: Optional[str] = None
+        # 等待写入的最新内容
+        self.pending: Optional[str] = None
+        # 最近一次提交的内容指纹（写入失败时清空）
+        self.fingerprint: Optional[Hashable] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "chat_id": self.chat_id,
+            "group": self.group or None,
+            "message_id": self.message_id,
+            "pending": self.pending is not None
+        }
+
+
+class LiveBoardService:
+    """
+    价格看板消息（BROADCAST_MODE=board）
+
+    每个 (会话, 分组) 只保留一条置顶消息，广播时用 edit_message_text 原地更新。
+    内容指纹（默认为文本本身，广播时为价格字段）与上次提交的相同时不发请求；同一会话两次编辑至少间隔
+    LIVE_BOARD_MIN_EDIT_SECONDS，间隔内到达的更新只保留最新一次，到期后合并写入。
+    消息ID保存在 DATA_DIR/LIVE_BOARD_FILE，重启后继续编辑原消息。
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self.boards_file = Path(settings.DATA_DIR) / settings.LIVE_BOARD_FILE
+        self._boards: Dict[Tuple[str, str], LiveBoard] = {}
+        # 会话 -> 下次允许编辑的时间（同一会话的所有看板共用编辑频率限制）
+        self._next_edit: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.stats = {"updates": 0, "unchanged": 0, "coalesced": 0, "edits": 0, "sends": 0, "failed": 0}
+        self._load()
+
+    def _load(self):
+        if not self.boards_file.exists():
+            return
+        try:
+            with open(self.boards_file, 'r') as f:
+                data = json.load(f)
+            for item in data.get("boards", []):
+                board = LiveBoard(str(item["chat_id"]), item["group"] or "", item["message_id"])
+                self._boards[(board.chat_id, board.group)] = board
+            logger.info("Loaded %s live board(s)", len(self._boards))
+        except Exception as e:
+            logger.error("Failed to load live boards: %s", e)
+
+    async def _persist(self):
+        try:
+            self.boards_file.parent.mkdir(parents=True, exist_ok=True)
+            data = {"boards": [
+                {"chat_id": board.chat_id, "group": board.group, "message_id": board.message_id}
+                for board in self._boards.values() if board.message_id is not None
+            ]}
+            async with aiofiles.open(self.boards_file, 'w') as f:
+                await f.write(json.dumps(data, indent=2, ensure_ascii=False))
+        except Exception as e:
+            logger.error("Failed to write live boards: %s", e)
+
+    def update(self, markdown_text: str, group: Optional[str] = None, chat_id: Optional[str] = None,
+               fingerprint: Optional[Hashable] = None):
+        """
+        提交看板的最新内容，不等待写入
+
+        Args:
+            markdown_text: 标准Markdown文本
+            group: 倍率分组，默认分组为空
+            chat_id: 目标会话，默认为 TG_GID
+            fingerprint: 决定内容是否变化的值（如价格字段），文本中含有每次都变化的部分（计算时间）时使用，
+                         默认比较文本
+        """
+        self.stats["updates"] += 1
+        chat_id = str(chat_id or TelegramService().default_chat_id)
+        key = (chat_id, group or "")
+        board = self._boards.get(key)
+        if board is None:
+            board = self._boards[key] = LiveBoard(*key)
+        if fingerprint is None:
+            fingerprint = markdown_text
+        if fingerprint == board.fingerprint:
+            self.stats["unchanged"] += 1
+            return
+        board.fingerprint = fingerprint
+        text = telegramify_markdown.markdownify(markdown_text)
+        if board.pending is not None:
+            # 上一次更新还没写入，直接被本次覆盖
+            self.stats["coalesced"] += 1
+        board.pending = text
+        if board.task is None or board.task.done():
+            board.task = asyncio.create_task(self._flush(board))
+
+    async def _flush(self, board: LiveBoard):
+        lock = self._locks.setdefault(board.chat_id, asyncio.Lock())
+        async with lock:
+            delay = self._next_edit.get(board.chat_id, 0.0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            text, board.pending = board.pending, None
+            if text is None or text == board.text:
+                return
+            try:
+                await self._write(board, text)
+                board.text = text
+            except RetryAfter as e:
+                # 被限流时把内容放回，等待后由下一次更新或本次重试写入
+                retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+                self._next_edit[board.chat_id] = time.monotonic() + retry_after
+                board.pending = board.pending or text
+                self.stats["failed"] += 1
+                logger.warning("Live board %s/%s rate limited for %ss", board.chat_id, board.group, retry_after)
+            except Exception as e:
+                # 内容没有写入，下一次更新即使指纹相同也重新写入
+                board.fingerprint = None
+                self.stats["failed"] += 1
+                logger.error("Failed to update live board %s/%s: %s", board.chat_id, board.group, e)
+            else:
+                self._next_edit[board.chat_id] = time.monotonic() + settings.LIVE_BOARD_MIN_EDIT_SECONDS
+        if board.pending is not None:
+            # 等待期间又有新内容，按频率限制继续写入
+            board.task = asyncio.create_task(self._flush(board))
+
+    async def _write(self, board: LiveBoard, text: str):
+        bot = TelegramService().bot
+        if board.message_id is not None:
+            try:
+                await bot.edit_message_text(
+                    text, chat_id=board.chat_id, message_id=board.message_id, parse_mode=ParseMode.MARKDOWN_V2
+                )
+                self.stats["edits"] += 1
+                return
+            except BadRequest as e:
+                if "not modified" in e.message.lower():
+                    return
+                # 消息被删除或无法编辑时重新发送
+                logger.warning("Live board %s/%s cannot be edited (%s), sending a new one",
+                               board.chat_id, board.group, e.message)
+        message = await bot.send_message(board.chat_id, text, parse_mode=ParseMode.MARKDOWN_V2)
+        self.stats["sends"] += 1
+        board.message_id = message.message_id
+        await self._persist()
+        try:
+            await bot.pin_chat_message(board.chat_id, message.message_id, disable_notification=True)
+        except Exception as e:
+            # 没有置顶权限时看板仍然可以更新
+            logger.warning("Failed to pin live board %s/%s: %s", board.chat_id, board.group, e)
+
+    def summary(self) -> dict:
+        return {
+            "mode": settings.BROADCAST_MODE,
+            "min_edit_seconds": settings.LIVE_BOARD_MIN_EDIT_SECONDS,
+            "boards": [board.to_dict() for board in self._boards.values()],
+            **self.stats
+        }
@@ -0,0 +1,149 @@
+import bisect
+import json
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Tuple
+from fastapi import HTTPException
+from core.config import settings
+from core.logging import logger
+
+# 上游请求函数：返回 (HTTP状态码, 原始响应文本)
+Fetcher = Callable[[], Awaitable[Tuple[int, str]]]
+
+
+class MarketDataService:
+    """
+    行情数据源，所有交易所服务的原始上游响应都经过这里
+
+    模式（settings.MARKET_DATA_MODE）:
+        - live: 直接请求上游
+        - record: 请求上游，并把原始响应追加写入录制文件
+        - replay: 不访问网络，从录制文件按时间回放原始响应
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self.mode = settings.MARKET_DATA_MODE.lower()
+        self.data_file = Path(settings.MARKET_DATA_FILE)
+        self.speed = settings.MARKET_REPLAY_SPEED
+        self.loop = settings.MARKET_REPLAY_LOOP
+        self._writer = None
+        self._records_written = 0
+        # 回放索引: (venue, key) -> (时间戳列表, [(状态码, 响应文本)])
+        self._index: Dict[Tuple[str, str], Tuple[List[int], List[Tuple[int, str]]]] = {}
+        self._cursors: Dict[Tuple[str, str], int] = {}
+        self._origin = 0
+        self._span = 0
+        self._started = 0.0
+        if self.mode not in ("live", "record", "replay"):
+            raise ValueError(f"Invalid MARKET_DATA_MODE: {self.mode}")
+        if self.mode == "replay":
+            self._load()
+        logger.info("Market data mode: %s", self.mode)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    async def fetch(self, venue: str, key: str, fetcher: Fetcher) -> Tuple[int, str]:
+        """
+        获取一次上游原始响应
+
+        Args:
+            venue: 数据源名称（binance, okx, okj, google）
+            key: 请求标识（路径+参数），回放时按此匹配
+            fetcher: 实际发起网络请求的协程函数
+        """
+        if self.mode == "replay":
+            return self._replay(venue, key)
+        status, body = await fetcher()
+        if self.mode == "record":
+            self._record(venue, key, status, body)
+        return status, body
+
+    def stats(self) -> dict:
+        """当前数据源状态"""
+        return {
+            "mode": self.mode,
+            "file": str(self.data_file),
+            "records_written": self._records_written,
+            "replay_series": len(self._index),
+            "replay_speed": self.speed
+        }
+
+    def close(self):
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+    def _record(self, venue: str, key: str, status: int, body: str):
+        """以紧凑的 JSON Lines 格式追加一条原始响应"""
+        try:
+            if self._writer is None:
+                self.data_file.parent.mkdir(parents=True, exist_ok=True)
+                self._writer = open(self.data_file, 'a', encoding='utf-8', buffering=1)
+            line = json.dumps(
+                {"t": int(time.time() * 1000), "v": venue, "k": key, "s": status, "b": body},
+                ensure_ascii=False,
+                separators=(',', ':')
+            )
+            self._writer.write(line + "\n")
+            self._records_written += 1
+        except Exception as e:
+            logger.error("Failed to record market data: %s", e)
+
+    def _load(self):
+        """加载录制文件并建立按 (venue, key) 分组的时间索引"""
+        if not self.data_file.exists():
+            raise ValueError(f"Market data file not found: {self.data_file}")
+        count = 0
+        with open(self.data_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                times, responses = self._index.setdefault((record["v"], record["k"]), ([], []))
+                # 文件为追加写入，正常情况下时间已有序；乱序时保持有序插入
+                pos = bisect.bisect_right(times, record["t"])
+                times.insert(pos, record["t"])
+                responses.insert(pos, (record["s"], record["b"]))
+                count += 1
+        if not count:
+            raise ValueError(f"Market data file is empty: {self.data_file}")
+        self._origin = min(times[0] for times, _ in self._index.values())
+        self._span = max(times[-1] for times, _ in self._index.values()) - self._origin
+        self._started = time.monotonic()
+        logger.info("Loaded %s market data records from %s (%s series)", count, self.data_file, len(self._index))
+
+    def _replay(self, venue: str, key: str) -> Tuple[int, str]:
+        series = self._index.get((venue, key))
+        if series is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No recorded market data for {venue} {key}"
+            )
+        times, responses = series
+
+        # speed <= 0: 不按时间，每次请求顺序取下一条，用于最大速率压测
+        if self.speed <= 0:
+            cursor = self._cursors.get((venue, key), 0)
+            if cursor >= len(responses):
+                if not self.loop:
+                    return responses[-1]
+                cursor = 0
+            self._cursors[(venue, key)] = cursor + 1
+            return responses[cursor]
+
+        elapsed = int((time.monotonic() - self._started) * 1000 * self.speed)
+        if self.loop and self._span > 0:
+            elapsed %= self._span + 1
+        virtual_now = self._origin + elapsed
+        idx = bisect.bisect_right(times, virtual_now) - 1
+        return responses[max(idx, 0)]
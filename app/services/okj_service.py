@@ -1,85 +1,96 @@
-from fastapi import HTTPException
-from datetime import datetime
-import aiohttp
-from core.logging import logger
-from core.config import settings
-import ssl
+import time
+from datetime import datetime, timezone
+from typing import List
+from models.candle import Candle
+from models.quote import OrderBook, Quote
+from services.exchange_adapter import ExchangeAdapter, register_adapter
+from services.instrument_service import Instrument
 
-class OKJService:
-    def __init__(self):
-        # OKJ的API域名
-        self.base_url = "https://www.okcoin.jp"
-        self.ticker_endpoint = "/api/spot/v3/instruments"
-        self.headers = {
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        }
-        self.ssl_context = ssl.create_default_context()
-        self.ssl_context.check_hostname = False
-        self.ssl_context.verify_mode = ssl.CERT_NONE
-        
-    async def get_price(self, symbol: str) -> dict:
-        """
-        获取OKJ指定交易对的实时买卖价格
-        API文档: https://dev.okcoin.jp/zh/#spot-some
-        """
-        try:
-            formatted_symbol = self._format_symbol(symbol)
-            url = f"{self.base_url}{self.ticker_endpoint}/{formatted_symbol}/ticker"
-            
-            logger.debug(f"Requesting OKJ API - URL: {url}")
-            
-            connector = aiohttp.TCPConnector(ssl=self.ssl_context)
-            async with aiohttp.ClientSession(headers=self.headers, connector=connector) as session:
-                async with session.get(url) as response:
-                    logger.debug(f"Response status: {response.status}")
-                    response_text = await response.text()
-                    logger.debug(f"Response body: {response_text}")
-                    
-                    if response.status != 200:
-                        raise HTTPException(
-                            status_code=response.status,
-                            detail=f"OKJ API request failed: {response_text}"
-                        )
-                        
-                    ticker = await response.json()
-                    
-                    return {
-                        "symbol": symbol,
-                        "exchange": "OKJ",
-                        "bid_price": float(ticker['best_bid']),
-                        "bid_qty": float(ticker['best_bid_size']),
-                        "ask_price": float(ticker['best_ask']),
-                        "ask_qty": float(ticker['best_ask_size']),
-                        "last_price": float(ticker['last']),
-                        "volume_24h": float(ticker['base_volume_24h']),
-                        "timestamp": ticker['timestamp'],
-                        "price_change_24h": float(ticker['last']) - float(ticker['open_24h']),
-                        "price_change_percent": ((float(ticker['last']) - float(ticker['open_24h'])) / float(ticker['open_24h'])) * 100
-                    }
-            
-        except aiohttp.ClientError as e:
-            logger.error(f"Network error: {str(e)}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Network error: {str(e)}"
-            )
-        except Exception as e:
-            logger.error(f"Failed to fetch OKJ price: {str(e)}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to fetch OKJ price: {str(e)}"
+@register_adapter
+class OKJService(ExchangeAdapter):
+    """
+    OKJ（OKCoin Japan）现货
+    API文档: https://dev.okcoin.jp/zh/#spot-some
+    """
+    name = "okj"
+    # OKJ的API域名
+    base_url = "https://www.okcoin.jp"
+    native_format = "{base}_{quote}"
+    rate_limit = 5.0
+    burst = 10
+    # granularity 参数即为秒数
+    candle_intervals = {60: "60", 300: "300", 900: "900", 3600: "3600", 14400: "14400", 86400: "86400"}
+    candle_limit = 300
+
+    @staticmethod
+    def _parse_time(value: str) -> int:
+        # OKJ返回ISO格式的UTC时间（例如 2024-01-01T00:00:00.000Z）
+        return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() * 1000)
+
+    @staticmethod
+    def _format_time(ms: int) -> str:
+        return datetime.fromtimestamp(ms / 1000, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+    @staticmethod
+    def _parse_ticker(symbol: str, ticker: dict) -> Quote:
+        last = float(ticker['last'])
+        open_24h = float(ticker['open_24h'])
+        return Quote(
+            "okj", symbol,
+            float(ticker['best_bid']),
+            float(ticker['best_ask']),
+            last,
+            OKJService._parse_time(ticker['timestamp']),
+            bid_qty=float(ticker['best_bid_size']),
+            ask_qty=float(ticker['best_ask_size']),
+            volume=float(ticker['base_volume_24h']),
+            change=last - open_24h,
+            change_percent=(last - open_24h) / open_24h * 100
+        )
+
+    async def get_ticker(self, instrument: Instrument) -> Quote:
+        ticker = await self.get_json(f"/api/spot/v3/instruments/{instrument.native_id}/ticker")
+        return self._parse_ticker(instrument.canonical, ticker)
+
+    async def get_tickers(self, instruments: List[Instrument]) -> List[Quote]:
+        # 一次请求获取全部交易对行情后筛选
+        by_id = {i.native_id: i for i in instruments}
+        tickers = await self.get_json("/api/spot/v3/instruments/ticker")
+        return [
+            self._parse_ticker(by_id[t['instrument_id']].canonical, t)
+            for t in tickers if t['instrument_id'] in by_id
+        ]
+
+    async def get_order_book(self, instrument: Instrument, depth: int) -> OrderBook:
+        book = await self.get_json(f"/api/spot/v3/instruments/{instrument.native_id}/book", {"size": depth})
+        return OrderBook(
+            "okj", instrument.canonical,
+            [(float(level[0]), float(level[1])) for level in book['bids']],
+            [(float(level[0]), float(level[1])) for level in book['asks']],
+            int(time.time() * 1000)
+        )
+
+    async def get_candles(self, instrument: Instrument, interval: int, start: int, end: int) -> List[Candle]:
+        # 返回按时间倒序，end 为闭区间
+        rows = await self.get_json(f"/api/spot/v3/instruments/{instrument.native_id}/candles", {
+            "granularity": self.candle_interval(interval),
+            "start": self._format_time(start),
+            "end": self._format_time(end - 1)
+        })
+        candles = [
+            (self._parse_time(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]), float(r[5]))
+            for r in rows
+        ]
+        candles = [c for c in candles if start <= c[0] < end]
+        candles.sort()
+        return candles
+
+    async def load_instruments(self) -> List[Instrument]:
+        data = await self.get_json("/api/spot/v3/instruments")
+        return [
+            Instrument(
+                "okj", item["instrument_id"], item["base_currency"], item["quote_currency"],
+                float(item["tick_size"]) if item.get("tick_size") else None, "live"
             )
-            
-    def _format_symbol(self, symbol: str) -> str:
-        """
-        将统一格式的交易对转换为OKJ格式
-        BTCJPY -> BTC_JPY
-        """
-        symbol = symbol.upper()
-        if '_' not in symbol:
-            if 'JPY' in symbol:
-                base = symbol.replace('JPY', '')
-                return f"{base}_JPY"
-        return symbol 
\ No newline at end of file
+            for item in data
+        ]
@@ -1,109 +1,94 @@
+from typing import List
 from fastapi import HTTPException
-from datetime import datetime
-import aiohttp
-from core.logging import logger
-from core.config import settings
-import ssl
+from models.candle import Candle
+from models.quote import OrderBook, Quote
+from services.exchange_adapter import ExchangeAdapter, register_adapter
+from services.instrument_service import Instrument
 
-class OKXService:
-    def __init__(self):
-        self.base_url = "https://www.okx.com"
-        self.ticker_endpoint = "/api/v5/market/ticker"
-        self.headers = {
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        }
-        self.ssl_context = ssl.create_default_context()
-        self.ssl_context.check_hostname = False
-        self.ssl_context.verify_mode = ssl.CERT_NONE
-        
-        # 配置代理
-        self.proxy = settings.HTTPS_PROXY
-        
-    async def get_price(self, symbol: str) -> dict:
-        """
-        获取OKX指定交易对的实时买卖价格
-        API文档: https://www.okx.com/docs-v5/en/#order-book-trading-market-data-get-ticker
-        """
-        try:
-            formatted_symbol = self._format_symbol(symbol)
-            url = f"{self.base_url}{self.ticker_endpoint}"
-            params = {
-                "instId": formatted_symbol,
-            }
-            
-            logger.debug(f"Requesting OKX API - URL: {url}")
-            logger.debug(f"Using proxy: {self.proxy}")
-            
-            # 使用代理配置创建连接器
-            connector = aiohttp.TCPConnector(ssl=self.ssl_context)
-            async with aiohttp.ClientSession(headers=self.headers, connector=connector) as session:
-                async with session.get(
-                    url, 
-                    params=params,
-                    # proxy=self.proxy
-                ) as response:
-                    logger.debug(f"Response status: {response.status}")
-                    response_text = await response.text()
-                    logger.debug(f"Response body: {response_text}")
-                    
-                    if response.status != 200:
-                        raise HTTPException(
-                            status_code=response.status,
-                            detail=f"OKX API request failed: {response_text}"
-                        )
-                        
-                    data = await response.json()
-                    
-                    if data['code'] != '0':
-                        raise HTTPException(
-                            status_code=400,
-                            detail=f"OKX API error: {data['msg']}"
-                        )
-                    
-                    ticker = data['data'][0]
-                    result = {
-                        "symbol": symbol,
-                        "exchange": "OKX",
-                        "bid_price": float(ticker['bidPx']),
-                        "bid_qty": float(ticker['bidSz']),
-                        "ask_price": float(ticker['askPx']),
-                        "ask_qty": float(ticker['askSz']),
-                        "last_price": float(ticker['last']),
-                        "volume_24h": float(ticker['vol24h']),
-                        "timestamp": datetime.fromtimestamp(int(ticker['ts'])/1000).isoformat(),
-                        "price_change_24h": float(ticker['last']) - float(ticker['open24h']),
-                        "price_change_percent": ((float(ticker['last']) - float(ticker['open24h'])) / float(ticker['open24h'])) * 100
-                    }
-                    logger.debug(f"Processed result: {result}")
-                    return result
-            
-        except aiohttp.ClientError as e:
-            logger.error(f"Network error: {str(e)}")
+@register_adapter
+class OKXService(ExchangeAdapter):
+    """
+    OKX现货
+    API文档: https://www.okx.com/docs-v5/en/#order-book-trading-market-data-get-ticker
+    """
+    name = "okx"
+    base_url = "https://www.okx.com"
+    native_format = "{base}-{quote}"
+    # 行情接口限频 20次/2秒
+    rate_limit = 10.0
+    burst = 20
+    # 历史K线使用UTC日线
+    candle_intervals = {60: "1m", 300: "5m", 900: "15m", 3600: "1H", 14400: "4H", 86400: "1Dutc"}
+    candle_limit = 100
+
+    async def _get_data(self, path: str, params: dict) -> list:
+        data = await self.get_json(path, params)
+        if data['code'] != '0':
             raise HTTPException(
-                status_code=500,
-                detail=f"Network error: {str(e)}"
+                status_code=400,
+                detail=f"OKX API error: {data['msg']}"
             )
-        except Exception as e:
-            logger.error(f"Failed to fetch OKX price: {str(e)}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to fetch OKX price: {str(e)}"
+        return data['data']
+
+    @staticmethod
+    def _parse_ticker(symbol: str, ticker: dict) -> Quote:
+        last = float(ticker['last'])
+        open_24h = float(ticker['open24h'])
+        return Quote(
+            "okx", symbol,
+            float(ticker['bidPx']),
+            float(ticker['askPx']),
+            last,
+            int(ticker['ts']),
+            bid_qty=float(ticker['bidSz']),
+            ask_qty=float(ticker['askSz']),
+            volume=float(ticker['vol24h']),
+            change=last - open_24h,
+            change_percent=(last - open_24h) / open_24h * 100
+        )
+
+    async def get_ticker(self, instrument: Instrument) -> Quote:
+        data = await self._get_data("/api/v5/market/ticker", {"instId": instrument.native_id})
+        return self._parse_ticker(instrument.canonical, data[0])
+
+    async def get_tickers(self, instruments: List[Instrument]) -> List[Quote]:
+        # 一次请求获取全部现货行情后筛选
+        by_id = {i.native_id: i for i in instruments}
+        data = await self._get_data("/api/v5/market/tickers", {"instType": "SPOT"})
+        return [self._parse_ticker(by_id[t['instId']].canonical, t) for t in data if t['instId'] in by_id]
+
+    async def get_order_book(self, instrument: Instrument, depth: int) -> OrderBook:
+        data = await self._get_data("/api/v5/market/books", {"instId": instrument.native_id, "sz": depth})
+        book = data[0]
+        return OrderBook(
+            "okx", instrument.canonical,
+            [(float(level[0]), float(level[1])) for level in book['bids']],
+            [(float(level[0]), float(level[1])) for level in book['asks']],
+            int(book['ts'])
+        )
+
+    async def get_candles(self, instrument: Instrument, interval: int, start: int, end: int) -> List[Candle]:
+        # after/before 均为开区间，返回按时间倒序
+        data = await self._get_data("/api/v5/market/history-candles", {
+            "instId": instrument.native_id,
+            "bar": self.candle_interval(interval),
+            "after": end,
+            "before": start - 1,
+            "limit": self.candle_limit
+        })
+        candles = [
+            (int(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]), float(r[5]))
+            for r in data
+        ]
+        candles.reverse()
+        return candles
+
+    async def load_instruments(self) -> List[Instrument]:
+        data = await self._get_data("/api/v5/public/instruments", {"instType": "SPOT"})
+        return [
+            Instrument(
+                "okx", item["instId"], item["baseCcy"], item["quoteCcy"],
+                float(item["tickSz"]) if item.get("tickSz") else None, item.get("state", "unknown")
             )
-            
-    def _format_symbol(self, symbol: str) -> str:
-        """
-        将统一格式的交易对转换为OKX格式
-        BTCUSDT -> BTC-USDT
-        BTCJPY -> BTC-JPY
-        """
-        symbol = symbol.upper()
-        if '-' not in symbol:
-            if 'USDT' in symbol:
-                base = symbol.replace('USDT', '')
-                return f"{base}-USDT"
-            elif 'JPY' in symbol:
-                base = symbol.replace('JPY', '')
-                return f"{base}-JPY"
-        return symbol 
\ No newline at end of file
+            for item in data
+        ]
@@ -2,19 +2,25 @@ import json
 import os
 from fastapi import HTTPException
 from models.power import PowerConfig
-from typing import List
+from typing import List, Optional
 import aiofiles
+from core.config import settings
 from core.logging import logger
 from pathlib import Path
 import random,string
 
 class PowerService:
+    # 通过本服务写入配置的次数，与文件修改时间一起构成配置版本号
+    _writes = 0
+    # 只读节点从主节点同步的配置（JSON文本），只读节点不读写本地配置文件
+    _replicated: Optional[str] = None
+
     def __init__(self):
         # 获取项目根目录
         root_dir = Path(__file__).parent.parent.parent
         # 设置配置文件路径
         self.config_file = os.path.join(root_dir,"g-power.json")
-        logger.info(f"Power service config file path: {self.config_file}")
+        logger.debug("Power service config file path: %s", self.config_file)
         self._ensure_config_file()
        
     
@@ -24,8 +30,36 @@ class PowerService:
             with open(self.config_file, 'w') as f:
                 json.dump({"configs": []}, f)
     
+    @property
+    def version(self) -> Optional[tuple]:
+        """配置版本号，配置文件被修改（包括外部修改）后变化；只读节点尚未同步配置时为None"""
+        if settings.NODE_ROLE == "replica":
+            return (0, PowerService._writes) if PowerService._replicated is not None else None
+        try:
+            mtime = os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            mtime = 0
+        return (mtime, PowerService._writes)
+    
+    @classmethod
+    def load_replicated(cls, data: dict):
+        """写入从主节点同步的配置（只读节点）"""
+        cls._replicated = json.dumps(data)
+        cls._writes += 1
+
+    async def export(self) -> dict:
+        """全部配置（主节点同步给只读节点）"""
+        return await self._read_config()
+
     async def _read_config(self) -> dict:
         """读取配置文件"""
+        if settings.NODE_ROLE == "replica":
+            if PowerService._replicated is None:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Configuration has not been replicated from the leader yet"
+                )
+            return json.loads(PowerService._replicated)
         try:
             async with aiofiles.open(self.config_file, 'r') as f:
                 content = await f.read()
@@ -39,9 +73,15 @@ class PowerService:
     
     async def _write_config(self, data: dict):
         """写入配置文件"""
+        if settings.NODE_ROLE == "replica":
+            raise HTTPException(
+                status_code=403,
+                detail="This node is a read-only replica, send configuration changes to the leader"
+            )
         try:
             async with aiofiles.open(self.config_file, 'w') as f:
                 await f.write(json.dumps(data, indent=2))
+            PowerService._writes += 1
         except Exception as e:
             logger.error(f"Failed to write config file: {str(e)}")
             raise HTTPException(
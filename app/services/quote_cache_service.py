@@ -0,0 +1,134 @@
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from core.logging import logger
+from models.quote import Quote
+
+
+class QuoteCacheService:
+    """
+    最新行情缓存
+
+    每个 (交易所, 交易对) 只保留最新一条行情，价格变化时版本号加一。
+    上层缓存（如接口响应缓存）用版本号判断依赖的行情是否变化。
+    价格变化时同步通知监听器（如价格提醒），监听器中不应有阻塞操作。
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._quotes: Dict[Tuple[str, str], Quote] = {}
+            cls._instance._versions: Dict[Tuple[str, str], int] = {}
+            cls._instance._updated_at: Dict[Tuple[str, str], float] = {}
+            cls._instance._listeners: List[Callable[[Quote], None]] = []
+            # 交易对 -> 有该交易对行情的交易所
+            cls._instance._venues: Dict[str, List[str]] = {}
+            # 从状态快照恢复、还没有被新行情覆盖的key
+            cls._instance._restored: Set[Tuple[str, str]] = set()
+        return cls._instance
+
+    @staticmethod
+    def _key(exchange: str, symbol: str) -> Tuple[str, str]:
+        return exchange.lower(), symbol.upper()
+
+    def put(self, exchange: str, symbol: str, quote: Quote, age: float = 0.0) -> bool:
+        """
+        写入最新行情
+
+        Args:
+            age: 行情已缓存的时长（秒），写入从主节点同步的行情时使用
+
+        Returns:
+            价格是否发生变化
+        """
+        key = self._key(exchange, symbol)
+        prev = self._quotes.get(key)
+        if prev is None:
+            self._venues.setdefault(key[1], []).append(key[0])
+        changed = not quote.same_price(prev)
+        self._quotes[key] = quote
+        self._updated_at[key] = time.monotonic() - age
+        if self._restored:
+            self._restored.discard(key)
+        if changed:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            for listener in self._listeners:
+                try:
+                    listener(quote)
+                except Exception as e:
+                    logger.error("Quote listener failed: %s", e)
+        return changed
+
+    def set_age(self, exchange: str, symbol: str, age: float):
+        """更新行情的缓存时长（主节点重新拉取到相同价格时不通知监听器，由心跳同步）"""
+        key = self._key(exchange, symbol)
+        if key in self._quotes:
+            self._updated_at[key] = time.monotonic() - age
+
+    def add_listener(self, listener: Callable[[Quote], None]):
+        """注册价格变化监听器"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def get(self, exchange: str, symbol: str, max_age: Optional[float] = None) -> Optional[Quote]:
+        """
+        读取最新行情
+
+        Args:
+            max_age: 最大允许的缓存时长（秒），超过则返回None
+        """
+        key = self._key(exchange, symbol)
+        quote = self._quotes.get(key)
+        if quote is None:
+            return None
+        if max_age is not None and time.monotonic() - self._updated_at[key] > max_age:
+            return None
+        return quote
+
+    def age(self, exchange: str, symbol: str) -> Optional[float]:
+        """距最近一次写入的秒数，没有该行情时为None"""
+        updated_at = self._updated_at.get(self._key(exchange, symbol))
+        if updated_at is None:
+            return None
+        return time.monotonic() - updated_at
+
+    def get_all(self, symbol: str) -> List[Tuple[Quote, float]]:
+        """
+        读取所有交易所上该交易对的最新行情
+
+        Returns:
+            (行情, 距最近一次写入的秒数) 列表
+        """
+        symbol = symbol.upper()
+        now = time.monotonic()
+        return [
+            (self._quotes[(exchange, symbol)], now - self._updated_at[(exchange, symbol)])
+            for exchange in self._venues.get(symbol, ())
+        ]
+
+    def version(self, *keys: Tuple[str, str]) -> tuple:
+        """指定 (交易所, 交易对) 的版本号组合"""
+        return tuple(self._versions.get(self._key(*key), 0) for key in keys)
+
+    def restore(self, quote: Quote, age: float):
+        """
+        写入从状态快照恢复的行情（通知监听器），标记为已恢复直到被新行情覆盖
+
+        Args:
+            age: 快照保存时该行情的缓存时长加上停机时长（秒）
+        """
+        key = self._key(quote.exchange, quote.symbol)
+        if key in self._quotes:
+            return
+        self.put(quote.exchange, quote.symbol, quote)
+        self._updated_at[key] = time.monotonic() - age
+        self._restored.add(key)
+
+    def is_restored(self, exchange: str, symbol: str) -> bool:
+        """行情是否来自状态快照（重启后还没有收到新行情）"""
+        return self._key(exchange, symbol) in self._restored
+
+    def export(self) -> List[Tuple[Quote, float]]:
+        """所有最新行情及其缓存时长（秒）"""
+        now = time.monotonic()
+        return [(quote, now - self._updated_at[key]) for key, quote in self._quotes.items()]
@@ -0,0 +1,108 @@
+import asyncio
+from typing import Dict, Hashable, Optional, Set, Tuple
+from core.binary import packb
+from core.config import settings
+from models.compose import ComposeResult
+from models.quote import Quote
+from services.compose_graph_service import ComposeGraphService
+from services.quote_cache_service import QuoteCacheService
+
+
+class QuoteSubscription:
+    """
+    一个二进制推送订阅
+
+    每条序列只保留尚未发送的最新一条，消费者慢时自动合并为最新值，
+    积压的内存只与订阅的序列数有关。
+    """
+
+    def __init__(self, symbols: Optional[Set[str]], exchanges: Optional[Set[str]], compose: bool):
+        self.symbols = symbols
+        self.exchanges = exchanges
+        self.compose = compose
+        self.quotes: Dict[Tuple[str, str], Quote] = {}
+        self.groups: Dict[Optional[str], ComposeResult] = {}
+        self.event = asyncio.Event()
+        self.coalesced = 0
+
+    def matches(self, quote: Quote) -> bool:
+        return (self.symbols is None or quote.symbol in self.symbols) \
+            and (self.exchanges is None or quote.exchange in self.exchanges)
+
+    def _mark(self, pending: Dict[Hashable, object], key: Hashable, value):
+        if key in pending:
+            self.coalesced += 1
+        pending[key] = value
+        self.event.set()
+
+    def push_quote(self, quote: Quote):
+        self._mark(self.quotes, (quote.exchange, quote.symbol), quote)
+
+    def push_compose(self, group: Optional[str], result: ComposeResult):
+        self._mark(self.groups, group, result)
+
+    async def next_frame(self) -> bytes:
+        """等待并取出下一帧：[行情数组列表, [分组, compose数组] 列表]"""
+        await self.event.wait()
+        # 短暂等待，把同一时间段内的更新合并为一帧
+        if settings.BINARY_STREAM_BATCH_MS > 0:
+            await asyncio.sleep(settings.BINARY_STREAM_BATCH_MS / 1000)
+        self.event.clear()
+        quotes, self.quotes = self.quotes, {}
+        groups, self.groups = self.groups, {}
+        return packb([
+            [quote.to_row() for quote in quotes.values()],
+            [[group, result.to_row()] for group, result in groups.items()]
+        ])
+
+
+class QuoteStreamService:
+    """二进制行情推送：把行情缓存和compose增量计算的变化分发给所有订阅"""
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self._subscriptions: Set[QuoteSubscription] = set()
+        QuoteCacheService().add_listener(self.on_quote)
+        ComposeGraphService().add_listener(self.on_compose)
+
+    def on_quote(self, quote: Quote):
+        for subscription in self._subscriptions:
+            if subscription.matches(quote):
+                subscription.push_quote(quote)
+
+    def on_compose(self, group: Optional[str], result: ComposeResult):
+        for subscription in self._subscriptions:
+            if subscription.compose:
+                subscription.push_compose(group, result)
+
+    def subscribe(self, symbols: Optional[Set[str]] = None, exchanges: Optional[Set[str]] = None,
+                  compose: bool = True) -> QuoteSubscription:
+        """订阅并放入当前的全部行情和compose结果作为第一帧"""
+        subscription = QuoteSubscription(symbols, exchanges, compose)
+        for quote, _ in QuoteCacheService().export():
+            if subscription.matches(quote):
+                subscription.push_quote(quote)
+        if compose:
+            compose_graph = ComposeGraphService()
+            for group in compose_graph.groups():
+                result = compose_graph.get(group)
+                if result is not None:
+                    subscription.push_compose(group, result)
+        subscription.coalesced = 0
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: QuoteSubscription):
+        self._subscriptions.discard(subscription)
+
+    def summary(self) -> dict:
+        return {
+            "subscriptions": len(self._subscriptions),
+            "coalesced": sum(s.coalesced for s in self._subscriptions)
+        }
@@ -0,0 +1,91 @@
+import time
+from pathlib import Path
+from typing import Optional
+from core.config import settings
+from core.logging import logger
+from core.metrics import LatencyHistogram
+from core.quote_table import COMPOSE_SYMBOL, COMPOSE_VENUE, QuoteTableWriter
+from models.compose import ComposeResult
+from models.quote import Quote
+from services.compose_graph_service import ComposeGraphService
+from services.quote_cache_service import QuoteCacheService
+
+
+class QuoteTableService:
+    """
+    共享内存行情表导出
+
+    行情缓存和compose增量计算的每次变化同步写入 QUOTE_TABLE_FILE（布局和读取方式见 core/quote_table.py），
+    同一台机器上的进程不经过HTTP直接读取最新价格。
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self.file = Path(settings.DATA_DIR) / settings.QUOTE_TABLE_FILE
+        self._writer: Optional[QuoteTableWriter] = None
+        self.writes = 0
+        self.rejected = 0
+        self.latency = LatencyHistogram()
+
+    def start(self):
+        """创建行情表，写入当前的行情和compose结果，之后随变化写入"""
+        if self._writer is not None:
+            return
+        try:
+            self._writer = QuoteTableWriter(str(self.file), settings.QUOTE_TABLE_SLOTS)
+        except Exception as e:
+            logger.error("Failed to create quote table %s: %s", self.file, e)
+            return
+        for quote, _ in QuoteCacheService().export():
+            self.on_quote(quote)
+        compose_graph = ComposeGraphService()
+        for group in compose_graph.groups():
+            result = compose_graph.get(group)
+            if result is not None:
+                self.on_compose(group, result)
+        QuoteCacheService().add_listener(self.on_quote)
+        compose_graph.add_listener(self.on_compose)
+        logger.info("Quote table exported to %s (%s slots)", self.file, settings.QUOTE_TABLE_SLOTS)
+
+    def stop(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _write(self, venue: str, symbol: str, bid: float, ask: float, last: float, ts: int, **kwargs):
+        if self._writer is None:
+            return
+        started = time.perf_counter()
+        if self._writer.write(venue, symbol, bid, ask, last, ts, **kwargs):
+            self.writes += 1
+        else:
+            if not self.rejected:
+                logger.warning("Quote table full or name too long, ignoring %s:%s", venue, symbol)
+            self.rejected += 1
+        self.latency.observe(time.perf_counter() - started)
+
+    def on_quote(self, quote: Quote):
+        self._write(quote.exchange, quote.symbol, quote.bid, quote.ask, quote.last, quote.ts,
+                    bid_qty=quote.bid_qty, ask_qty=quote.ask_qty, volume=quote.volume,
+                    change_percent=quote.change_percent)
+
+    def on_compose(self, group: Optional[str], result: ComposeResult):
+        venue = COMPOSE_VENUE if group is None else f"{COMPOSE_VENUE}:{group}"
+        self._write(venue, COMPOSE_SYMBOL, result.bid, result.ask, result.last, result.ts)
+
+    def summary(self) -> dict:
+        return {
+            "enabled": self._writer is not None,
+            "file": str(self.file),
+            "slots": settings.QUOTE_TABLE_SLOTS,
+            "used": self._writer.used if self._writer is not None else 0,
+            "writes": self.writes,
+            "rejected": self.rejected,
+            "write_latency": self.latency.snapshot()
+        }
@@ -0,0 +1,256 @@
+import asyncio
+import time
+from typing import List, Optional, Set, Tuple
+import aiohttp
+from core.binary import packb, unpackb
+from core.config import settings
+from core.logging import logger
+from models.quote import Quote
+from services.compose_graph_service import ComposeGraphService
+from services.exchange_adapter import ExchangeAdapter
+from services.instrument_service import InstrumentService
+from services.power_service import PowerService
+from services.quote_cache_service import QuoteCacheService
+
+
+class ReplicationGap(Exception):
+    """只读节点收到的消息序号不连续"""
+
+
+class ReplicationService:
+    """
+    主从复制
+
+    主节点（NODE_ROLE=leader）负责所有上游请求，把行情变化、倍率配置和交易对列表按序号发布给
+    连接到 /replication/stream 的只读节点；每个连接先收到一份完整快照，之后是增量消息和心跳。
+    只读节点（NODE_ROLE=replica）把收到的数据写入本地缓存，compose、共识价格、统计等在本地
+    随行情变化重新计算，/crypto/* 和 /power/* 的读取只使用内存中的数据，不请求上游。
+    序号出现缺口（主节点积压时丢弃了消息）或超时没有消息时，只读节点重新连接并从快照重新同步。
+
+    消息为 MessagePack 编码的字典，type 为 snapshot / quote / powers / instruments / heartbeat。
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self.role = settings.NODE_ROLE
+        self._tasks: List[asyncio.Task] = []
+        # 主节点
+        self.epoch = time.time_ns()
+        self.seq = 0
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._power_version: Optional[tuple] = None
+        self._powers: Optional[dict] = None
+        self._instrument_version = InstrumentService().version
+        # 只读节点
+        self.connected = False
+        self.synced = False
+        self.leader_epoch: Optional[int] = None
+        self.last_message_at: Optional[float] = None
+        self.lag_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.stats = {"messages": 0, "dropped": 0, "snapshots": 0, "gaps": 0, "reconnects": 0}
+
+    # ---- 启动/停止 ----
+
+    async def start(self):
+        if self.role == "leader":
+            self._powers = await self._read_powers()
+            self._power_version = PowerService().version
+            QuoteCacheService().add_listener(self.on_quote)
+            self._tasks.append(asyncio.create_task(self._heartbeat()))
+            logger.info("Replication leader started")
+        elif self.role == "replica":
+            if not settings.LEADER_URL:
+                logger.error("NODE_ROLE is replica but LEADER_URL is not set")
+                return
+            self._tasks.append(asyncio.create_task(self._follow()))
+            logger.info("Replica following %s", settings.LEADER_URL)
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ---- 主节点 ----
+
+    async def _read_powers(self) -> Optional[dict]:
+        try:
+            return await PowerService().export()
+        except Exception as e:
+            logger.error("Failed to read power configs for replication: %s", e)
+            return None
+
+    def _publish(self, message: dict):
+        """按序号发布一条消息，只编码一次；积压满的只读节点丢弃该消息，由其按序号缺口重新同步"""
+        self.seq += 1
+        message["seq"] = self.seq
+        if not self._subscribers:
+            return
+        data = packb(message)
+        self.stats["messages"] += 1
+        for queue in self._subscribers:
+            if queue.full():
+                self.stats["dropped"] += 1
+                continue
+            queue.put_nowait(data)
+
+    def on_quote(self, quote: Quote):
+        self._publish({"type": "quote", "quote": quote.to_row()})
+
+    async def _heartbeat(self):
+        """定期发送心跳（带各行情的缓存时长），并发布变化的倍率配置和交易对列表"""
+        while True:
+            await asyncio.sleep(settings.REPLICATION_HEARTBEAT_SECONDS)
+            try:
+                version = PowerService().version
+                if version != self._power_version:
+                    powers = await self._read_powers()
+                    if powers is not None:
+                        self._power_version = version
+                        if powers != self._powers:
+                            self._powers = powers
+                            self._publish({"type": "powers", "powers": powers})
+                instrument_service = InstrumentService()
+                if instrument_service.version != self._instrument_version:
+                    self._instrument_version = instrument_service.version
+                    self._publish({"type": "instruments", "instruments": instrument_service.export()})
+                self._publish({
+                    "type": "heartbeat",
+                    "time": time.time(),
+                    "ages": [[q.exchange, q.symbol, round(age, 3)] for q, age in QuoteCacheService().export()]
+                })
+            except Exception as e:
+                logger.error("Replication heartbeat failed: %s", e)
+
+    def subscribe(self) -> Tuple[asyncio.Queue, bytes]:
+        """注册只读节点连接，返回 (消息队列, 当前快照)；快照与之后的第一条消息序号连续"""
+        queue = asyncio.Queue(maxsize=settings.REPLICATION_QUEUE_SIZE)
+        snapshot = packb({
+            "type": "snapshot",
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "quotes": [[*q.to_row(), round(age, 3)] for q, age in QuoteCacheService().export()],
+            "powers": self._powers,
+            "instruments": InstrumentService().export()
+        })
+        self._subscribers.add(queue)
+        self.stats["snapshots"] += 1
+        return queue, snapshot
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    # ---- 只读节点 ----
+
+    async def _follow(self):
+        backoff = 1.0
+        while True:
+            try:
+                await self._sync()
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except ReplicationGap as e:
+                # 缺口立即重新同步
+                self.stats["gaps"] += 1
+                self.last_error = str(e)
+                logger.warning("Replication gap, resyncing: %s", e)
+                backoff = 0.0
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.warning("Replication connection failed: %s", self.last_error)
+            self.connected = False
+            self.synced = ExchangeAdapter.replica_synced = False
+            self.stats["reconnects"] += 1
+            await asyncio.sleep(backoff)
+            backoff = min(max(backoff * 2, 1.0), 30)
+
+    async def _sync(self):
+        """连接主节点并应用消息，连接断开或超时时返回/抛出"""
+        params = {"token": settings.REPLICATION_TOKEN} if settings.REPLICATION_TOKEN else None
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(settings.LEADER_URL, params=params) as ws:
+                self.connected = True
+                while True:
+                    message = await ws.receive(timeout=settings.REPLICATION_TIMEOUT_SECONDS)
+                    if message.type == aiohttp.WSMsgType.BINARY:
+                        await self._apply(unpackb(message.data))
+                    elif message.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSED,
+                                          aiohttp.WSMsgType.ERROR):
+                        self.last_error = f"Connection closed: {ws.close_code} {message.extra or ''}".strip()
+                        return
+
+    async def _apply(self, message: dict):
+        self.stats["messages"] += 1
+        self.last_message_at = time.time()
+        kind = message["type"]
+        if kind == "snapshot":
+            self._apply_snapshot(message)
+            await ComposeGraphService().sync_powers()
+            return
+        if not self.synced or message["seq"] != self.seq + 1:
+            raise ReplicationGap(f"expected seq {self.seq + 1}, got {message['seq']}")
+        self.seq = message["seq"]
+        if kind == "quote":
+            quote = Quote.from_row(message["quote"])
+            QuoteCacheService().put(quote.exchange, quote.symbol, quote)
+        elif kind == "heartbeat":
+            self.lag_seconds = round(max(0.0, time.time() - message["time"]), 3)
+            quote_cache = QuoteCacheService()
+            for exchange, symbol, age in message["ages"]:
+                quote_cache.set_age(exchange, symbol, age)
+        elif kind == "powers":
+            PowerService.load_replicated(message["powers"])
+            await ComposeGraphService().sync_powers()
+        elif kind == "instruments":
+            InstrumentService().restore(message["instruments"], overwrite=True)
+
+    def _apply_snapshot(self, message: dict):
+        self.leader_epoch = message["epoch"]
+        self.seq = message["seq"]
+        instruments = InstrumentService().restore(message["instruments"], overwrite=True)
+        if message["powers"] is not None:
+            PowerService.load_replicated(message["powers"])
+        quote_cache = QuoteCacheService()
+        for row in message["quotes"]:
+            quote = Quote.from_row(row)
+            quote_cache.put(quote.exchange, quote.symbol, quote, age=row[-1])
+        self.synced = ExchangeAdapter.replica_synced = True
+        self.stats["snapshots"] += 1
+        self.last_error = None
+        logger.info("Replica synced from leader snapshot: %s quote(s), %s instrument(s), seq %s",
+                    len(message["quotes"]), instruments, self.seq)
+
+    # ---- 状态 ----
+
+    def summary(self) -> dict:
+        if self.role == "leader":
+            return {
+                "role": self.role,
+                "epoch": self.epoch,
+                "seq": self.seq,
+                "replicas": len(self._subscribers),
+                "backlog": [queue.qsize() for queue in self._subscribers],
+                **self.stats
+            }
+        if self.role == "replica":
+            return {
+                "role": self.role,
+                "leader_url": settings.LEADER_URL,
+                "connected": self.connected,
+                "synced": self.synced,
+                "leader_epoch": self.leader_epoch,
+                "seq": self.seq,
+                "seconds_since_message": round(time.time() - self.last_message_at, 3) if self.last_message_at else None,
+                "lag_seconds": self.lag_seconds,
+                "last_error": self.last_error,
+                **self.stats
+            }
+        return {"role": self.role}
@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+import orjson
+from fastapi import Request, Response
+from core.binary import MSGPACK_MEDIA_TYPE, packb, wants_msgpack
+from core.config import settings
+
+
+class CachedResponse:
+    """预先序列化好的接口响应"""
+    __slots__ = ("version", "payload", "body", "binary", "etag", "created_at")
+
+    def __init__(self, version: Hashable, payload, body: bytes):
+        self.version = version
+        self.payload = payload
+        self.body = body
+        # MessagePack 响应体，第一次被请求时生成
+        self.binary: Optional[bytes] = None
+        self.etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        self.created_at = time.monotonic()
+
+
+class ResponseCacheService:
+    """
+    接口响应缓存
+
+    按接口和参数缓存序列化后的响应体，依赖数据的版本变化或超过TTL后重新计算。
+    同一个key同时只有一个计算在进行，其余请求等待同一结果。
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._entries: Dict[Hashable, CachedResponse] = {}
+            cls._instance._inflight: Dict[Hashable, asyncio.Future] = {}
+            cls._instance.ttl = settings.RESPONSE_CACHE_TTL_MS / 1000
+        return cls._instance
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None or entry.version != version:
+            return None
+        if time.monotonic() - entry.created_at > self.ttl:
+            return None
+        return entry
+
+    def put(self, key: Hashable, version: Hashable, payload) -> CachedResponse:
+        """写入缓存，payload为带 to_dict 方法的对象时先转换再序列化"""
+        data = payload.to_dict() if hasattr(payload, "to_dict") else payload
+        entry = CachedResponse(version, payload, orjson.dumps(data))
+        self._entries[key] = entry
+        return entry
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        version: Callable[[], Hashable],
+        compute: Callable[[], Awaitable]
+    ) -> CachedResponse:
+        """
+        读取缓存，未命中时计算并写入
+
+        Args:
+            key: 缓存key（接口+参数）
+            version: 返回依赖数据当前版本的函数，计算完成后再取一次作为缓存版本
+            compute: 计算响应数据的协程函数
+        """
+        entry = self.get(key, version())
+        if entry is not None:
+            return entry
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            payload = await compute()
+            entry = self.put(key, version(), payload)
+            future.set_result(entry)
+            return entry
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免"exception was never retrieved"警告
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    @staticmethod
+    def _not_modified(request: Request, etag: str) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return etag in tags or "*" in tags
+
+    @classmethod
+    def respond(cls, request: Request, entry: CachedResponse) -> Response:
+        """根据 If-None-Match 返回 304 或缓存的响应体，Accept 为 MessagePack 时返回二进制响应体"""
+        if wants_msgpack(request):
+            return cls._respond_binary(request, entry)
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+        if cls._not_modified(request, entry.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    @classmethod
+    def _respond_binary(cls, request: Request, entry: CachedResponse) -> Response:
+        """payload 有 to_row 方法时编码为固定字段顺序的数组，否则直接编码"""
+        if entry.binary is None:
+            payload = entry.payload
+            entry.binary = packb(payload.to_row() if hasattr(payload, "to_row") else payload)
+        # 与JSON表示区分的ETag
+        etag = entry.etag[:-1] + '-m"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+        if cls._not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.binary, media_type=MSGPACK_MEDIA_TYPE, headers=headers)
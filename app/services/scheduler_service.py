@@ -1,14 +1,153 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+from apscheduler.triggers.cron import CronTrigger
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from typing import Callable, Dict, List, Optional
+import asyncio
+import functools
+import json
+import math
+import random
+import time
 from core.logging import logger
+from core.config import settings, SCHEDULER_CONFIG_FILE
+from core.metrics import LatencyHistogram
+
+
+class JobStats:
+    """单个定时任务的运行统计"""
+
+    def __init__(self, timeout: Optional[float], jitter: Optional[float]):
+        self.timeout = timeout
+        self.jitter = jitter
+        self.running = False
+        self.last_run_at: Optional[datetime] = None
+        self.last_finished_at: Optional[datetime] = None
+        self.last_outcome: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.outcomes = {"success": 0, "failure": 0, "timeout": 0, "skipped": 0, "missed": 0}
+        self.durations = LatencyHistogram()
+
+    def to_dict(self) -> dict:
+        return {
+            "timeout_seconds": self.timeout,
+            "jitter_seconds": self.jitter,
+            "running": self.running,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_finished_at": self.last_finished_at.isoformat() if self.last_finished_at else None,
+            "last_outcome": self.last_outcome,
+            "last_error": self.last_error,
+            "outcomes": dict(self.outcomes),
+            "duration": self.durations.snapshot()
+        }
+
+
+class TimerWheel:
+    """
+    哈希时间轮
+
+    所有周期任务共用一个调度协程：调度协程只在最早的任务到期时唤醒，检查经过的槽内到期的任务；
+    安排了更早的任务时提前唤醒重新计算，没有任务时挂起，不产生任何唤醒。
+    """
+
+    def __init__(self, tick: float, slots: int):
+        self.tick = tick
+        self.slots = slots
+        self._wheel: List[Dict[str, int]] = [{} for _ in range(slots)]
+        self._targets: Dict[str, int] = {}
+        self._callbacks: Dict[str, Callable[[], None]] = {}
+        self._origin = time.monotonic()
+        self._cursor = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _now_tick(self) -> int:
+        return int((time.monotonic() - self._origin) / self.tick)
+
+    def schedule(self, name: str, delay: float, callback: Callable[[], None]):
+        """delay秒后执行callback，同名任务会替换之前的安排"""
+        self.cancel(name)
+        target = max(self._now_tick(), self._cursor) + max(1, math.ceil(delay / self.tick))
+        self._wheel[target % self.slots][name] = target
+        self._targets[name] = target
+        self._callbacks[name] = callback
+        if self._wakeup:
+            self._wakeup.set()
+
+    def cancel(self, name: str):
+        target = self._targets.pop(name, None)
+        if target is not None:
+            self._wheel[target % self.slots].pop(name, None)
+            self._callbacks.pop(name, None)
+
+    def next_fire_time(self, name: str) -> Optional[datetime]:
+        target = self._targets.get(name)
+        if target is None:
+            return None
+        return datetime.now() + timedelta(seconds=self._origin + target * self.tick - time.monotonic())
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._cursor = self._now_tick()
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._targets:
+                await self._wakeup.wait()
+                continue
+            delay = self._origin + min(self._targets.values()) * self.tick - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                    # 任务有变化，重新计算最早的到期刻度
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+            now = self._now_tick()
+            # 追赶期间跳过的刻度，最多转一圈
+            for t in range(max(self._cursor + 1, now - self.slots + 1), now + 1):
+                slot = self._wheel[t % self.slots]
+                if not slot:
+                    continue
+                for name in [n for n, target in slot.items() if target <= now]:
+                    del slot[name]
+                    del self._targets[name]
+                    callback = self._callbacks.pop(name)
+                    try:
+                        callback()
+                    except Exception as e:
+                        logger.error("Timer wheel callback %s failed: %s", name, e)
+            self._cursor = now
+
 
 class SchedulerService:
     _instance = None
     _scheduler = None
+    _wheel: Optional[TimerWheel] = None
+    _stats: Dict[str, JobStats] = {}
+    # 周期任务注册表: 任务名 -> 配置
+    _schedules: Dict[str, dict] = {}
+    # 任务类型 -> 协程函数，由各业务模块注册
+    _kinds: Dict[str, Callable] = {}
+    # 配置文件中没有时使用的默认周期任务
+    _defaults: Dict[str, dict] = {}
+    _tasks: set = set()
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._scheduler = AsyncIOScheduler()
+            cls._scheduler.add_listener(cls._on_job_not_run, EVENT_JOB_MAX_INSTANCES | EVENT_JOB_MISSED)
+            cls._wheel = TimerWheel(settings.SCHEDULER_TICK_SECONDS, settings.SCHEDULER_WHEEL_SLOTS)
         return cls._instance
 
     @classmethod
@@ -21,8 +160,10 @@ class SchedulerService:
         if not self._scheduler.running:
             self._scheduler.start()
             logger.info("Scheduler started")
+        self._wheel.start()
 
     def shutdown(self):
+        self._wheel.stop()
         if self._scheduler.running:
             self._scheduler.shutdown()
             logger.info("Scheduler stopped")
@@ -30,15 +171,283 @@ class SchedulerService:
     def add_job(self, func, trigger, **kwargs):
         return self._scheduler.add_job(func, trigger, **kwargs)
 
+    def add_supervised_job(self, func, trigger, id: str, timeout: Optional[float] = None,
+                           jitter: Optional[int] = None, args: tuple = (), **trigger_args):
+        """
+        注册受监管的定时任务
+
+        - 同一任务同时只运行一个实例，上一次未结束时本次直接跳过（计入skipped）
+        - 错过的多次触发合并为一次执行
+        - 每次执行有超时限制，超时后取消，避免上游卡死导致任务堆积
+        - 启动时间加随机抖动，避免多个任务同时打到上游
+        - 记录每个任务的耗时分布和执行结果
+
+        Args:
+            func: 任务函数，协程函数直接在事件循环中执行，普通函数放到线程池中执行
+            trigger: APScheduler触发器类型（interval, cron, date）
+            id: 任务ID
+            timeout: 超时时间（秒），默认 settings.SCHEDULER_JOB_TIMEOUT_SECONDS
+            jitter: 启动抖动上限（秒），默认 settings.SCHEDULER_JOB_JITTER_SECONDS
+        """
+        timeout = settings.SCHEDULER_JOB_TIMEOUT_SECONDS if timeout is None else timeout
+        jitter = settings.SCHEDULER_JOB_JITTER_SECONDS if jitter is None else jitter
+        self._stats[id] = JobStats(timeout, jitter)
+        if jitter and trigger in ("interval", "cron"):
+            trigger_args["jitter"] = jitter
+        return self._scheduler.add_job(
+            self._supervise(id, func),
+            trigger,
+            id=id,
+            args=args,
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=settings.SCHEDULER_MISFIRE_GRACE_SECONDS,
+            replace_existing=True,
+            **trigger_args
+        )
+
+    def _supervise(self, job_id: str, func, start_jitter: float = 0):
+        """包装任务函数：启动抖动 + 超时控制 + 运行统计"""
+
+        @functools.wraps(func)
+        async def _run(*args, **kwargs):
+            stats = self._stats[job_id]
+            stats.running = True
+            if start_jitter:
+                await asyncio.sleep(random.uniform(0, start_jitter))
+            stats.last_run_at = datetime.now()
+            started = time.perf_counter()
+            outcome, error = None, None
+            try:
+                if asyncio.iscoroutinefunction(func):
+                    call = func(*args, **kwargs)
+                else:
+                    call = asyncio.to_thread(func, *args, **kwargs)
+                await asyncio.wait_for(call, timeout=stats.timeout or None)
+                outcome = "success"
+            except asyncio.TimeoutError:
+                outcome, error = "timeout", f"Timed out after {stats.timeout}s"
+                logger.error("Job %s timed out after %ss", job_id, stats.timeout)
+            except Exception as e:
+                outcome, error = "failure", str(e)
+                logger.error("Job %s failed: %s", job_id, e)
+            finally:
+                stats.durations.observe(time.perf_counter() - started)
+                stats.running = False
+                stats.last_finished_at = datetime.now()
+                if outcome:
+                    stats.last_outcome, stats.last_error = outcome, error
+                    stats.outcomes[outcome] += 1
+
+        return _run
+
+    @classmethod
+    def _on_job_not_run(cls, event):
+        """APScheduler因实例数上限或错过触发时间而未执行任务"""
+        stats = cls._stats.get(event.job_id)
+        if stats is None:
+            return
+        if event.code == EVENT_JOB_MAX_INSTANCES:
+            stats.outcomes["skipped"] += 1
+            logger.warning("Job %s is still running, skipped", event.job_id)
+        else:
+            stats.outcomes["missed"] += 1
+            logger.warning("Job %s missed its run time", event.job_id)
+
     def get_job(self, job_id):
         return self._scheduler.get_job(job_id)
 
     def remove_job(self, job_id):
+        self._stats.pop(job_id, None)
         return self._scheduler.remove_job(job_id)
 
     def reschedule_job(self, job_id, trigger, **trigger_args):
+        # 受监管任务重新调度时保留原有的抖动配置
+        stats = self._stats.get(job_id)
+        if stats and stats.jitter and "jitter" not in trigger_args:
+            trigger_args["jitter"] = stats.jitter
         return self._scheduler.reschedule_job(job_id, trigger=trigger, **trigger_args)
-    
+
     def get_jobs(self):
         return self._scheduler.get_jobs()
-    
\ No newline at end of file
+
+    # ---------------- 周期任务注册表（时间轮驱动） ----------------
+
+    def register_kind(self, kind: str, func: Callable):
+        """
+        注册周期任务类型
+
+        Args:
+            kind: 任务类型名称（如 broadcast, warm）
+            func: 协程函数，任务配置了group时以 group=... 关键字参数调用
+        """
+        self._kinds[kind] = func
+
+    def add_default_schedule(self, name: str, config: dict):
+        """注册默认周期任务，配置文件中已有同名任务时以配置文件为准"""
+        self._defaults[name] = config
+
+    def load_schedules(self):
+        """从配置文件加载并注册所有周期任务"""
+        schedules = self._read_config().get("schedules", {})
+        if "price_broadcast" not in schedules:
+            # 兼容旧配置：只有按分钟配置的广播间隔
+            schedules["price_broadcast"] = {
+                "kind": "broadcast",
+                "interval_seconds": settings.PRICE_BROADCAST_INTERVAL * 60
+            }
+        for name, config in self._defaults.items():
+            schedules.setdefault(name, config)
+        for name, config in schedules.items():
+            try:
+                self.register_schedule(name, config, persist=False)
+            except HTTPException as e:
+                logger.error("Failed to load schedule %s: %s", name, e.detail)
+        logger.info("Loaded %s periodic job(s)", len(self._schedules))
+
+    def register_schedule(self, name: str, config: dict, persist: bool = True) -> dict:
+        """
+        注册或更新一个周期任务
+
+        Args:
+            name: 任务名
+            config: 任务配置，包含 kind、group（可选）、interval_seconds 或 cron（二选一）、
+                    timeout_seconds、jitter_seconds（默认 SCHEDULER_JOB_JITTER_SECONDS，不超过间隔的一半）
+            persist: 是否写入配置文件
+        """
+        config = {k: v for k, v in config.items() if v is not None}
+        kind = config.get("kind")
+        if kind not in self._kinds:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown schedule kind: {kind}"
+            )
+        interval, cron = config.get("interval_seconds"), config.get("cron")
+        if (interval is None) == (cron is None):
+            raise HTTPException(
+                status_code=400,
+                detail="Exactly one of interval_seconds and cron must be set"
+            )
+        if interval is not None and interval < settings.SCHEDULER_TICK_SECONDS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"interval_seconds must be >= {settings.SCHEDULER_TICK_SECONDS}"
+            )
+        if cron is not None:
+            try:
+                config["_trigger"] = CronTrigger.from_crontab(cron)
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid cron expression: {str(e)}"
+                )
+
+        timeout = config.get("timeout_seconds", settings.SCHEDULER_JOB_TIMEOUT_SECONDS)
+        jitter = config.get("jitter_seconds")
+        if jitter is None:
+            # 默认抖动不超过间隔的一半，避免短间隔任务因上一次仍在等待抖动而被跳过
+            jitter = settings.SCHEDULER_JOB_JITTER_SECONDS
+            if interval is not None:
+                jitter = min(jitter, interval / 2)
+        stats = self._stats.get(name)
+        if stats is None:
+            self._stats[name] = JobStats(timeout, jitter)
+        else:
+            stats.timeout, stats.jitter = timeout, jitter
+        params = {"group": config["group"]} if config.get("group") else {}
+        config["_run"] = functools.partial(self._supervise(name, self._kinds[kind], jitter), **params)
+        self._schedules[name] = config
+        self._schedule_next(name)
+
+        if persist:
+            self._persist_schedules()
+        logger.info("Registered periodic job %s: %s", name, self._public_config(config))
+        return self._public_config(config)
+
+    def unregister_schedule(self, name: str):
+        if name not in self._schedules:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Schedule not found: {name}"
+            )
+        self._wheel.cancel(name)
+        del self._schedules[name]
+        self._stats.pop(name, None)
+        self._persist_schedules()
+
+    def get_schedule(self, name: str) -> Optional[dict]:
+        config = self._schedules.get(name)
+        return self._public_config(config) if config else None
+
+    def list_schedules(self) -> Dict[str, dict]:
+        return {name: self._public_config(config) for name, config in self._schedules.items()}
+
+    def _schedule_next(self, name: str):
+        config = self._schedules[name]
+        if "_trigger" in config:
+            now = datetime.now().astimezone()
+            next_time = config["_trigger"].get_next_fire_time(None, now)
+            if next_time is None:
+                return
+            delay = (next_time - now).total_seconds()
+        else:
+            delay = config["interval_seconds"]
+        self._wheel.schedule(name, delay, functools.partial(self._fire, name))
+
+    def _fire(self, name: str):
+        """时间轮回调：先安排下一次触发，再启动本次执行"""
+        if name not in self._schedules:
+            return
+        self._schedule_next(name)
+        stats = self._stats[name]
+        if stats.running:
+            stats.outcomes["skipped"] += 1
+            logger.warning("Job %s is still running, skipped", name)
+            return
+        stats.running = True
+        task = asyncio.create_task(self._schedules[name]["_run"]())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    def _public_config(config: dict) -> dict:
+        return {k: v for k, v in config.items() if not k.startswith("_")}
+
+    def _read_config(self) -> dict:
+        try:
+            with open(SCHEDULER_CONFIG_FILE, 'r') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _persist_schedules(self):
+        config = self._read_config()
+        config["schedules"] = self.list_schedules()
+        with open(SCHEDULER_CONFIG_FILE, 'w') as f:
+            json.dump(config, f, indent=2)
+
+    def get_job_stats(self) -> list:
+        """所有任务的调度信息和运行统计"""
+        result = []
+        for job in self._scheduler.get_jobs():
+            stats = self._stats.get(job.id)
+            result.append({
+                "id": job.id,
+                "name": job.name,
+                "trigger": str(job.trigger),
+                "next_run_time": job.next_run_time.isoformat() if job.next_run_time else None,
+                "supervised": stats is not None,
+                **(stats.to_dict() if stats else {})
+            })
+        for name, config in self._schedules.items():
+            next_time = self._wheel.next_fire_time(name)
+            trigger = f"cron[{config['cron']}]" if "cron" in config else f"interval[{config['interval_seconds']}s]"
+            result.append({
+                "id": name,
+                "name": config["kind"],
+                "trigger": trigger,
+                "next_run_time": next_time.isoformat() if next_time else None,
+                "supervised": True,
+                **self._stats[name].to_dict()
+            })
+        return result
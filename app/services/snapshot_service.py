@@ -0,0 +1,184 @@
+import asyncio
+import math
+import os
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+import orjson
+from core.config import settings
+from core.logging import logger
+from models.quote import Quote
+from services.instrument_service import InstrumentService
+from services.quote_cache_service import QuoteCacheService
+from services.stats_service import StatsService
+
+# 快照格式版本，不兼容的修改时加一
+SNAPSHOT_VERSION = 1
+
+
+def _number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _parse_quote(row) -> Optional[Tuple[Quote, float]]:
+    """解析快照中的一条行情及其缓存时长，格式不正确时为None"""
+    if not isinstance(row, list) or len(row) != 12:
+        return None
+    exchange, symbol, bid, ask, last, ts, bid_qty, ask_qty, volume, change, change_percent, age = row
+    if not isinstance(exchange, str) or not isinstance(symbol, str):
+        return None
+    if not all(_number(value) for value in row[2:]) or age < 0:
+        return None
+    quote = Quote(exchange, symbol, float(bid), float(ask), float(last), int(ts), bid_qty=float(bid_qty),
+                  ask_qty=float(ask_qty), volume=float(volume), change=float(change),
+                  change_percent=float(change_percent))
+    return quote, float(age)
+
+
+class SnapshotService:
+    """
+    运行状态快照
+
+    定期把最新行情、交易对注册表和滚动统计写入 DATA_DIR/SNAPSHOT_FILE（先写临时文件再原子替换），
+    启动时读取：行情按保存时的缓存时长加停机时长恢复并标记为已恢复，
+    注册表恢复后启动时不必等待各交易所的交易对列表。
+    缓存时长不超过 SNAPSHOT_SERVE_SECONDS 的恢复行情由交易所适配器直接返回（compose也因此不请求上游），
+    同时在后台拉取新行情替换（见 ExchangeAdapter._restored）。
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self.file = Path(settings.DATA_DIR) / settings.SNAPSHOT_FILE
+        self._lock = asyncio.Lock()
+        self.saves = 0
+        self.failures = 0
+        self.last_saved_at: Optional[int] = None
+        self.last_size = 0
+        self.last_save_ms: Optional[float] = None
+        self.restored: Optional[dict] = None
+
+    # ---- 保存 ----
+
+    def _collect(self) -> dict:
+        return {
+            "version": SNAPSHOT_VERSION,
+            "saved_at": int(time.time() * 1000),
+            "quotes": [
+                [q.exchange, q.symbol, q.bid, q.ask, q.last, q.ts, q.bid_qty, q.ask_qty,
+                 q.volume, q.change, q.change_percent, round(age, 3)]
+                for q, age in QuoteCacheService().export()
+            ],
+            "instruments": InstrumentService().export(),
+            "stats": StatsService().export()
+        }
+
+    def _write(self, body: bytes):
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.file.with_name(self.file.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.file)
+
+    async def save(self):
+        """保存快照（周期任务，也在关闭时调用）"""
+        if self._lock.locked():
+            return
+        async with self._lock:
+            started = time.perf_counter()
+            try:
+                body = orjson.dumps(self._collect())
+                await asyncio.to_thread(self._write, body)
+            except Exception as e:
+                self.failures += 1
+                logger.error("Failed to save state snapshot: %s", e)
+                return
+            self.saves += 1
+            self.last_saved_at = int(time.time() * 1000)
+            self.last_size = len(body)
+            self.last_save_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    # ---- 恢复 ----
+
+    def _read(self) -> Optional[dict]:
+        if not self.file.exists():
+            return None
+        return orjson.loads(self.file.read_bytes())
+
+    async def restore(self) -> bool:
+        """
+        启动时恢复快照
+
+        Returns:
+            是否恢复了交易对注册表（为真时可以在后台刷新注册表）
+        """
+        started = time.perf_counter()
+        try:
+            data = await asyncio.to_thread(self._read)
+        except Exception as e:
+            logger.error("Failed to read state snapshot: %s", e)
+            return False
+        if data is None:
+            return False
+        if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+            logger.warning("Ignoring state snapshot with version %s",
+                           data.get("version") if isinstance(data, dict) else None)
+            return False
+        if not _number(data.get("saved_at")):
+            logger.warning("Ignoring state snapshot without a valid saved_at")
+            return False
+        downtime = max(0.0, time.time() - data["saved_at"] / 1000)
+        if downtime > settings.SNAPSHOT_MAX_AGE_SECONDS:
+            logger.warning("Ignoring state snapshot saved %s s ago", round(downtime))
+            return False
+        # 先校验所有行情，格式不正确的行跳过，不影响其他行情和启动
+        rows = data.get("quotes")
+        parsed = [_parse_quote(row) for row in rows] if isinstance(rows, list) else []
+        entries = [entry for entry in parsed if entry is not None]
+        skipped = len(parsed) - len(entries)
+        if skipped:
+            logger.warning("Skipped %s malformed quote(s) in state snapshot", skipped)
+
+        try:
+            instruments = InstrumentService().restore(data.get("instruments") or {})
+            quote_cache = QuoteCacheService()
+            for quote, age in entries:
+                quote_cache.restore(quote, age + downtime)
+            # 等待行情监听器触发的增量计算完成，再用快照中的统计覆盖恢复行情产生的样本
+            await asyncio.sleep(0)
+            stats = StatsService().restore(data.get("stats") or [])
+        except Exception as e:
+            # 已恢复的行情标记为已恢复，由后台刷新和请求替换，其余按冷启动处理
+            logger.error("Failed to restore state snapshot, starting cold: %s", e)
+            return False
+        quotes = len(entries)
+        self.restored = {
+            "saved_at": data["saved_at"],
+            "downtime_seconds": round(downtime, 3),
+            "quotes": quotes,
+            "skipped_quotes": skipped,
+            "instruments": instruments,
+            "stats_series": stats,
+            "restore_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+        logger.info("Restored state snapshot: %s quote(s), %s instrument(s), %s stats series, %s s old",
+                    quotes, instruments, stats, round(downtime, 1))
+        return instruments > 0
+
+    def summary(self) -> dict:
+        return {
+            "file": str(self.file),
+            "saves": self.saves,
+            "failures": self.failures,
+            "last_saved_at": self.last_saved_at,
+            "last_size": self.last_size,
+            "last_save_ms": self.last_save_ms,
+            "restored": self.restored
+        }
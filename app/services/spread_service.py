@@ -0,0 +1,183 @@
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+from core.config import settings
+from core.logging import logger
+from models.quote import Quote
+from services.exchanges import get_adapter
+from services.quote_cache_service import QuoteCacheService
+
+# (交易所, 交易对)
+Leg = Tuple[str, str]
+
+
+def _leg_name(leg: Leg) -> str:
+    return f"{leg[0]}:{leg[1]}"
+
+
+class SpreadService:
+    """
+    跨交易所价差与三角套利监控
+
+    每个交易对保存各交易所的最新行情。某条行情变化时只重新计算涉及它的
+    交易所两两价差和三角组合（如 OKJ BTC/JPY 对比 OKX BTC/USDT × USDT/JPY），
+    结果通过接口查询，并推送给所有订阅者。
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        # 交易对 -> 交易所 -> 最新行情
+        self._quotes: Dict[str, Dict[str, Quote]] = {}
+        # (交易对, 交易所A, 交易所B) -> 价差，A < B
+        self._pairs: Dict[Tuple[str, str, str], dict] = {}
+        # (直接报价, 中间报价, 汇率) -> 三角组合结果
+        self._triangles: Dict[Tuple[Leg, Leg, Leg], dict] = {}
+        # 行情 -> 使用它的三角组合
+        self._triangle_index: Dict[Leg, List[Tuple[Leg, Leg, Leg]]] = {}
+        self._subscribers: Set[asyncio.Queue] = set()
+        self.dropped = 0
+        QuoteCacheService().add_listener(self.on_quote)
+
+    def on_quote(self, quote: Quote):
+        """行情变化回调：只重新计算与该行情相关的价差和三角组合"""
+        leg = (quote.exchange, quote.symbol)
+        venues = self._quotes.setdefault(quote.symbol, {})
+        is_new = quote.exchange not in venues
+        venues[quote.exchange] = quote
+
+        updates = []
+        for venue, other in venues.items():
+            if venue != quote.exchange:
+                updates.append(self._update_pair(quote, other))
+        if is_new:
+            self._rebuild_triangles()
+        for triangle in self._triangle_index.get(leg, ()):
+            updates.append(self._update_triangle(triangle))
+        if updates:
+            self._publish(updates)
+
+    def _update_pair(self, quote: Quote, other: Quote) -> dict:
+        a, b = (quote, other) if quote.exchange < other.exchange else (other, quote)
+        result = {
+            "type": "pair",
+            "symbol": a.symbol,
+            "venue_a": a.exchange,
+            "venue_b": b.exchange,
+            "last_a": a.last,
+            "last_b": b.last,
+            # A相对B的最新价差
+            "spread_percent": round((a.last - b.last) / b.last * 100, 4),
+            # A买入（ask）B卖出（bid）的收益，及反方向
+            "a_to_b_percent": round((b.bid - a.ask) / a.ask * 100, 4),
+            "b_to_a_percent": round((a.bid - b.ask) / b.ask * 100, 4),
+            # 两条行情的时间差，过大时价差可能只是数据不同步
+            "skew_ms": abs(a.ts - b.ts),
+            "ts": max(a.ts, b.ts)
+        }
+        self._pairs[(a.symbol, a.exchange, b.exchange)] = result
+        return result
+
+    def _rebuild_triangles(self):
+        """
+        出现新的行情时重新枚举三角组合（很少发生）
+
+        直接报价 BASE/Q1，中间报价 BASE/Q2，汇率 Q2/Q1，
+        比较直接报价与 中间报价 × 汇率。
+        """
+        legs = [(venue, symbol) for symbol, venues in self._quotes.items() for venue in venues]
+        by_symbol: Dict[str, List[Leg]] = {}
+        for leg in legs:
+            by_symbol.setdefault(leg[1], []).append(leg)
+
+        triangles = []
+        for direct in legs:
+            base, q1 = direct[1].split("/", 1)
+            for via_symbol, via_legs in by_symbol.items():
+                via_base, q2 = via_symbol.split("/", 1)
+                if via_base != base or q2 == q1:
+                    continue
+                for cross in by_symbol.get(f"{q2}/{q1}", ()):
+                    for via in via_legs:
+                        triangles.append((direct, via, cross))
+
+        index: Dict[Leg, List[Tuple[Leg, Leg, Leg]]] = {}
+        for triangle in triangles:
+            for leg in triangle:
+                index.setdefault(leg, []).append(triangle)
+        self._triangle_index = index
+        self._triangles = {t: self._triangles[t] for t in triangles if t in self._triangles}
+        for triangle in triangles:
+            if triangle not in self._triangles:
+                self._update_triangle(triangle)
+
+    def _update_triangle(self, triangle: Tuple[Leg, Leg, Leg]) -> dict:
+        direct, via, cross = (self._quotes[symbol][venue] for venue, symbol in triangle)
+        implied_last = via.last * cross.last
+        result = {
+            "type": "triangle",
+            "direct": _leg_name(triangle[0]),
+            "via": _leg_name(triangle[1]),
+            "cross": _leg_name(triangle[2]),
+            "direct_last": direct.last,
+            "implied_last": implied_last,
+            # 直接报价相对合成价格的偏离
+            "deviation_percent": round((direct.last / implied_last - 1) * 100, 4),
+            # 直接买入BASE，经中间报价卖出并按汇率换回的收益，及反方向
+            "forward_percent": round((via.bid * cross.bid / direct.ask - 1) * 100, 4),
+            "reverse_percent": round((direct.bid / (via.ask * cross.ask) - 1) * 100, 4),
+            "skew_ms": max(direct.ts, via.ts, cross.ts) - min(direct.ts, via.ts, cross.ts),
+            "ts": max(direct.ts, via.ts, cross.ts)
+        }
+        self._triangles[triangle] = result
+        return result
+
+    def snapshot(self, symbol: Optional[str] = None) -> dict:
+        """当前所有价差和三角组合，按最大套利收益从高到低排序"""
+        pairs = [p for p in self._pairs.values() if symbol is None or p["symbol"] == symbol]
+        pairs.sort(key=lambda p: max(p["a_to_b_percent"], p["b_to_a_percent"]), reverse=True)
+        triangles = [
+            t for t in self._triangles.values()
+            if symbol is None or t["direct"].split(":", 1)[1] == symbol
+        ]
+        triangles.sort(key=lambda t: max(t["forward_percent"], t["reverse_percent"]), reverse=True)
+        return {"pairs": pairs, "triangles": triangles}
+
+    # ---- 推送 ----
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=settings.SPREAD_STREAM_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def _publish(self, updates: List[dict]):
+        for queue in self._subscribers:
+            if queue.full():
+                # 订阅者处理不过来时丢弃最旧的一批，保证收到的总是最新数据
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(updates)
+
+    # ---- 轮询 ----
+
+    async def poll(self):
+        """拉取监控列表中的所有行情，价差由行情变化回调计算"""
+        legs = [item.partition(":")[::2] for item in settings.SPREAD_WATCHLIST]
+
+        async def _fetch(venue: str, symbol: str):
+            return await get_adapter(venue).get_price(symbol)
+
+        results = await asyncio.gather(
+            *(_fetch(venue, symbol) for venue, symbol in legs),
+            return_exceptions=True
+        )
+        for (venue, symbol), result in zip(legs, results):
+            if isinstance(result, Exception):
+                logger.warning("Spread monitor failed to fetch %s:%s: %s", venue, symbol, getattr(result, "detail", result))
@@ -0,0 +1,282 @@
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from core.config import settings
+from core.logging import logger
+from core.metrics import LatencyHistogram
+from models.compose import ComposeResult
+from models.quote import Quote
+from services.compose_graph_service import ComposeGraphService
+from services.quote_cache_service import QuoteCacheService
+
+# 组合计算的USDT/JPY（默认倍率）
+COMPOSE = ("compose", "USDT/JPY")
+
+
+def _window_label(seconds: int) -> str:
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600}h"
+    if seconds % 60 == 0:
+        return f"{seconds // 60}m"
+    return f"{seconds}s"
+
+
+class _Bucket:
+    """窗口中一个时间分桶的汇总（Welford均值/方差和对数收益平方和）"""
+    __slots__ = ("id", "count", "mean", "m2", "returns", "sq_returns")
+
+    def __init__(self, bucket_id: int):
+        self.id = bucket_id
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.returns = 0
+        self.sq_returns = 0.0
+
+
+class _RollingWindow:
+    """
+    时间滑动窗口统计
+
+    窗口按时间分成固定数量的桶，每个样本 O(1) 更新当前桶和窗口合计，
+    桶过期时从合计中整体减去（Welford合并的逆运算）；最小/最大值用单调队列，
+    每个桶最多保留一项。内存只与桶数有关，与行情频率无关。
+    """
+    __slots__ = ("seconds", "size", "width", "buckets", "count", "mean", "m2",
+                 "returns", "sq_returns", "mins", "maxs", "ewma", "_ewma_at")
+
+    def __init__(self, seconds: int, size: int):
+        self.seconds = seconds
+        self.size = size
+        self.width = seconds / size
+        self.buckets: Deque[_Bucket] = deque()
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.returns = 0
+        self.sq_returns = 0.0
+        # (桶ID, 数值)
+        self.mins: Deque[Tuple[int, float]] = deque()
+        self.maxs: Deque[Tuple[int, float]] = deque()
+        self.ewma: Optional[float] = None
+        self._ewma_at = 0.0
+
+    def _expire(self, bucket_id: int):
+        oldest = bucket_id - self.size
+        while self.buckets and self.buckets[0].id <= oldest:
+            self._remove(self.buckets.popleft())
+        while self.mins and self.mins[0][0] <= oldest:
+            self.mins.popleft()
+        while self.maxs and self.maxs[0][0] <= oldest:
+            self.maxs.popleft()
+
+    def _remove(self, bucket: _Bucket):
+        remaining = self.count - bucket.count
+        if remaining <= 0:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+        else:
+            mean = (self.count * self.mean - bucket.count * bucket.mean) / remaining
+            delta = bucket.mean - mean
+            self.m2 = max(0.0, self.m2 - bucket.m2 - delta * delta * remaining * bucket.count / self.count)
+            self.count, self.mean = remaining, mean
+        self.returns -= bucket.returns
+        self.sq_returns = max(0.0, self.sq_returns - bucket.sq_returns) if self.returns else 0.0
+
+    def update(self, now: float, value: float, log_return: Optional[float]):
+        bucket_id = int(now // self.width)
+        self._expire(bucket_id)
+        if self.buckets and self.buckets[-1].id == bucket_id:
+            bucket = self.buckets[-1]
+        else:
+            bucket = _Bucket(bucket_id)
+            self.buckets.append(bucket)
+
+        bucket.count += 1
+        delta = value - bucket.mean
+        bucket.mean += delta / bucket.count
+        bucket.m2 += delta * (value - bucket.mean)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if log_return is not None:
+            bucket.returns += 1
+            bucket.sq_returns += log_return * log_return
+            self.returns += 1
+            self.sq_returns += log_return * log_return
+
+        mins, maxs = self.mins, self.maxs
+        while mins and mins[-1][1] >= value:
+            mins.pop()
+        if not mins or mins[-1][0] != bucket_id:
+            mins.append((bucket_id, value))
+        while maxs and maxs[-1][1] <= value:
+            maxs.pop()
+        if not maxs or maxs[-1][0] != bucket_id:
+            maxs.append((bucket_id, value))
+
+        # 按时间衰减的EWMA，时间常数为窗口长度
+        if self.ewma is None:
+            self.ewma = value
+        else:
+            alpha = 1 - math.exp(-(now - self._ewma_at) / self.seconds)
+            self.ewma += alpha * (value - self.ewma)
+        self._ewma_at = now
+
+    def to_state(self) -> list:
+        return [
+            [[b.id, b.count, b.mean, b.m2, b.returns, b.sq_returns] for b in self.buckets],
+            self.count, self.mean, self.m2, self.returns, self.sq_returns,
+            [list(item) for item in self.mins], [list(item) for item in self.maxs],
+            self.ewma, self._ewma_at
+        ]
+
+    def load_state(self, state: list):
+        buckets, self.count, self.mean, self.m2, self.returns, self.sq_returns, mins, maxs, self.ewma, self._ewma_at = state
+        self.buckets = deque()
+        for bucket_id, count, mean, m2, returns, sq_returns in buckets:
+            bucket = _Bucket(bucket_id)
+            bucket.count, bucket.mean, bucket.m2, bucket.returns, bucket.sq_returns = count, mean, m2, returns, sq_returns
+            self.buckets.append(bucket)
+        self.mins = deque(tuple(item) for item in mins)
+        self.maxs = deque(tuple(item) for item in maxs)
+
+    def to_dict(self, now: float, last: float) -> dict:
+        self._expire(int(now // self.width))
+        if not self.count:
+            return {"count": 0}
+        std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": std,
+            "min": self.mins[0][1],
+            "max": self.maxs[0][1],
+            "ewma": self.ewma,
+            "zscore": round((last - self.mean) / std, 4) if std > 0 else 0.0,
+            # 窗口内对数收益平方和的平方根
+            "volatility_percent": round(math.sqrt(self.sq_returns) * 100, 6)
+        }
+
+
+class _StatsSeries:
+    __slots__ = ("last", "updated_at", "windows")
+
+    def __init__(self, windows: List[int], size: int):
+        self.last: Optional[float] = None
+        self.updated_at = 0.0
+        self.windows = [_RollingWindow(seconds, size) for seconds in windows]
+
+    def update(self, now: float, value: float):
+        log_return = math.log(value / self.last) if self.last and value > 0 and self.last > 0 else None
+        self.last = value
+        self.updated_at = now
+        for window in self.windows:
+            window.update(now, value, log_return)
+
+    def to_state(self) -> list:
+        return [self.last, self.updated_at, [[w.seconds, w.size, w.to_state()] for w in self.windows]]
+
+    def load_state(self, state: list):
+        self.last, self.updated_at, windows = state
+        saved = {(seconds, size): window for seconds, size, window in windows}
+        for window in self.windows:
+            # 窗口配置变化时该窗口从空开始
+            if (window.seconds, window.size) in saved:
+                window.load_state(saved[(window.seconds, window.size)])
+
+
+class StatsService:
+    """
+    行情滚动统计
+
+    每条行情序列（交易所, 交易对）和组合计算的USDT/JPY在 STATS_WINDOWS 的每个窗口上
+    维护均值、标准差、最小/最大值、EWMA、z-score 和已实现波动率。
+    价格变化时增量更新，查询直接读取当前值，不重新扫描历史。
+    窗口按系统时间分桶，从状态快照恢复后可以继续滑动。
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self.windows = sorted(settings.STATS_WINDOWS)
+        self._series: Dict[Tuple[str, str], _StatsSeries] = {}
+        self.evaluation = LatencyHistogram()
+        self.rejected = 0
+        QuoteCacheService().add_listener(self.on_quote)
+        ComposeGraphService().add_listener(self.on_compose)
+
+    def on_quote(self, quote: Quote):
+        self.observe(quote.exchange, quote.symbol, quote.last)
+
+    def on_compose(self, group: Optional[str], result: ComposeResult):
+        if group is None:
+            self.observe(*COMPOSE, result.last)
+
+    def observe(self, exchange: str, symbol: str, value: float):
+        started = time.perf_counter()
+        key = (exchange, symbol)
+        series = self._series.get(key)
+        if series is None:
+            if len(self._series) >= settings.STATS_MAX_SERIES:
+                if not self.rejected:
+                    logger.warning("Too many statistics series, ignoring %s:%s", exchange, symbol)
+                self.rejected += 1
+                return
+            series = self._series[key] = _StatsSeries(self.windows, settings.STATS_BUCKETS)
+        series.update(time.time(), value)
+        self.evaluation.observe(time.perf_counter() - started)
+
+    def get(self, symbol: str, exchange: Optional[str] = None) -> dict:
+        """交易对在各交易所（及USDT/JPY组合价格）上的所有窗口统计"""
+        now = time.time()
+        result = {}
+        for (venue, name), series in self._series.items():
+            if name != symbol or (exchange is not None and venue != exchange):
+                continue
+            result[f"{venue}:{name}"] = {
+                "last": series.last,
+                "age_seconds": round(now - series.updated_at, 3),
+                "windows": {
+                    _window_label(window.seconds): window.to_dict(now, series.last)
+                    for window in series.windows
+                }
+            }
+        return result
+
+    def export(self) -> list:
+        """所有序列的窗口状态（用于状态快照）"""
+        return [[venue, symbol, series.to_state()] for (venue, symbol), series in self._series.items()]
+
+    def restore(self, data: list) -> int:
+        """从状态快照恢复统计（覆盖恢复行情时产生的样本），过期的桶在下次更新或查询时移出"""
+        count = 0
+        for item in data:
+            try:
+                venue, symbol, state = item
+                if (venue, symbol) not in self._series and len(self._series) >= settings.STATS_MAX_SERIES:
+                    continue
+                series = _StatsSeries(self.windows, settings.STATS_BUCKETS)
+                series.load_state(state)
+            except (TypeError, ValueError) as e:
+                # 格式不正确的序列跳过，随新行情重新累积
+                logger.warning("Ignoring malformed stats series in snapshot: %s", e)
+                continue
+            self._series[(venue, symbol)] = series
+            count += 1
+        return count
+
+    def summary(self) -> dict:
+        return {
+            "windows": [_window_label(seconds) for seconds in self.windows],
+            "buckets": settings.STATS_BUCKETS,
+            "series": sorted(f"{venue}:{symbol}" for venue, symbol in self._series),
+            "rejected": self.rejected,
+            "evaluation": self.evaluation.snapshot()
+        }
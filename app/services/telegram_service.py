@@ -0,0 +1,32 @@
+from typing import Optional
+import telegram
+import telegramify_markdown
+from telegram.constants import ParseMode
+from core.config import settings
+
+
+class TelegramService:
+    """Telegram消息发送（全局共享一个Bot实例）"""
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.bot = telegram.Bot(token=settings.TG_BOT_TOKEN, base_url=settings.TG_API_BASE_URL)
+            cls._instance.default_chat_id = settings.TG_GID
+        return cls._instance
+
+    async def send_markdown(self, markdown_text: str, chat_id: Optional[str] = None):
+        """
+        发送Markdown消息
+
+        Args:
+            markdown_text: 标准Markdown文本，发送前转换为MarkdownV2
+            chat_id: 目标会话，默认为 TG_GID
+        """
+        formatted_content = telegramify_markdown.markdownify(markdown_text)
+        return await self.bot.send_message(
+            chat_id=chat_id or self.default_chat_id,
+            text=formatted_content,
+            parse_mode=ParseMode.MARKDOWN_V2
+        )
@@ -0,0 +1,40 @@
+import os
+import sys
+from pathlib import Path
+import pytest
+
+# 应用代码以 app 为根目录导入（与 uvicorn main:app 一致）
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+# Settings 的必填项，测试不连接数据库和Telegram
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("TG_BOT_TOKEN", "0:test")
+os.environ.setdefault("TG_GID", "0")
+os.environ.setdefault("LOG_FORMAT", "console")
+
+from core.config import settings  # noqa: E402
+from services.consensus_service import ConsensusService  # noqa: E402
+from services.instrument_service import InstrumentService  # noqa: E402
+from services.leg_refresh_service import LegRefreshService  # noqa: E402
+from services.market_data_service import MarketDataService  # noqa: E402
+from services.quote_cache_service import QuoteCacheService  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fresh_services(monkeypatch):
+    """每个测试使用新的单例服务"""
+    for cls in (QuoteCacheService, ConsensusService, InstrumentService, MarketDataService, LegRefreshService):
+        monkeypatch.setattr(cls, "_instance", None)
+
+
+@pytest.fixture
+def replay(monkeypatch, tmp_path):
+    """从 fixtures/market_data.jsonl 按顺序回放上游响应，之后创建的适配器不访问网络"""
+    monkeypatch.setattr(settings, "MARKET_DATA_MODE", "replay")
+    monkeypatch.setattr(settings, "MARKET_DATA_FILE", str(FIXTURES / "market_data.jsonl"))
+    monkeypatch.setattr(settings, "MARKET_REPLAY_SPEED", 0)
+    # Google适配器在当前目录下创建页面缓存
+    monkeypatch.chdir(tmp_path)
+    return MarketDataService()
@@ -0,0 +1,136 @@
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from fastapi import HTTPException
+from services.binance_service import BinanceService
+from services.bitflyer_service import BitflyerService
+from services.coincheck_service import CoincheckService
+from services.google_service import GoogleService
+from services.instrument_service import Instrument
+from services.okj_service import OKJService
+from services.okx_service import OKXService
+
+# 录制数据的时间 2024-01-01T00:00:00Z
+T = 1704067200000
+
+
+def _instrument(adapter, base: str, quote: str) -> Instrument:
+    return Instrument(adapter.name, adapter.native_symbol(base, quote), base, quote)
+
+
+def _ts(value: str) -> int:
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+class TestBinance:
+    def test_ticker(self, replay):
+        adapter = BinanceService()
+        quote = asyncio.run(adapter.get_ticker(_instrument(adapter, "BTC", "USDT")))
+        assert (quote.exchange, quote.symbol) == ("binance", "BTC/USDT")
+        assert (quote.bid, quote.ask, quote.last) == (93860.1, 93860.2, 93860.15)
+        assert (quote.bid_qty, quote.ask_qty, quote.volume) == (1.25, 0.5, 1234.5)
+        assert (quote.change, quote.change_percent) == (-100.5, -0.107)
+        assert quote.ts == T
+
+    def test_batch(self, replay):
+        adapter = BinanceService()
+        instruments = [_instrument(adapter, "BTC", "USDT"), _instrument(adapter, "ETH", "USDT")]
+        quotes = asyncio.run(adapter.get_tickers(instruments))
+        assert [(q.symbol, q.last) for q in quotes] == [("BTC/USDT", 93860.15), ("ETH/USDT", 3300.15)]
+
+    def test_invalid_symbol(self, replay):
+        adapter = BinanceService()
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(adapter.get_ticker(_instrument(adapter, "XYZ", "USDT")))
+        assert error.value.status_code == 400
+
+    def test_candles(self, replay):
+        adapter = BinanceService()
+        candles = asyncio.run(adapter.get_candles(_instrument(adapter, "BTC", "USDT"), 60, T, T + 180000))
+        assert candles == [(T + i * 60000, 93800.0, 93900.0, 93700.0, 93850.0 + i, 12.5) for i in range(3)]
+
+
+class TestOKX:
+    def test_ticker(self, replay):
+        adapter = OKXService()
+        quote = asyncio.run(adapter.get_ticker(_instrument(adapter, "BTC", "USDT")))
+        assert (quote.exchange, quote.symbol) == ("okx", "BTC/USDT")
+        assert (quote.bid, quote.ask, quote.last, quote.ts) == (93850.0, 93852.0, 93851.0, T)
+        assert quote.change == 93851.0 - 94000.0
+        assert quote.change_percent == pytest.approx((93851 - 94000) / 94000 * 100)
+
+    def test_batch_filters_requested(self, replay):
+        adapter = OKXService()
+        instruments = [_instrument(adapter, "BTC", "JPY"), _instrument(adapter, "BTC", "USDT")]
+        quotes = asyncio.run(adapter.get_tickers(instruments))
+        assert sorted((q.symbol, q.last) for q in quotes) == [("BTC/JPY", 14795000.0), ("BTC/USDT", 93851.0)]
+
+    def test_error_code(self, replay):
+        adapter = OKXService()
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(adapter.get_ticker(_instrument(adapter, "XYZ", "USDT")))
+        assert error.value.status_code == 400
+
+    def test_candles_ascending(self, replay):
+        adapter = OKXService()
+        candles = asyncio.run(adapter.get_candles(_instrument(adapter, "BTC", "USDT"), 60, T, T + 180000))
+        assert [c[0] for c in candles] == [T, T + 60000, T + 120000]
+        assert candles[-1] == (T + 120000, 93800.0, 93900.0, 93700.0, 93852.0, 12.5)
+
+
+class TestOKJ:
+    def test_ticker(self, replay):
+        adapter = OKJService()
+        quote = asyncio.run(adapter.get_ticker(_instrument(adapter, "BTC", "JPY")))
+        assert (quote.exchange, quote.symbol) == ("okj", "BTC/JPY")
+        assert (quote.bid, quote.ask, quote.last) == (14799587.0, 14807946.0, 14802183.0)
+        assert quote.ts == T + 123
+        # /crypto/price 保持OKJ原有的UTC时间格式
+        assert quote.legacy_timestamp == "2024-01-01T00:00:00.123Z"
+
+    def test_batch(self, replay):
+        adapter = OKJService()
+        quotes = asyncio.run(adapter.get_tickers([_instrument(adapter, "ETH", "JPY")]))
+        assert [(q.symbol, q.bid, q.ask) for q in quotes] == [("ETH/JPY", 520000.0, 520100.0)]
+
+    def test_candles_within_range(self, replay):
+        adapter = OKJService()
+        candles = asyncio.run(adapter.get_candles(_instrument(adapter, "BTC", "JPY"), 60, T, T + 180000))
+        # 区间外的K线（00:03）被丢弃，结果按时间升序
+        assert [c[0] for c in candles] == [T, T + 60000, T + 120000]
+        assert [c[4] for c in candles] == [14800000.0, 14800001.0, 14800002.0]
+
+
+class TestBitflyer:
+    def test_ticker(self, replay):
+        adapter = BitflyerService()
+        quote = asyncio.run(adapter.get_ticker(_instrument(adapter, "BTC", "JPY")))
+        assert (quote.bid, quote.ask, quote.last) == (14796000.0, 14799000.0, 14797000.0)
+        assert (quote.bid_qty, quote.ask_qty, quote.volume) == (0.1, 0.2, 500.0)
+        # 不带时区的时间按UTC解析
+        assert quote.ts == _ts("2024-01-01T00:00:00.5")
+
+    def test_batch(self, replay):
+        adapter = BitflyerService()
+        instruments = [_instrument(adapter, "BTC", "JPY"), _instrument(adapter, "ETH", "JPY")]
+        quotes = asyncio.run(adapter.get_tickers(instruments))
+        assert [(q.symbol, q.last) for q in quotes] == [("BTC/JPY", 14797000.0), ("ETH/JPY", 520100.0)]
+
+
+class TestCoincheck:
+    def test_ticker(self, replay):
+        adapter = CoincheckService()
+        instrument = _instrument(adapter, "BTC", "JPY")
+        assert instrument.native_id == "btc_jpy"
+        quote = asyncio.run(adapter.get_ticker(instrument))
+        assert (quote.bid, quote.ask, quote.last, quote.volume) == (14797000.0, 14799500.0, 14798000.0, 123.4)
+        assert quote.ts == T
+
+
+class TestGoogle:
+    def test_ticker(self, replay):
+        adapter = GoogleService()
+        quote = asyncio.run(adapter.get_ticker(_instrument(adapter, "BTC", "JPY")))
+        # 只有最新价，买卖价等于最新价
+        assert (quote.exchange, quote.symbol) == ("google", "BTC/JPY")
+        assert quote.bid == quote.ask == quote.last == 14788087.3
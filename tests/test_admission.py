@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from core.admission import PRIORITY_HIGH, PRIORITY_LOW, AdmissionGate, Overloaded
+
+
+async def _settle():
+    """让等待中的任务运行到下一个等待点"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_admit_and_release():
+    async def run():
+        gate = AdmissionGate("test", limit=2, queue_size=2)
+        assert await gate.acquire(PRIORITY_LOW, 1.0) == 0.0
+        assert await gate.acquire(PRIORITY_LOW, 1.0) == 0.0
+        assert gate.active == 2
+        gate.release(0.01)
+        gate.release(0.01)
+        assert gate.active == 0
+    asyncio.run(run())
+
+
+def test_release_hands_over_by_priority():
+    async def run():
+        gate = AdmissionGate("test", limit=1, queue_size=4)
+        await gate.acquire(PRIORITY_LOW, 1.0)
+        order = []
+
+        async def waiter(name, priority):
+            await gate.acquire(priority, 1.0)
+            order.append(name)
+
+        tasks = [asyncio.create_task(waiter("low", PRIORITY_LOW)), asyncio.create_task(waiter("high", PRIORITY_HIGH))]
+        await _settle()
+        assert gate.waiting == [1, 1]
+        gate.release()
+        await _settle()
+        # 名额直接交给优先级高的等待者，active 不变
+        assert order == ["high"]
+        assert gate.active == 1
+        gate.release()
+        await asyncio.gather(*tasks)
+        assert order == ["high", "low"]
+        gate.release()
+        assert gate.active == 0
+    asyncio.run(run())
+
+
+def test_queue_full():
+    async def run():
+        gate = AdmissionGate("test", limit=1, queue_size=1)
+        await gate.acquire(PRIORITY_LOW, 1.0)
+        task = asyncio.create_task(gate.acquire(PRIORITY_LOW, 1.0))
+        await _settle()
+        with pytest.raises(Overloaded) as error:
+            await gate.acquire(PRIORITY_HIGH, 1.0)
+        assert error.value.reason == "queue_full"
+        gate.release()
+        await task
+    asyncio.run(run())
+
+
+def test_estimated_wait_over_target():
+    async def run():
+        gate = AdmissionGate("test", limit=1, queue_size=4)
+        gate.service_time = 0.5
+        await gate.acquire(PRIORITY_LOW, 1.0)
+        with pytest.raises(Overloaded) as error:
+            await gate.acquire(PRIORITY_LOW, 0.1)
+        assert error.value.reason == "latency"
+        assert gate.shed["latency"] == 1
+    asyncio.run(run())
+
+
+def test_wait_timeout():
+    async def run():
+        gate = AdmissionGate("test", limit=1, queue_size=4)
+        await gate.acquire(PRIORITY_LOW, 1.0)
+        with pytest.raises(Overloaded) as error:
+            await gate.acquire(PRIORITY_LOW, 0.01)
+        assert error.value.reason == "timeout"
+        assert gate.waiting == [0, 0]
+        # 超时的等待者不会拿到名额
+        gate.release()
+        assert gate.active == 0
+    asyncio.run(run())
@@ -0,0 +1,37 @@
+from services.alert_service import _LevelIndex
+
+
+def _index(*levels) -> _LevelIndex:
+    index = _LevelIndex()
+    for level, rule_id in levels:
+        index.add(level, rule_id)
+    return index
+
+
+def test_rising_includes_upper_bound():
+    index = _index((100.0, "a"), (110.0, "b"), (120.0, "c"))
+    assert index.crossed(100.0, 110.0) == ["b"]
+    assert index.crossed(90.0, 130.0) == ["a", "b", "c"]
+    assert index.crossed(110.0, 119.9) == []
+
+
+def test_falling_includes_lower_bound():
+    index = _index((100.0, "a"), (110.0, "b"), (120.0, "c"))
+    assert index.crossed(120.0, 110.0) == ["b"]
+    assert index.crossed(130.0, 90.0) == ["a", "b", "c"]
+    assert index.crossed(110.0, 110.0) == []
+
+
+def test_same_level_rules():
+    index = _index((100.0, "a"), (100.0, "b"))
+    assert index.crossed(99.0, 100.0) == ["a", "b"]
+    index.remove(100.0, "a")
+    assert index.crossed(99.0, 100.0) == ["b"]
+    assert len(index) == 1
+
+
+def test_remove_missing_rule():
+    index = _index((100.0, "a"))
+    index.remove(100.0, "x")
+    index.remove(101.0, "a")
+    assert index.ids == ["a"]
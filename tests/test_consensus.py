@@ -0,0 +1,113 @@
+import pytest
+from models.quote import Quote
+from services.compose_service import ComposeService
+from services.consensus_service import ConsensusService, weighted_median
+from services.quote_cache_service import QuoteCacheService
+
+T = 1704067200000
+
+
+def _quote(exchange: str, last: float, symbol: str = "BTC/JPY") -> Quote:
+    return Quote(exchange, symbol, last - 1, last + 1, last, T)
+
+
+def _entries(*prices, age: float = 0.0) -> list:
+    return [(_quote(exchange, price), age) for exchange, price in prices]
+
+
+def test_weighted_median():
+    assert weighted_median([(3.0, 1.0), (1.0, 1.0), (2.0, 1.0)]) == 2.0
+    assert weighted_median([(1.0, 1.0), (2.0, 1.0), (3.0, 5.0)]) == 3.0
+
+
+def test_mad_rejects_outlier():
+    result = ConsensusService.compute("BTC/JPY", _entries(
+        ("okj", 15_000_000), ("bitflyer", 15_010_000), ("coincheck", 14_995_000), ("google", 16_500_000)
+    ))
+    assert result.method == "mad"
+    assert result.rejected == ["google"]
+    assert sorted(result.used) == ["bitflyer", "coincheck", "okj"]
+    assert result.price == 15_000_000
+
+
+def test_mad_keeps_nearly_identical_quotes():
+    # 标准差有下限，几乎一致的行情不会因为MAD接近0而被剔除
+    result = ConsensusService.compute("BTC/JPY", _entries(
+        ("okj", 15_000_000), ("bitflyer", 15_000_000), ("coincheck", 15_000_100)
+    ))
+    assert result.rejected == []
+
+
+def test_two_sources_use_highest_weight_as_reference():
+    # 只有两条行情时MAD无法区分离群值，以权重最高的行情（Google权重0.5）为参考
+    result = ConsensusService.compute("BTC/JPY", _entries(("okj", 15_000_000), ("google", 1_500_000)))
+    assert result.method == "reference"
+    assert result.used == ["okj"]
+    assert result.rejected == ["google"]
+    assert result.price == 15_000_000
+
+
+def test_two_sources_checked_against_reference():
+    result = ConsensusService.compute(
+        "BTC/JPY", _entries(("okj", 20_000_000), ("google", 15_100_000)), reference=15_000_000
+    )
+    assert result.used == ["google"]
+    assert result.rejected == ["okj"]
+
+
+def test_no_source_near_reference():
+    assert ConsensusService.compute("BTC/JPY", _entries(("okj", 20_000_000)), reference=15_000_000) is None
+
+
+def test_old_quotes_ignored(monkeypatch):
+    from core.config import settings
+    monkeypatch.setattr(settings, "CONSENSUS_MAX_AGE_SECONDS", 60)
+    entries = _entries(("okj", 15_000_000)) + _entries(("bitflyer", 1_000_000), age=61)
+    result = ConsensusService.compute("BTC/JPY", entries)
+    assert [s.exchange for s in result.sources] == ["okj"]
+
+
+def test_update_uses_previous_result_as_reference():
+    consensus_service = ConsensusService()
+    quote_cache = QuoteCacheService()
+    quote_cache.put("okj", "BTC/JPY", _quote("okj", 15_000_000))
+    quote_cache.put("google", "BTC/JPY", _quote("google", 15_100_000))
+    assert sorted(consensus_service.get("BTC/JPY").used) == ["google", "okj"]
+    # 两条行情时与上一次共识价格比较，不以跳变后的行情为准
+    quote_cache.put("okj", "BTC/JPY", _quote("okj", 20_000_000))
+    result = consensus_service.get("BTC/JPY")
+    assert result.method == "reference"
+    assert result.used == ["google"]
+    assert consensus_service.version("BTC/JPY") == (3,)
+
+
+class TestComposeLegs:
+    @pytest.fixture
+    def cache(self):
+        ConsensusService()
+        quote_cache = QuoteCacheService()
+        quotes = {
+            "okj": _quote("okj", 16_500_000),
+            "bitflyer": _quote("bitflyer", 15_010_000),
+            "coincheck": _quote("coincheck", 14_995_000),
+            "google": _quote("google", 15_000_000),
+            "binance": _quote("binance", 100_000, "BTC/USDT"),
+        }
+        for exchange, quote in quotes.items():
+            quote_cache.put(exchange, quote.symbol, quote)
+        return quotes
+
+    def test_outlier_replaced(self, cache):
+        btc_usdt, btc_jpy, google = ComposeService.consensus_legs(cache["binance"], cache["okj"], cache["google"])
+        assert btc_usdt is cache["binance"]
+        # OKJ被剔除，改用参与共识的交易所行情
+        assert btc_jpy.exchange in ("bitflyer", "coincheck")
+        assert google is cache["google"]
+
+    def test_failed_leg_replaced(self, cache):
+        _, btc_jpy, _ = ComposeService.consensus_legs(cache["binance"], None, cache["google"])
+        assert btc_jpy.exchange in ("bitflyer", "coincheck")
+
+    def test_no_consensus(self):
+        ConsensusService()
+        assert ComposeService.consensus_legs(None, None, None) == (None, None, None)
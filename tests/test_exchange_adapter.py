@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from core.config import settings
+from services import exchange_adapter
+from core.ratelimit import TokenBucket
+from services.exchange_adapter import DeadlineExceeded, ExchangeAdapter, deadline
+
+
+class _Adapter(ExchangeAdapter):
+    """按预设结果返回行情的适配器，记录请求次数"""
+    name = "binance"
+
+    def __init__(self, outcomes):
+        super().__init__()
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def hedge_delay(self):
+        return 0.05
+
+    async def get_price(self, symbol: str):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, float):
+            await asyncio.sleep(outcome)
+            return outcome
+        raise outcome
+
+
+@pytest.fixture(autouse=True)
+def hedging(monkeypatch):
+    monkeypatch.setattr(settings, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(exchange_adapter, "_HEDGE_BUDGETS", {})
+
+
+def test_hedge_on_slow_primary():
+    adapter = _Adapter([1.0, 0.01])
+    assert asyncio.run(adapter.get_price_hedged("BTC/USDT")) == 0.01
+    assert adapter.calls == 2
+
+
+def test_hedge_on_retryable_error():
+    adapter = _Adapter([HTTPException(status_code=503, detail="unavailable"), 0.01])
+    assert asyncio.run(adapter.get_price_hedged("BTC/USDT")) == 0.01
+    assert adapter.calls == 2
+
+
+def test_no_hedge_on_client_error():
+    adapter = _Adapter([HTTPException(status_code=400, detail="Invalid symbol"), 0.01])
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(adapter.get_price_hedged("BTC/USDT"))
+    assert error.value.status_code == 400
+    assert adapter.calls == 1
+
+
+def test_rate_limit_wait_past_deadline():
+    async def run():
+        adapter = _Adapter([])
+        adapter.limiter = TokenBucket(rate=1, burst=1)
+        adapter.limiter.tokens = 0
+        requests = adapter.stats.requests
+        with deadline(0.1):
+            with pytest.raises(DeadlineExceeded):
+                await adapter._send("http://127.0.0.1:9/", None)
+        # 没有等待令牌，也没有发出请求或重试
+        assert adapter.stats.requests == requests
+        assert adapter.limiter.tokens < 1
+    asyncio.run(run())
@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+from core.config import settings
+from models.quote import Quote
+from services import leg_refresh_service
+from services.leg_refresh_service import LegRefreshService, parse_legs
+from services.quote_cache_service import QuoteCacheService
+
+
+class _Adapter:
+    """按交易所记录请求，写入行情缓存"""
+
+    def __init__(self, venue: str, calls: list):
+        self.venue = venue
+        self.calls = calls
+
+    async def get_price(self, symbol: str) -> Quote:
+        self.calls.append((self.venue, symbol))
+        quote = Quote(self.venue, symbol, 1.0, 2.0, 1.5, 0)
+        QuoteCacheService().put(self.venue, symbol, quote)
+        return quote
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(leg_refresh_service, "get_adapter", lambda venue: _Adapter(venue, calls))
+    monkeypatch.setattr(settings, "LEG_REFRESH_MAX_PER_TICK", 2)
+    return calls
+
+
+def test_parse_legs():
+    assert parse_legs(["okj:BTC/JPY", "binance:BTC/USDT"]) == [("okj", "BTC/JPY"), ("binance", "BTC/USDT")]
+
+
+def test_shortest_max_age_wins():
+    leg_refresh = LegRefreshService()
+    leg_refresh.register("spreads", [("okj", "BTC/JPY")], 30)
+    leg_refresh.register("dashboard", [("okj", "BTC/JPY"), ("binance", "BTC/USDT")], 10)
+    assert leg_refresh._max_age == {("okj", "BTC/JPY"): 10, ("binance", "BTC/USDT"): 10}
+    leg_refresh.unregister("dashboard")
+    assert leg_refresh._max_age == {("okj", "BTC/JPY"): 30}
+
+
+def test_refresh_stale_legs_within_budget(calls):
+    leg_refresh = LegRefreshService()
+    quote_cache = QuoteCacheService()
+    legs = [("okj", "BTC/JPY"), ("bitflyer", "BTC/JPY"), ("coincheck", "BTC/JPY")]
+    leg_refresh.register("dashboard", legs, 30)
+    for venue, symbol in legs:
+        quote_cache.put(venue, symbol, Quote(venue, symbol, 1.0, 2.0, 1.5, 0))
+    quote_cache.set_age("okj", "BTC/JPY", 40)
+    quote_cache.set_age("bitflyer", "BTC/JPY", 90)
+    quote_cache.set_age("coincheck", "BTC/JPY", 60)
+
+    asyncio.run(leg_refresh.refresh())
+    # 每轮最多两条，超时最多的优先；没有超时的行情不请求
+    assert calls == [("bitflyer", "BTC/JPY"), ("coincheck", "BTC/JPY")]
+    asyncio.run(leg_refresh.refresh())
+    assert calls[2:] == [("okj", "BTC/JPY")]
+    asyncio.run(leg_refresh.refresh())
+    assert len(calls) == 3
+    assert leg_refresh.stats["deferred"] == 1
@@ -0,0 +1,74 @@
+import pytest
+from core import quote_table
+from core.quote_table import SEQ, QuoteTableReader, QuoteTableWriter, TableBusy, _slot_offset
+
+
+@pytest.fixture
+def table(tmp_path):
+    writer = QuoteTableWriter(str(tmp_path / "quotes"), slots=4)
+    reader = QuoteTableReader(writer.path)
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+
+def test_roundtrip(table):
+    writer, reader = table
+    assert reader.get("okj", "BTC/JPY") is None
+    assert writer.write("okj", "BTC/JPY", 100.0, 101.0, 100.5, 1704067200000, volume=12.0)
+    assert writer.write("compose", "USDT/JPY", 150.0, 151.0, 150.5, 1704067200000)
+    quote = reader.get("okj", "BTC/JPY")
+    assert (quote.bid, quote.ask, quote.last, quote.ts, quote.volume) == (100.0, 101.0, 100.5, 1704067200000, 12.0)
+    assert reader.get_compose().last == 150.5
+    # 更新后读到新值，槽位不变
+    writer.write("okj", "BTC/JPY", 102.0, 103.0, 102.5, 1704067201000)
+    assert reader.get("okj", "BTC/JPY").last == 102.5
+    assert [(q.venue, q.symbol) for q in reader.all()] == [("okj", "BTC/JPY"), ("compose", "USDT/JPY")]
+
+
+def test_full_table_and_long_names(table):
+    writer, _ = table
+    assert not writer.write("x" * 25, "BTC/JPY", 1.0, 1.0, 1.0, 0)
+    for i in range(4):
+        assert writer.write("venue", f"S{i}", 1.0, 1.0, 1.0, 0)
+    assert not writer.write("venue", "S4", 1.0, 1.0, 1.0, 0)
+
+
+def test_busy_slot_returns_last_consistent_value(table, monkeypatch):
+    writer, reader = table
+    monkeypatch.setattr(quote_table, "READ_RETRIES", 10)
+    writer.write("okj", "BTC/JPY", 100.0, 101.0, 100.5, 0)
+    assert reader.get("okj", "BTC/JPY").last == 100.5
+    # 模拟写入中途：序号为奇数且数据已经部分更新
+    offset = _slot_offset(0)
+    seq = SEQ.unpack_from(writer._mm, offset)[0]
+    SEQ.pack_into(writer._mm, offset, seq + 1)
+    assert reader.get("okj", "BTC/JPY").last == 100.5
+    SEQ.pack_into(writer._mm, offset, seq)
+
+
+def test_busy_slot_without_previous_read(table, monkeypatch):
+    writer, reader = table
+    monkeypatch.setattr(quote_table, "READ_RETRIES", 10)
+    writer.write("okj", "BTC/JPY", 100.0, 101.0, 100.5, 0)
+    SEQ.pack_into(writer._mm, _slot_offset(0), 3)
+    with pytest.raises(TableBusy):
+        reader.read_slot(0)
+
+
+def test_writer_restart(tmp_path):
+    path = str(tmp_path / "quotes")
+    writer = QuoteTableWriter(path, slots=4)
+    writer.write("okj", "BTC/JPY", 100.0, 101.0, 100.5, 0)
+    reader = QuoteTableReader(path)
+    assert reader.live
+    assert reader.get("okj", "BTC/JPY").last == 100.5
+    writer.close()
+    assert not reader.live
+    # 写入进程重启后槽位重新分配，读取方重新建立索引
+    writer = QuoteTableWriter(path, slots=4)
+    writer.write("binance", "BTC/USDT", 1.0, 2.0, 1.5, 0)
+    writer.write("okj", "BTC/JPY", 200.0, 201.0, 200.5, 0)
+    assert reader.get("okj", "BTC/JPY").last == 200.5
+    reader.close()
+    writer.close()
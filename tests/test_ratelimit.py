@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+from core.ratelimit import HedgeBudget, TokenBucket
+
+
+def test_acquire_within_burst():
+    async def run():
+        bucket = TokenBucket(rate=10, burst=2)
+        assert await bucket.acquire() == 0.0
+        assert await bucket.acquire() == 0.0
+        assert not bucket.try_acquire()
+    asyncio.run(run())
+
+
+def test_acquire_waits_for_next_token():
+    async def run():
+        bucket = TokenBucket(rate=50, burst=1)
+        await bucket.acquire()
+        assert await bucket.acquire(timeout=1.0) == pytest.approx(0.02, abs=0.01)
+    asyncio.run(run())
+
+
+def test_acquire_fails_fast_past_timeout():
+    async def run():
+        bucket = TokenBucket(rate=1, burst=1)
+        await bucket.acquire()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with pytest.raises(asyncio.TimeoutError):
+            await bucket.acquire(timeout=0.1)
+        # 不等待，也不扣减令牌
+        assert loop.time() - started < 0.05
+        assert bucket.tokens >= 0
+    asyncio.run(run())
+
+
+def test_hedge_budget():
+    budget = HedgeBudget(ratio=0.5, burst=1)
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
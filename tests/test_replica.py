@@ -0,0 +1,42 @@
+import pytest
+from fastapi import HTTPException
+from core.config import settings
+from models.quote import Quote
+from services.binance_service import BinanceService
+from services.exchange_adapter import ExchangeAdapter
+from services.instrument_service import Instrument
+from services.quote_cache_service import QuoteCacheService
+
+INSTRUMENT = Instrument("binance", "BTCUSDT", "BTC", "USDT")
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    monkeypatch.setattr(settings, "REPLICA_MAX_QUOTE_AGE_SECONDS", 60)
+    monkeypatch.setattr(ExchangeAdapter, "replica_synced", True)
+    QuoteCacheService().put("binance", "BTC/USDT", Quote("binance", "BTC/USDT", 1.0, 2.0, 1.5, 0))
+    return BinanceService()
+
+
+def test_fresh_quote(replica):
+    assert replica._replicated(INSTRUMENT).last == 1.5
+
+
+def test_old_quote_rejected(replica):
+    QuoteCacheService().set_age("binance", "BTC/USDT", 61)
+    with pytest.raises(HTTPException) as error:
+        replica._replicated(INSTRUMENT)
+    assert error.value.status_code == 503
+
+
+def test_not_synced(replica, monkeypatch):
+    monkeypatch.setattr(ExchangeAdapter, "replica_synced", False)
+    with pytest.raises(HTTPException) as error:
+        replica._replicated(INSTRUMENT)
+    assert error.value.status_code == 503
+
+
+def test_missing_quote(replica):
+    with pytest.raises(HTTPException) as error:
+        replica._replicated(Instrument("binance", "ETHUSDT", "ETH", "USDT"))
+    assert error.value.status_code == 503
@@ -0,0 +1,63 @@
+import asyncio
+import time
+import orjson
+import pytest
+from core.config import settings
+from services.snapshot_service import SnapshotService
+from services.quote_cache_service import QuoteCacheService
+from services.stats_service import StatsService
+
+ROW = ["okj", "BTC/JPY", 14799587.0, 14807946.0, 14802183.0, 1704067200000, 0.1, 0.2, 10.0, -1.0, -0.01, 1.5]
+
+
+@pytest.fixture
+def snapshot_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(SnapshotService, "_instance", None)
+    monkeypatch.setattr(StatsService, "_instance", None)
+
+    def write(quotes, **extra):
+        data = {"version": 1, "saved_at": int(time.time() * 1000), "quotes": quotes,
+                "instruments": {}, "stats": [], **extra}
+        (tmp_path / settings.SNAPSHOT_FILE).write_bytes(orjson.dumps(data))
+    return write
+
+
+def test_restore_quotes(snapshot_file):
+    snapshot_file([ROW])
+    asyncio.run(SnapshotService().restore())
+    quote_cache = QuoteCacheService()
+    assert quote_cache.get("okj", "BTC/JPY").last == 14802183.0
+    assert quote_cache.is_restored("okj", "BTC/JPY")
+    assert quote_cache.age("okj", "BTC/JPY") >= 1.5
+
+
+def test_malformed_rows_skipped(snapshot_file):
+    snapshot_file([
+        ROW[:11],
+        ["bitflyer", "BTC/JPY", "14797000", *ROW[3:]],
+        ["coincheck", None, *ROW[2:]],
+        ["okx", "BTC/JPY", *ROW[2:11], -1],
+        "okj:BTC/JPY",
+        ["binance", "BTC/USDT", *ROW[2:]],
+    ])
+    asyncio.run(SnapshotService().restore())
+    quote_cache = QuoteCacheService()
+    assert quote_cache.get("binance", "BTC/USDT") is not None
+    assert quote_cache.get("okj", "BTC/JPY") is None
+    assert quote_cache.get("bitflyer", "BTC/JPY") is None
+    assert SnapshotService().restored["quotes"] == 1
+    assert SnapshotService().restored["skipped_quotes"] == 5
+
+
+def test_malformed_sections_do_not_block_startup(snapshot_file):
+    snapshot_file([ROW], instruments={"okj": {"instruments": [["BTC_JPY", "BTC"]]}}, stats=[["okj"], 1])
+    asyncio.run(SnapshotService().restore())
+    assert QuoteCacheService().get("okj", "BTC/JPY") is not None
+
+
+@pytest.mark.parametrize("body", [b"[]", b'{"version": 1, "saved_at": "now", "quotes": []}', b"{"])
+def test_invalid_snapshot_starts_cold(snapshot_file, tmp_path, body):
+    (tmp_path / settings.SNAPSHOT_FILE).write_bytes(body)
+    assert asyncio.run(SnapshotService().restore()) is False
+    assert SnapshotService().restored is None